@@ -1,11 +1,16 @@
 import json
-from monopoly_player import Player, protected_words
+from monopoly_player import Player, HumanPlayer, protected_words, strategy_class
 from monopoly_property import Property, Railroad, Utility, board_spaces
 from monopoly_boardstate import BoardState
+from monopoly_classes_exp import Deck
 from monopoly_cards_exp import chance, community_chest as cc
 from copy import copy
 import re
+from ast import literal_eval
 from monopoly_basic_exp import advprint
+from monopoly_metrics import metrics
+from time import perf_counter
+from monopoly_zobrist import full_hash
 
 class PlayerEncoder(json.JSONEncoder):
     """ An encoder for Player objects.
@@ -25,7 +30,8 @@ class PlayerEncoder(json.JSONEncoder):
                     'wallet': obj.wallet, 'deeds': {name: [repr(i) for i in obj.deeds[name]]
                         for name in obj.deeds}, 'state': repr(obj.game),
                     'chance': obj.chance, 'cc': obj.cc, 'in Jail': obj.inJail,
-                    'jail turns': obj.jailTurn
+                    'jail turns': obj.jailTurn, 'type': obj.type,
+                    'strategy': getattr(obj, 'strategy', None)
                     }
         return json.JSONEncoder.default(self, obj)
     
@@ -44,7 +50,7 @@ class PropertyEncoder(json.JSONEncoder):
         """
         if isinstance(obj, Property):
             return {'name': obj.name, 'bnum': obj.bnum, 'owner': repr(obj.owner),
-                    'pcount': obj.pcount}
+                    'pcount': obj.pcount, 'mstatus': obj.mstatus}
         return json.JSONEncoder.default(self, obj)
     
 class BoardStateEncoder(json.JSONEncoder):
@@ -56,7 +62,8 @@ class BoardStateEncoder(json.JSONEncoder):
         if isinstance(obj, BoardState):
             return {'state': {'players': obj.players, 'turn': obj.turn, 'board': obj.board,
                     'turn total': obj.turntotal, 'chance': repr(obj.chance),
-                    'cc': repr(obj.cc), 'lost players': obj.plost, 'time saved': obj.time}}
+                    'cc': repr(obj.cc), 'lost players': obj.plost, 'time saved': obj.time,
+                    'hash': obj.saved_hash}}
         return json.JSONEncoder.default(self, obj)
 
 def save(state, path='backup'):
@@ -68,8 +75,12 @@ def save(state, path='backup'):
     
     Side effects:
         writes to a file, creating it if necessary
+        updates the save metrics
     """
+    start = perf_counter()
     newstate = copy(state)
+    # the copy's players are swapped for their JSON below, so hash them first
+    newstate.saved_hash = state.state_hash()
     jsonplayers = [json.dumps(p, indent=2, cls=PlayerEncoder) for p in newstate.players]
     #for p in newstate.players:
     #    jsonplayers.append(json.dumps(p, indent=2, cls=PlayerEncoder))
@@ -87,6 +98,9 @@ def save(state, path='backup'):
     #my_save = json.dumps(state, cls=BoardStateEncoder, indent=2)
     with open(f"{path}.json", 'w', encoding='utf-8') as f:
         json.dump(newstate, f, indent=2, cls=BoardStateEncoder)
+        metrics.save_bytes.inc(f.tell())
+    metrics.saves.inc()
+    metrics.save_latency.observe(perf_counter() - start)
         
 class LoadError(Exception):
     pass
@@ -166,7 +180,7 @@ class SaveState:
                 #print('boo')
                 raise LoadError('Bad pcount')
             for p in self.p:
-                if prop['owner'].split()[1] == p['name']:
+                if prop['owner'].split(maxsplit=1)[1] == p['name']:
                     #print('yay')
                     c += 1
                     break
@@ -265,17 +279,15 @@ class SaveState:
         
         Returns:
             dict: card indices and their names, in order
+            
+        Raises:
+            LoadError if the string doesn't hold a dictionary of cards
         """
-        rdeck = r"(\{[^\{\}]+\})"
-        s = re.search(rdeck, str)[1]
-        rcards = r"(\d+):(\s(.+?)(,\s\D.+?)*),\s"
-        r = re.finditer(rcards, s)
-        mydeck = {}
-        for i in r:
-            try:
-                mydeck[int(i[1])] = (i[3] + i[4]).strip("'").strip('"').replace("\\", "")
-            except TypeError:
-                mydeck[int(i[1])] = i[3].strip("'").strip('"').replace("\\", "")
+        rdeck = r"(\{.*\})"
+        try:
+            mydeck = literal_eval(re.search(rdeck, str, flags=re.DOTALL)[1])
+        except (TypeError, ValueError, SyntaxError):
+            raise LoadError('bad deck')
         return mydeck
     
     def verify_deck(self, deck, mytype):
@@ -332,7 +344,10 @@ class SaveState:
             raise e
         loadplayers = []
         for p in self.p:
-            myp = Player(p['name'], p['turn order'], p['state'], p['location'], p['chance'], p['cc'], p['wallet'])
+            pclass = strategy_class(p.get('strategy')) if p.get('type') == 'ai' else HumanPlayer
+            myp = pclass(None, name=p['name'], turn_order=p['turn order'], location=p['location'],
+                         chance=p['chance'], cc=p['cc'], wallet=p['wallet'])
+            myp.name = p['name']
             myp.inJail = p['in Jail']
             myp.jailTurn = p['jail turns']
             for s in myp.deeds:
@@ -349,6 +364,7 @@ class SaveState:
                     if a == space['name']:
                         myspace = i
                         myspace.bnum = space['bnum']
+                        myspace.mstatus = space.get('mstatus', False)
                         myspace.pcount = space['pcount']
                         if space['owner'] == 'None':
                             own = None
@@ -367,15 +383,20 @@ class SaveState:
         mychance = self.extract_cards(self.state['chance'])
         #mycc = dict(self.state['cc'].split('with cards ')[1].strip('>'))
         mycc = self.extract_cards(self.state['cc'])
-        loadstate.chance = mychance
-        loadstate.cc = mycc
+        loadstate.chance = Deck('chance', pdef=mychance)
+        loadstate.cc = Deck('cc', pdef=mycc)
         for l in self.l:
             for p in loadstate.players:
                 if l['name'] == p.name:
                     loadstate.plost.append(p)
                     break
         for p in loadstate.players:
-            p.state = loadstate
+            p.game = loadstate
+            p.recount()
+        loadstate.refresh_rents()
+        loadstate.zobrist = full_hash(loadstate)
+        if self.state.get('hash', loadstate.state_hash()) != loadstate.state_hash():
+            raise LoadError("the loaded game doesn't match the saved state hash")
         return loadstate
             
 if __name__ == '__main__':
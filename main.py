@@ -1,5 +1,5 @@
 from argparse import ArgumentParser
-from time import localtime, time, asctime
+from time import localtime, time, asctime, perf_counter
 import json
 
 if __name__ == '__main__':
@@ -10,14 +10,55 @@ if __name__ == '__main__':
     parser.add_argument("humans", type=int, help="the number of human players to make")
     parser.add_argument("computers", type=int, help="the number of computer players to make")
     parser.add_argument("-n", type=bool, help="whether to start a new game or ask first", default=True)
+    parser.add_argument("--profile", help="a file to write a per-phase timing breakdown to. ending it in .folded writes flamegraph stacks instead of JSON", default=None)
+    parser.add_argument("--metrics", help="a file to write Prometheus-format metrics to while the game runs", default=None)
+    parser.add_argument("--metrics-interval", type=float, help="seconds between metrics file writes", default=15)
+    parser.add_argument("--metrics-port", type=int, help="a local port to serve Prometheus-format metrics on", default=None)
+    parser.add_argument("--memory-report", help="a file to write tracemalloc snapshot diffs to", default=None)
+    parser.add_argument("--memory-every", type=int, help="turns between memory snapshots", default=50)
+    parser.add_argument("--bid-timeout", type=float, help="seconds human players get to bid in each auction round", default=30)
+    parser.add_argument("--strategy", choices=('heuristic', 'rollout'), help="how computer players decide", default='heuristic')
+    parser.add_argument("--rollout-budget", type=float, help="seconds a rollout player may spend on each decision", default=1.0)
+    parser.add_argument("--rollout-threads", action='store_true', help="run rollouts in threads instead of processes")
+    parser.add_argument("--stalemate-window", type=int, help="turns without a property changing hands before a computer-only game can be called stalled. 0 turns detection off", default=200)
+    parser.add_argument("--stalemate-ruin-turns", type=int, help="a player whose falling net worth would run out within this many turns keeps a game from being called stalled", default=1000)
+    parser.add_argument("--adjudicate", choices=('worth', 'playouts'), help="how to settle a stalled game: by net worth, or by each player's chance of winning in simulated playouts", default='worth')
+    parser.add_argument("--winprob-budget", type=float, help="seconds each win probability estimate may take", default=0.2)
+    parser.add_argument("--winprob-log", help="a file to append win probability estimates to, one JSON object per line", default=None)
+    parser.add_argument("--winprob-every", type=int, help="turns between logged win probability estimates", default=50)
+    parser.add_argument("--decision-budget", type=float, help="seconds each computer player decision may take before it settles for the best it has found", default=None)
+    parser.add_argument("--decision-ops", type=int, help="steps of work each computer player decision may take. unlike --decision-budget, games play out the same however busy the machine is", default=None)
+    parser.add_argument("--endgame-depth", type=int, help="turns ahead computer players search once a game is down to two players with nearly every property owned. defaults to 0, which turns the endgame solver off: it hasn't been shown to win more often than the heuristics, so computer players don't switch to it unless this is set", default=0)
+    parser.add_argument("--policy", help="a JSON file of computer player weights, such as one written by monopoly_tuner.py", default=None)
     args = parser.parse_args()
-    settings = {'printmode': 0, 'humans': args.humans, 'computers': args.computers, 'newgame': args.n}
+    settings = {'printmode': 0, 'humans': args.humans, 'computers': args.computers, 'newgame': args.n,
+                'profile': args.profile, 'metrics': args.metrics, 'metrics interval': args.metrics_interval,
+                'metrics port': args.metrics_port, 'memory report': args.memory_report,
+                'memory every': args.memory_every, 'bid timeout': args.bid_timeout,
+                'strategy': args.strategy, 'rollout budget': args.rollout_budget,
+                'rollout threads': args.rollout_threads, 'policy': args.policy,
+                'stalemate window': args.stalemate_window, 'stalemate ruin turns': args.stalemate_ruin_turns,
+                'adjudicate': args.adjudicate, 'winprob budget': args.winprob_budget,
+                'winprob log': args.winprob_log, 'winprob every': args.winprob_every,
+                'decision budget': args.decision_budget, 'decision ops': args.decision_ops,
+                'endgame depth': args.endgame_depth}
     with open('config.json', 'w', encoding='utf-8') as f:
         json.dump(settings, f, indent=2)
 
 from monopoly_boardstate import BoardState
 from monopoly_basic_exp import advprint
 from jsonsaver import save, SaveState, LoadError
+from monopoly_profiler import profiler
+from monopoly_metrics import metrics
+from monopoly_memory import memory
+from monopoly_classes_exp import Auction
+from monopoly_player import ComputerPlayer
+from monopoly_policy import Policy
+from monopoly_stalemate import StalemateDetector
+from monopoly_rollout import engine
+from monopoly_winprob import estimator
+from monopoly_budget import budgets
+from monopoly_endgame import endgame
                             
 def main(pdef=[]):
     """ Runs the actual game.
@@ -27,9 +68,14 @@ def main(pdef=[]):
         
     Side effects:
         calls functions, prints messages, and asks for player input
+        
+    Returns:
+        BoardState: the finished game, or None if exiting before it starts
     """
     with open('config.json', 'r', encoding='utf-8') as f:
         settings = json.load(f)
+    if settings.get('policy'):
+        ComputerPlayer.policy = Policy.load(settings['policy'])
     if not settings['newgame']:
         mychoice = input("Start a new game, or load an existing save? ").lower()
         t = mychoice.split(maxsplit=1)
@@ -53,21 +99,91 @@ def main(pdef=[]):
             return
     else:
         current_state = BoardState(pdef)
+    if settings.get('profile'):
+        profiler.enable()
+    if settings.get('metrics'):
+        writer = metrics.write_every(settings['metrics'], settings.get('metrics interval', 15))
+    if settings.get('metrics port'):
+        server = metrics.serve(settings['metrics port'])
+    if settings.get('memory report'):
+        memory.enable(settings.get('memory every'))
+    if settings.get('bid timeout'):
+        Auction.timeout = settings['bid timeout']
+    estimator.budget = settings.get('winprob budget', estimator.budget)
+    estimator.path = settings.get('winprob log')
+    estimator.every = settings.get('winprob every', estimator.every)
+    if settings.get('decision budget') or settings.get('decision ops'):
+        budgets.set(None, settings.get('decision budget'), settings.get('decision ops'))
+    endgame.depth = settings.get('endgame depth', endgame.depth)
+    if settings.get('strategy') == 'rollout':
+        from monopoly_rollout import RolloutPlayer
+        RolloutPlayer.budget = settings.get('rollout budget', RolloutPlayer.budget)
+        engine.threads = settings.get('rollout threads', False)
+    detector = None
+    if settings.get('stalemate window', 200) and not current_state.check_humans():
+        detector = StalemateDetector(window=settings.get('stalemate window', 200),
+                                     ruin_turns=settings.get('stalemate ruin turns', 1000),
+                                     adjudicate=settings.get('adjudicate', 'worth'))
+    current_state = play(current_state, detector)
+    if current_state.result:
+        print(f"Game over after {current_state.result['turn']} turns: {current_state.result['reason']}")
+    engine.shutdown()
+    estimator.engine.shutdown()
+    if settings.get('profile'):
+        profiler.write(settings['profile'])
+    if settings.get('metrics'):
+        metrics.stop.set()
+        writer.join()
+    if settings.get('metrics port'):
+        server.shutdown()
+    if settings.get('memory report'):
+        memory.write(settings['memory report'])
+        memory.disable()
+    return current_state
+
+def play(current_state, detector=None):
+    """ Runs the turn loop of a game until it ends.
+    
+    Arguments:
+        current_state (BoardState): the game to play
+        detector (StalemateDetector, None): ends the game early, if it
+            stalls. if None, the game runs until it's won or too long
+        
+    Side effects:
+        calls functions, prints messages, and asks for player input
+        sets the game's result, if it ended on its own
+        records the game's phase timings, if the profiler is enabled
+        updates the game, turn, and turn latency metrics
+        logs win probability estimates, if the estimator has a log file
+        takes memory snapshots, if memory tracking is enabled
+        
+    Returns:
+        BoardState: the game as it was when the loop ended
+    """
     #current_state.players = [Player('hoontr', 0, current_state, location=10, deeds={'Brown': [], 'Light Blue': [], 'Pink': [], 'Orange': [], 'Red': [], 'Yellow': [], 'Green': [], 'Dark Blue': [], 'Railroads': [], 'Utilities': []}), Player('ariadne', 1, current_state)]
     #current_state.players[0].inJail = True
+    profiler.start_game()
+    metrics.games_started.inc()
     while True:
         current_state.cp = current_state.whose_turn()
-        save(current_state)
+        with profiler.phase('save'):
+            save(current_state)
+        memory.on_turn(current_state)
         if current_state.turntotal / len(current_state.players) > 500:
             print('too long')
+            current_state.result = {'winner': None, 'reason': 'turn limit', 'turn': current_state.turntotal}
             break
         if current_state.cp not in current_state.plost:
             if len(current_state.players) - len(current_state.plost) == 1:
                 advprint(f'{current_state.cp} wins!')
+                current_state.result = {'winner': current_state.cp.name, 'reason': 'last player standing',
+                                        'turn': current_state.turntotal}
                 break
             t = 'loop'
+            start = perf_counter()
             while t not in (None, 'exit'):
-                t = current_state.cp.do_turn()
+                with profiler.phase('do_turn'):
+                    t = current_state.cp.do_turn()
                 if t[0] == 'save':
                     try:
                         advprint(f"saving to {t[1]}.json")
@@ -77,18 +193,30 @@ def main(pdef=[]):
                     continue
                 elif t[0] == 'load':
                     break
+            metrics.turns.inc()
+            metrics.turn_latency.observe(perf_counter() - start)
             if t[0] == 'exit':
                 break
         if t[0] == 'load':
             try:
                 current_state = load_file(t[1])
+                if detector:
+                    detector.reset()
             except FileNotFoundError as e:
                 advprint(e)
             continue
         current_state.turntotal += 1
         current_state.turn += 1
         current_state.turn %= len(current_state.players)
+        estimator.on_turn(current_state)
+        if detector and detector.observe(current_state):
+            current_state.result = detector.result(current_state)
+            advprint(f"{current_state.result['winner']} wins!")
+            break
         #print(current_state.turn)
+    profiler.end_game()
+    metrics.games_finished.inc()
+    return current_state
         
 def load_file(path):
     """ Return the GameState object from loading a save.
@@ -1,6 +1,51 @@
-from random import randint
+from contextlib import contextmanager
+from random import Random
+from threading import local
 from time import sleep
 import json
+import random
+from monopoly_profiler import timed
+
+# per-thread output settings, so simulations can run silently beside a real game
+output = local()
+# per-thread random number generators, so simulations in threads don't draw
+# from, or reseed, the real game's
+randomness = local()
+
+def set_quiet(quiet=True):
+    """ Turns advprint off, or back on, for the current thread.
+    
+    Arguments:
+        quiet (bool): whether to stop printing and logging. defaults to True
+    """
+    output.quiet = quiet
+
+def rng():
+    """ Where the current thread's dice, shuffles, and other random choices
+        come from.
+    
+    Returns:
+        Random: the generator set with seeded(), or the random module itself
+    """
+    return getattr(randomness, 'source', None) or random
+
+@contextmanager
+def seeded(seed):
+    """ Give the current thread its own random number generator for a block.
+    
+    Arguments:
+        seed (int): the seed for the generator
+        
+    Side effects:
+        rng() returns the new generator inside the block, and whatever it
+            returned before afterwards
+    """
+    previous = getattr(randomness, 'source', None)
+    randomness.source = Random(seed)
+    try:
+        yield randomness.source
+    finally:
+        randomness.source = previous
 
 def roll_dice():
     """Simulates a single roll of two dice.
@@ -8,13 +53,17 @@ def roll_dice():
     Returns:
         int: integer between 2-12
     """
-    x, y = randint(1, 6), randint(1, 6)
+    source = rng()
+    x, y = source.randint(1, 6), source.randint(1, 6)
     if x == y:
         return [x + y, 'doubles']
     else:
         return [x + y, None]
     
+@timed('advprint')
 def advprint(*args, **kwargs):
+    if getattr(output, 'quiet', False):
+        return
     with open('config.json', 'r', encoding='utf-8') as f:
         settings = json.load(f)
     with open('log.txt', 'a', encoding='utf-8') as f:
@@ -0,0 +1,299 @@
+""" Reproducible benchmarks for the engine's hot paths.
+
+Every benchmark seeds the random module before building its fixture, so the
+same work is timed on every run. Results are written as JSON, and can be
+compared against a stored baseline to flag regressions.
+
+Usage:
+
+    python monopoly_bench.py [-o results.json] [--baseline old.json] [--tolerance 0.25] [--games 2] [--quick]
+"""
+from argparse import ArgumentParser
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter, localtime, time, asctime
+import json
+import os
+import platform
+import random
+import sys
+
+def write_config(computers, humans=0):
+    """ Write the config file the engine reads its settings from.
+
+    Arguments:
+        computers (int): how many computer players new games should have
+        humans (int): how many human players new games should have. defaults to 0
+
+    Side effects:
+        overwrites config.json in the working directory
+    """
+    settings = {'printmode': 0, 'humans': humans, 'computers': computers, 'newgame': True}
+    with open('config.json', 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+
+def new_state(computers, seed):
+    """ Start a fresh computer-only game on a fixed seed.
+
+    Arguments:
+        computers (int): how many computer players to make
+        seed (int): the seed for the random module
+
+    Returns:
+        BoardState: the new game
+    """
+    from monopoly_boardstate import BoardState
+    write_config(computers)
+    random.seed(seed)
+    return BoardState()
+
+def take_turn(state):
+    """ Play one turn of a computer-only game, the same way main.play does,
+        without saving.
+
+    Arguments:
+        state (BoardState): the game to advance
+
+    Side effects:
+        plays the current player's turn, and moves the turn order forward
+    """
+    state.step()
+
+def played_state(computers, seed, turns):
+    """ Build a game that has already been played for a number of turns.
+
+    Arguments:
+        computers (int): how many computer players to make
+        seed (int): the seed for the random module
+        turns (int): how many turns to play
+
+    Returns:
+        BoardState: the game after those turns
+    """
+    state = new_state(computers, seed)
+    for _ in range(turns):
+        take_turn(state)
+    return state
+
+def measure(func, number, repeat):
+    """ Time a function.
+
+    Arguments:
+        func (callable): the function to time. takes no arguments
+        number (int): how many calls to make per repeat
+        repeat (int): how many times to repeat the batch of calls
+
+    Returns:
+        dict: the seconds per call of the best and median batch, and the counts
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        times.append((perf_counter() - start) / number)
+    return {'seconds': min(times), 'median': median(times), 'number': number, 'repeat': repeat}
+
+def bench_roll_dice(seed, scale):
+    from monopoly_basic_exp import roll_dice
+    random.seed(seed)
+    return measure(roll_dice, 2000 * scale, 5)
+
+def bench_movement_init(seed, scale):
+    from monopoly_classes_exp import Movement
+    p = new_state(2, seed).players[0]
+    return measure(lambda: Movement(p), 200 * scale, 5)
+
+def bench_movement_move(seed, scale):
+    from monopoly_classes_exp import Movement
+    p = new_state(2, seed).players[0]
+    def step():
+        Movement(p, new_loc=(p.loc + 7) % 40).move()
+    return measure(step, 200 * scale, 5)
+
+def rent_fixture(seed, locs):
+    """ Give the first player of a fresh game the properties at locs, and
+        enough money for the second player to never go bankrupt.
+
+    Returns:
+        BoardState: the game
+        list: the properties at locs
+    """
+    state = new_state(2, seed)
+    lord, guest = state.players
+    guest.wallet = 10 ** 12
+    props = [state.board[i] for i in locs]
+    for p in props:
+        lord += p
+        lord * p.set
+    return state, props
+
+def bench_property_get_rent(seed, scale):
+    state, (prop, _) = rent_fixture(seed, (37, 39))
+    return measure(prop.get_rent, 2000 * scale, 5)
+
+def bench_property_pay_rent(seed, scale):
+    state, (prop, _) = rent_fixture(seed, (37, 39))
+    lord, guest = state.players
+    return measure(lambda: prop.pay_rent(lord, guest), 200 * scale, 5)
+
+def bench_railroad_rent(seed, scale):
+    state, (prop, _) = rent_fixture(seed, (5, 15))
+    return measure(prop.get_rent, 2000 * scale, 5)
+
+def bench_utility_rent(seed, scale):
+    state, (prop, _) = rent_fixture(seed, (12, 28))
+    return measure(prop.get_rent, 200 * scale, 5)
+
+def bench_auction(seed, scale):
+    from monopoly_classes_exp import Auction
+    state = new_state(4, seed)
+    prop = state.board[39]
+    return measure(lambda: Auction(prop, state.players, state).auc(), 5 * scale, 5)
+
+def bench_deck_draw_refresh(seed, scale):
+    from monopoly_classes_exp import Deck
+    random.seed(seed)
+    deck = Deck('chance')
+    def draw():
+        if not len(deck):
+            deck.refresh()
+        deck.draw_card()
+    return measure(draw, 2000 * scale, 5)
+
+def bench_find_prop(seed, scale):
+    state = new_state(2, seed)
+    return measure(lambda: state.find_prop('Boardwalk'), 2000 * scale, 5)
+
+def bench_computer_do_turn(seed, scale):
+    state = new_state(4, seed)
+    return measure(lambda: take_turn(state), 20 * scale, 5)
+
+def save_load_benches(seed, scale):
+    """ Time save and SaveState.load on early, mid, and late game states.
+
+    Returns:
+        dict: a result for each phase and operation
+    """
+    from jsonsaver import save, SaveState
+    results = {}
+    for phase, turns in (('early', 8), ('mid', 120), ('late', 480)):
+        state = played_state(4, seed, turns)
+        results[f'save_{phase}'] = measure(lambda: save(state, 'bench_save'), 5 * scale, 5)
+        results[f'load_{phase}'] = measure(lambda: SaveState('bench_save.json').load(), 5 * scale, 5)
+    return results
+
+def game_benches(seed, games):
+    """ Measure whole-game throughput for 2-8 computer players.
+
+    Arguments:
+        seed (int): the seed of the first game. game i uses seed + i
+        games (int): how many games to play per player count
+
+    Returns:
+        dict: a result for each player count
+    """
+    from main import play
+    results = {}
+    for n in range(2, 9):
+        elapsed = 0
+        turns = 0
+        for g in range(games):
+            state = new_state(n, seed + g)
+            start = perf_counter()
+            play(state)
+            elapsed += perf_counter() - start
+            turns += state.turntotal
+        results[f'game_{n}_players'] = {'seconds': elapsed / games, 'games_per_sec': games / elapsed,
+                                        'turns_per_sec': turns / elapsed, 'number': games, 'repeat': 1}
+    return results
+
+micro_benches = {'roll_dice': bench_roll_dice, 'movement_init': bench_movement_init,
+                 'movement_move': bench_movement_move, 'property_get_rent': bench_property_get_rent,
+                 'property_pay_rent': bench_property_pay_rent, 'railroad_rent': bench_railroad_rent,
+                 'utility_rent': bench_utility_rent, 'auction': bench_auction,
+                 'deck_draw_refresh': bench_deck_draw_refresh, 'find_prop': bench_find_prop,
+                 'computer_do_turn': bench_computer_do_turn}
+
+def run(seed=0, scale=1, games=2, only=None):
+    """ Run the benchmark suite.
+
+    Arguments:
+        seed (int): the base seed. defaults to 0
+        scale (int): multiplies the number of calls per micro-benchmark. defaults to 1
+        games (int): how many whole games to play per player count. if 0,
+            skips the whole-game benchmarks. defaults to 2
+        only (set, None): if given, only runs benchmarks whose names start
+            with one of these strings
+
+    Returns:
+        dict: the run's metadata and the results of every benchmark
+    """
+    def wanted(name):
+        return not only or any(name.startswith(o) for o in only)
+    results = {}
+    for name, bench in micro_benches.items():
+        if wanted(name):
+            results[name] = bench(seed, scale)
+    if wanted('save') or wanted('load'):
+        results.update({k: v for k, v in save_load_benches(seed, scale).items() if wanted(k)})
+    if games and wanted('game'):
+        results.update(game_benches(seed, games))
+    meta = {'time': asctime(localtime(time())), 'python': platform.python_version(),
+            'platform': platform.platform(), 'seed': seed, 'scale': scale, 'games': games}
+    return {'meta': meta, 'results': results}
+
+def compare(current, baseline, tolerance=0.25):
+    """ Compare a run against a baseline run.
+
+    Arguments:
+        current (dict): the results of run()
+        baseline (dict): a stored result of run()
+        tolerance (float): how much slower than the baseline a benchmark can
+            be before it counts as a regression. defaults to 0.25 (25%)
+
+    Returns:
+        list: a dict for every benchmark in both runs, with its old and new
+            seconds per call, their ratio, and whether it regressed
+    """
+    rows = []
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        ratio = new['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        rows.append({'name': name, 'baseline': old['seconds'], 'current': new['seconds'],
+                     'ratio': ratio, 'regression': ratio > 1 + tolerance})
+    return rows
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("-o", "--output", help="the file to write the results to", default='bench_output.json')
+    parser.add_argument("--baseline", help="a previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, help="the allowed slowdown before flagging a regression", default=0.25)
+    parser.add_argument("--seed", type=int, help="the base seed", default=0)
+    parser.add_argument("--scale", type=int, help="multiplies the calls per micro-benchmark", default=1)
+    parser.add_argument("--games", type=int, help="whole games per player count, 0 to skip", default=2)
+    parser.add_argument("--only", nargs='*', help="only run benchmarks starting with these names")
+    parser.add_argument("--quick", action='store_true', help="skip the whole-game benchmarks")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        results = run(args.seed, args.scale, 0 if args.quick else args.games, set(args.only or ()))
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    for name, r in results['results'].items():
+        print(f"{name:24} {r['seconds'] * 1e6:14.1f} us")
+    if baseline:
+        rows = compare(results, baseline, args.tolerance)
+        for row in rows:
+            flag = 'REGRESSION' if row['regression'] else 'ok'
+            print(f"{row['name']:24} {row['ratio']:6.2f}x  {flag}")
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
@@ -1,10 +1,14 @@
 from monopoly_player import make_players
-from monopoly_property import board_spaces
+from monopoly_property import board_spaces, reset_board
 from monopoly_classes_exp import Auction, Deck, Movement
 from monopoly_exceptions import LoserError
 from monopoly_command import Command
 from monopoly_basic_exp import advprint, roll_dice
+from monopoly_profiler import timed
+from monopoly_metrics import metrics
+from monopoly_zobrist import Hashed, key, toggle, full_hash, position_keys, property_keys
 from time import time, localtime, asctime
+import pickle
 
 class BoardState:    
     """ The current game state, created once per game and modified as it goes on.
@@ -19,7 +23,20 @@ class BoardState:
         cc (Deck): the current deck of Community Chest cards
         plost (list): the players that have lost
         cp (Player): the Player whose turn it is
+        rents (list): the current rent of each space, kept up to date as
+            ownership, mortgages, and buildings change. 0 for spaces that
+            aren't owned properties. utilities hold their dice multiplier
+        set_spaces (dict): set names and the board indices of their properties
+        set_hashes (dict): set names and the XOR of their properties' keys,
+            as of the last time the set's rents were updated
+        zobrist (int): the state hash of the properties, whose turn it is,
+            and the players' Jail status and cards, kept up to date as they
+            change. see state_hash()
+        result (dict, None): how the game ended, once it has: the winner's
+            name (or None), the reason, and the turn
     """
+    turn = Hashed()
+
     def __init__(self, pdef=[]):
         """ Initialize the game.
         
@@ -30,6 +47,7 @@ class BoardState:
         
         Side effects:
             sets attributes to their default values
+            if pdef is empty, resets the board for a fresh game
         """
         self.turn = 0
         self.board = board_spaces
@@ -38,11 +56,21 @@ class BoardState:
         self.chance = Deck('chance')
         self.cc = Deck('cc')
         self.plost = []
+        self.result = None
         self.time = asctime(localtime(time()))
+        self.set_spaces = {}
+        for i, space in self.board.items():
+            if not isinstance(space, str):
+                self.set_spaces.setdefault(space.set, []).append(i)
+        self.rents = [0] * len(self.board)
+        self.set_hashes = {}
         if pdef:
             self.players = pdef
         else:
+            reset_board()
             self.players = make_players(self)
+        self.refresh_rents()
+        self.zobrist = full_hash(self)
         with open('config.py', 'w') as f:
             if self.check_humans():
                 f.write('printmode = 1')
@@ -56,6 +84,76 @@ class BoardState:
         other = self.__new__(BoardState)
         other.__dict__.update(self.__dict__)
         return other
+    
+    def clone(self):
+        """ Make an independent copy of the game, with its own board, players,
+            and decks, for simulating ahead without touching the real game.
+            
+        Returns:
+            BoardState: the copy
+        """
+        return pickle.loads(pickle.dumps(self, pickle.HIGHEST_PROTOCOL))
+    
+    def hashed_change(self, field, old, new):
+        """ Updates the state hash when whose turn it is changes.
+        """
+        toggle(self, key('turn', old), key('turn', new))
+    
+    def state_hash(self):
+        """ A 64-bit hash of the whole game: every player's location, wallet,
+            Jail status, and cards, every property's owner, buildings, and
+            mortgage, whose turn it is, and the cards left in both decks.
+            two games in the same state have the same hash.
+            
+        Returns:
+            int: the hash
+        """
+        h = self.zobrist ^ self.chance.zobrist ^ self.cc.zobrist
+        for p in self.players:
+            h ^= position_keys(p)
+        return h
+    
+    def step(self):
+        """ Play the next turn with nothing in between, the way a simulation
+            or benchmark does: no saving, and no prompts between turns.
+            
+        Side effects:
+            plays the current player's turn, unless they've lost, and moves
+                the turn order forward
+        """
+        self.cp = self.whose_turn()
+        if self.cp not in self.plost:
+            self.cp.do_turn()
+        self.turntotal += 1
+        self.turn += 1
+        self.turn %= len(self.players)
+        
+    def update_rents(self, setname):
+        """ Recalculate the rent of every property in a set, and the set's
+            part of the state hash.
+        
+        Arguments:
+            setname (str): the set whose ownership, mortgages, or buildings changed
+            
+        Side effects:
+            updates self.rents, self.set_hashes, and self.zobrist
+        """
+        h = 0
+        for i in self.set_spaces[setname]:
+            prop = self.board[i]
+            self.rents[i] = prop.base_rent()
+            h ^= property_keys(prop)
+        toggle(self, self.set_hashes.get(setname, 0), h)
+        self.set_hashes[setname] = h
+    
+    def refresh_rents(self):
+        """ Recalculate the whole rent table.
+        
+        Side effects:
+            updates self.rents, and every set's part of the state hash
+        """
+        for setname in self.set_spaces:
+            self.update_rents(setname)
         
     def whose_turn(self):
         """ Determine whose turn it is.
@@ -187,6 +285,7 @@ class BoardState:
             self.cp.loc = 10
             self.cp.inJail = True
 
+    @timed('move')
     def move(self, new_loc = None):
         """ Moves the current player, and the consequences of the move.
         
@@ -382,6 +481,7 @@ class BoardState:
         except LoserError:
             return
 
+    @timed('special_space')
     def special_space(self, space):
         """ Handles special effects from landing on certain spaces.
             Args:
@@ -440,45 +540,90 @@ class BoardState:
         """ Removes the current player from the game.
         
         Arguments:
-            creditor (Player, None): the player that the current player owes. if
-                None, the current player owes the bank
+            loser (Player): the player that has lost
+            creditor (Player, str): the player that the current player owes, or
+                'the Bank'
                 
         Side effects:
-            if creditor is None, puts all of loser's properties up for auction
+            if creditor is the Bank, puts all of loser's properties up for auction
             otherwise, gives their properties to creditor, while handling their
                 mortgaged status
             gives their GOJF cards to the appropriate party
+            counts the bankruptcy in the metrics
         """
+        metrics.bankruptcies.inc()
         if creditor == 'the Bank':
-            for aset in loser.deeds:
-                for p in aset:
-                    p.mstatus = None
-                    advprint(f'{p} is up for auction!')
-                    auc = Auction(p, self.players - loser, self)
-                    if auc.auc():
-                        self.buy_property(auc.cp, p, other_price = auc.cbid)
-                        for i in auc.cp.deeds[p.set]:
-                            i.pcount = len(auc.cp.deeds[p.set])
-                    else:
-                        p.owner = None
+            self.auction_estate(loser)
             loser.chance, loser.cc = 0, 0
         else:
             try:
                 for aset in loser.deeds:
                     for p in loser.deeds[aset]:
-                        a = creditor.get_mortgaged_prop( p)
-                        if a:
-                            creditor += p
+                        p.owner = creditor
+                        if p.mstatus and not creditor.get_mortgaged_prop(p):
+                            p.owner = None
+                            p.pcount = 0
+                            continue
+                        creditor.deeds[aset].append(p)
+                        creditor.track(p)
                     loser.deeds[aset].clear()
                     creditor * aset
+                loser.recount()
             except LoserError:
-                self.lose(creditor, None)
+                self.plost.append(loser)
                 return
             creditor.chance += loser.chance
             creditor.cc += loser.cc
             loser.chance, loser.cc = 0, 0
         self.plost.append(loser)
                         
+    def auction_estate(self, loser):
+        """ Auctions everything a player bankrupt to the Bank owned, in one
+            pass. each set's properties are sold together as one lot, so
+            bidders value completing the set, and ownership, pcount, and
+            the rent table are only updated once each lot has been paid for.
+            
+        Arguments:
+            loser (Player): the player that has lost
+            
+        Side effects:
+            takes every property from loser, and returns it to the Bank
+                unmortgaged and unimproved
+            auctions each set's properties, charging the winners
+            gives each lot to its winner, or leaves it with the Bank
+        """
+        lots = {aset: list(props) for aset, props in loser.deeds.items() if props}
+        for aset, props in lots.items():
+            for p in props:
+                p.mstatus = False
+                p.bnum = 0
+                p.pcount = 0
+                p.owner = None
+            loser.deeds[aset].clear()
+        loser.recount()
+        winners = {}
+        for aset, props in lots.items():
+            bidders = [p for p in self.players if p not in self.plost and p != loser]
+            advprint(f"{', '.join(str(p) for p in props)} {'is' if len(props) == 1 else 'are'} up for auction!")
+            auc = Auction(props, bidders, self)
+            if not auc.auc():
+                continue
+            try:
+                auc.cp -= auc.cbid
+            except LoserError:
+                continue
+            winners[aset] = auc.cp
+        for aset, props in lots.items():
+            winner = winners.get(aset)
+            if winner is None or winner in self.plost:
+                self.update_rents(aset)
+                continue
+            for p in props:
+                p.owner = winner
+                winner.deeds[aset].append(p)
+                winner.track(p)
+            winner * aset
+        
     def check_card(self):
         chance_count = 0
         cc_count = 0
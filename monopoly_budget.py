@@ -0,0 +1,186 @@
+""" Time and work limits for computer players' decisions.
+
+Each kind of decision (jail, buy, bid, build, unmortgage, trade, liquidate)
+can be given a wall-clock limit, a limit on operations, or both. While a
+decision is being made, its Deadline is the innermost one on a per-thread
+stack, and any strategy that can take a while asks it, between steps of its
+work, whether time is up:
+
+    deadline = current()
+    for step in work:
+        deadline.tick()
+        if deadline.expired():
+            return best_so_far
+        ...
+
+So a strategy answers with the best it has found when its limit runs out. The
+trade search returns the offers found so far, rollouts go with the playouts
+that finished, and the liquidation and building planners fall back to greedy
+plans. Operation limits count steps rather than seconds, so a batch of games
+plays out the same however busy the machine is. A wall-clock limit keeps
+interactive games responsive instead.
+
+A decision that runs past its limit anyway, because one step took too long,
+is an overrun. Overruns are recorded in the profiler's report while it's on.
+"""
+from functools import wraps
+from threading import local
+from time import perf_counter
+from monopoly_profiler import profiler
+
+kinds = ('jail', 'buy', 'bid', 'build', 'unmortgage', 'trade', 'liquidate')
+
+class Expired(Exception):
+    """ Raised by a strategy's inner loop to give up on an exact answer.
+    """
+
+class Deadline:
+    """ One decision's allowance.
+
+    Attributes:
+        kind (str): the decision
+        seconds (float, None): how long it may take. None for no limit
+        operations (int, None): how many steps it may take. None for no limit
+        start (float): when it started, from perf_counter()
+        ops (int): how many steps it has taken
+        owner: the player making the decision, or None
+    """
+    def __init__(self, kind, seconds=None, operations=None, owner=None):
+        self.kind = kind
+        self.owner = owner
+        self.seconds = seconds
+        self.operations = operations
+        self.start = perf_counter()
+        self.ops = 0
+
+    def tick(self, n=1):
+        """ Count steps of work.
+
+        Side effects:
+            adds n to self.ops
+        """
+        self.ops += n
+
+    def elapsed(self):
+        """ Returns:
+            float: how many seconds the decision has taken so far
+        """
+        return perf_counter() - self.start
+
+    def expired(self):
+        """ Returns:
+            bool: whether either limit has been reached
+        """
+        if self.operations is not None and self.ops >= self.operations:
+            return True
+        return self.seconds is not None and perf_counter() - self.start >= self.seconds
+
+    def remaining(self, default=None):
+        """ How long the decision has left.
+
+        Arguments:
+            default (float, None): what to return if there's no time limit
+
+        Returns:
+            float: seconds left, at least 0
+        """
+        if self.seconds is None:
+            return default
+        return max(self.seconds - (perf_counter() - self.start), 0)
+
+    def ops_left(self, default=None):
+        """ Returns:
+            int: steps left, at least 0, or default if there's no operation limit
+        """
+        if self.operations is None:
+            return default
+        return max(self.operations - self.ops, 0)
+
+class Budgets:
+    """ The limits for each kind of decision.
+
+    Attributes:
+        limits (dict): decision kinds and their (seconds, operations) limits.
+            kinds left out have no limits
+        stacks (local): each thread's stack of running Deadlines
+    """
+    def __init__(self):
+        # the trade search is the one decision that can grow large, so it's
+        # limited by default, well above what it takes in a typical game
+        self.limits = {'trade': (None, 2000)}
+        self.stacks = local()
+
+    def set(self, kind=None, seconds=None, operations=None):
+        """ Limit a kind of decision, or every kind.
+
+        Arguments:
+            kind (str, None): the decision. if None, every kind
+            seconds (float, None): how long it may take. None for no limit
+            operations (int, None): how many steps it may take. None for no limit
+
+        Raises:
+            ValueError: if the kind isn't recognized
+
+        Side effects:
+            replaces the kind's limits. with neither limit, removes them
+        """
+        if kind is not None and kind not in kinds:
+            raise ValueError(f'unknown decision: {kind}')
+        for k in (kinds if kind is None else (kind,)):
+            if seconds is None and operations is None:
+                self.limits.pop(k, None)
+            else:
+                self.limits[k] = (seconds, operations)
+
+    def stack(self):
+        """ Returns:
+            list: this thread's running Deadlines, innermost last
+        """
+        try:
+            return self.stacks.deadlines
+        except AttributeError:
+            self.stacks.deadlines = []
+            return self.stacks.deadlines
+
+    def current(self):
+        """ Returns:
+            Deadline: the innermost running decision's deadline, or one with
+                no limits if no decision is running
+        """
+        stack = self.stack()
+        return stack[-1] if stack else Deadline(None)
+
+    def decision(self, kind):
+        """ A decorator that runs every call to a method as a decision of
+            some kind, with that kind's limits. a call made while the same
+            player is already making a decision of the same kind, like a
+            subclass calling the method it overrides, is part of it.
+
+        Arguments:
+            kind (str): the decision
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                limits = self.limits.get(kind)
+                stack = self.stack()
+                # with no limits to keep, only a decision inside another needs its own deadline
+                if limits is None and not profiler.enabled and not stack:
+                    return func(*args, **kwargs)
+                owner = args[0] if args else None
+                if stack and stack[-1].kind == kind and stack[-1].owner is owner:
+                    return func(*args, **kwargs)
+                deadline = Deadline(kind, *(limits or (None, None)), owner=owner)
+                stack.append(deadline)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    stack.pop()
+                    if profiler.enabled:
+                        profiler.decision(kind, deadline)
+            return wrapper
+        return decorator
+
+budgets = Budgets()
+current = budgets.current
+decision = budgets.decision
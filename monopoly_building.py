@@ -0,0 +1,181 @@
+""" Plans how a player should spend a budget on houses and hotels.
+
+Only full, unmortgaged sets of streets can be built on. Within a set, houses
+go on the property with the fewest first, so the even-building rule always
+holds. Each possible number of new houses in a set is valued at the extra
+expected rent it brings in over the valuation horizon, less what the houses
+cost. Then a knapsack over the sets finds the most valuable way to spend each
+possible budget, so builds that wouldn't pay for themselves are never made.
+
+The whole table of budgets is memoized by the player's monopolies, so on a
+turn where nothing has changed, planning is a single lookup. If working the
+table out runs past the build decision's limits (see monopoly_budget), the
+plan falls back to a greedy one, which buys the most valuable builds per
+dollar first.
+"""
+from functools import lru_cache, reduce
+from math import gcd
+from monopoly_budget import current, Expired
+from monopoly_property import board_spaces, Property, Railroad, Utility
+from monopoly_valuation import get_valuation
+
+# every building price is a multiple of this, so budgets are counted in units of it
+unit = reduce(gcd, (s.bprice for s in board_spaces.values() if isinstance(s, Property) and s.bprice))
+# the highest total of two dice, for the worst utility rent
+highest_roll = 12
+
+def monopolies(player):
+    """ A hashable snapshot of the sets a player can build on.
+
+    Arguments:
+        player (Player): the player
+
+    Returns:
+        tuple: for each full, unmortgaged set of streets with room for another
+            building, a tuple of (board index, buildings) for each property
+    """
+    held = []
+    for props in player.deeds.values():
+        if not props or isinstance(props[0], (Railroad, Utility)) or len(props) != props[0].stot:
+            continue
+        if any(p.mstatus for p in props) or all(p.bnum == 5 for p in props):
+            continue
+        held.append(tuple((p.loc, p.bnum) for p in props))
+    return tuple(held)
+
+def set_options(props, opponents):
+    """ Every number of buildings one set could get.
+
+    Arguments:
+        props (tuple): (board index, buildings) for each property in the set
+        opponents (int): how many opponents might land on the properties
+
+    Returns:
+        list: tuples of (cost in units, value, actions) for 0, 1, 2... new
+            buildings. actions are board indices to build on, in order
+    """
+    valuation = get_valuation()
+    scale = opponents * valuation.horizon
+    count = len(props)
+    def rent(loc, bnum):
+        return valuation.rents[loc][valuation.level(board_spaces[loc], count, bnum)] * scale
+    bnums = {loc: bnum for loc, bnum in props}
+    bprice = board_spaces[props[0][0]].bprice
+    options = [(0, 0, ())]
+    value, actions = 0, ()
+    while min(bnums.values()) < 5:
+        lowest = min(bnums.values())
+        loc = max((l for l in bnums if bnums[l] == lowest), key=lambda l: rent(l, lowest + 1) - rent(l, lowest))
+        value += rent(loc, lowest + 1) - rent(loc, lowest) - bprice
+        bnums[loc] += 1
+        actions += (loc,)
+        options.append((len(actions) * bprice // unit, value, actions))
+    return options
+
+# tables are big, and only reused within a turn or two, so only a few are kept
+@lru_cache(maxsize=16)
+def build_table(held, opponents):
+    """ Find the most valuable builds for every budget.
+
+    Arguments:
+        held (tuple): the player's monopolies, from monopolies()
+        opponents (int): how many opponents might land on the properties
+
+    Returns:
+        list: (value, actions) for each budget in units, up to what it would
+            cost to build every set up to hotels
+    """
+    options = [set_options(props, opponents) for props in held]
+    size = sum(o[-1][0] for o in options) + 1
+    best = [(0, ())] * size
+    deadline = current()
+    for set_opts in options:
+        deadline.tick(size)
+        if deadline.expired():
+            raise Expired()
+        new = list(best)
+        for b in range(size):
+            for cost, value, actions in set_opts[1:]:
+                if cost > b:
+                    break
+                rest = best[b - cost]
+                if rest[0] + value > new[b][0]:
+                    new[b] = rest[0] + value, rest[1] + actions
+        best = new
+    return best
+
+def greedy(held, opponents, units):
+    """ Find valuable builds for a budget, quickly: keep moving one set on to
+        whichever of its options adds the most value per unit, while it fits.
+
+    Arguments:
+        held (tuple): the player's monopolies, from monopolies()
+        opponents (int): how many opponents might land on the properties
+        units (int): the budget, in units
+
+    Returns:
+        tuple: the board indices to build on, in order
+    """
+    options = [set_options(props, opponents) for props in held]
+    chosen = [0] * len(options)
+    spent = 0
+    while True:
+        step = None
+        for i, opts in enumerate(options):
+            cost, value, _ = opts[chosen[i]]
+            for j in range(chosen[i] + 1, len(opts)):
+                extra = opts[j][0] - cost
+                if spent + extra > units:
+                    break
+                ratio = (opts[j][1] - value) / extra
+                if ratio > 0 and (step is None or ratio > step[0]):
+                    step = ratio, i, j
+        if step is None:
+            break
+        _, i, j = step
+        spent += options[i][j][0] - options[i][chosen[i]][0]
+        chosen[i] = j
+    return tuple(loc for opts, j in zip(options, chosen) for loc in opts[j][2])
+
+def reserve(player, minimum=150):
+    """ How much cash to hold back: enough to pay the worst rent any opponent
+        could charge right now.
+
+    Arguments:
+        player (Player): the player
+        minimum (int): the least to hold back. defaults to 150
+
+    Returns:
+        int: the reserve
+    """
+    worst = minimum
+    for i, rent in enumerate(player.game.rents):
+        space = player.game.board[i]
+        if not rent or space.owner is player:
+            continue
+        worst = max(worst, rent * highest_roll if isinstance(space, Utility) else rent)
+    return worst
+
+def plan(player, budget=None):
+    """ Plan what a player should build.
+
+    Arguments:
+        player (Player): the player
+        budget (int, None): how much they can spend. if None, their wallet
+            less reserve()
+
+    Returns:
+        list: the properties to build one building on, in order. a property
+            appears once per building
+    """
+    if budget is None:
+        budget = player.wallet - reserve(player)
+    held = monopolies(player)
+    if budget < unit or not held:
+        return []
+    opponents = max(player.opponents(), 1)
+    try:
+        table = build_table(held, opponents)
+    except Expired:
+        return [player.game.board[loc] for loc in greedy(held, opponents, budget // unit)]
+    return [player.game.board[loc] for loc in table[min(budget // unit, len(table) - 1)][1]]
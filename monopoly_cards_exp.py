@@ -35,3 +35,62 @@ community_chest = {
     15: 'You have won second prize in a beauty contest. Collect $10',
     16: 'You inherit $100'
 }
+
+# the board index used for a token that is in Jail, as opposed to Just Visiting
+in_jail = 40
+chance_spaces = (7, 22, 36)
+cc_spaces = (2, 17, 33)
+
+def chance_destination(ind, loc):
+    """ Where a Chance card sends a player, following BoardState.do_chance.
+    
+    Arguments:
+        ind (int): the card's index in chance
+        loc (int): the space the player drew the card on
+        
+    Returns:
+        int: the space the player ends up on, in_jail if the card sends them
+            to Jail, or loc if the card doesn't move them
+    """
+    if ind == 0:
+        return 0
+    elif ind == 1:
+        return 24
+    elif ind == 2:
+        return 11
+    elif ind == 3:
+        return 12 if loc >= 28 or loc < 12 else 28
+    elif ind in (4, 5):
+        if loc >= 35 or loc < 5:
+            return 5
+        elif loc < 15:
+            return 15
+        elif loc < 25:
+            return 25
+        return 35
+    elif ind == 8:
+        return loc - 3
+    elif ind == 9:
+        return in_jail
+    elif ind == 11:
+        return 5
+    elif ind == 13:
+        return 39
+    return loc
+
+def cc_destination(ind, loc):
+    """ Where a Community Chest card sends a player, following BoardState.do_cc.
+    
+    Arguments:
+        ind (int): the card's index in community_chest
+        loc (int): the space the player drew the card on
+        
+    Returns:
+        int: the space the player ends up on, in_jail if the card sends them
+            to Jail, or loc if the card doesn't move them
+    """
+    if ind == 0:
+        return 0
+    elif ind == 5:
+        return in_jail
+    return loc
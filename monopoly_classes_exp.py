@@ -1,8 +1,10 @@
 from monopoly_command import Command
-from monopoly_property import board_spaces
+from monopoly_input import inputs
 from monopoly_cards_exp import chance, community_chest as cc
-from random import shuffle
-from monopoly_basic_exp import roll_dice, advprint
+from monopoly_basic_exp import roll_dice, advprint, rng
+from monopoly_profiler import timed
+from monopoly_metrics import metrics
+from monopoly_zobrist import card_key, deck_key
 
 class Deck:
     """ A class for the decks of Chance & Community Chest cards.
@@ -11,6 +13,7 @@ class Deck:
         deck (dict): a dictionary of the card's indices and their text
         type (str): whether self is a Chance or Community Chest deck
         order (list): a list of deck's keys, in their shuffled order.
+        zobrist (int): the state hash of the cards left, in order
     """
     def __init__(self, mytype, pdef=[]):
         """ Initialize a Deck object.
@@ -24,12 +27,12 @@ class Deck:
         if not pdef:
             if mytype == 'chance':
                 k = list(chance.items())
-                shuffle(k)
+                rng().shuffle(k)
                 self.deck = dict(k)
                 self.type = 'chance'
             else:
                 k = list(cc.items())
-                shuffle(k)
+                rng().shuffle(k)
                 self.deck = dict(k)
                 self.type = 'cc'
             self.order = list(self.deck.keys())
@@ -41,6 +44,7 @@ class Deck:
                 self.deck = pdef
                 self.type = 'cc'
             self.order = list(self.deck.keys())            
+        self.zobrist = deck_key(self)
         
     def __str__(self):
         return f"{'Chance' if self.type == 'chance' else 'Community Chest'} deck. Cards left: {len(self.order)}"
@@ -59,6 +63,7 @@ class Deck:
         """
         ind = self.order.pop(0)
         text = self.deck.pop(ind)
+        self.zobrist ^= card_key(self, len(self.order), ind)
         return ind, text
     
     def refresh(self, taken=None):
@@ -74,17 +79,18 @@ class Deck:
         """
         if self.type == 'chance':
             k = list(chance.items())
-            shuffle(k)
+            rng().shuffle(k)
             self.deck = dict(k)
             if taken:
                 del k[7]            
         else:
             k = list(cc.items())
-            shuffle(k)
+            rng().shuffle(k)
             self.deck = dict(k)
             if taken:
                 del k[4]
         self.order = list(self.deck.keys()) 
+        self.zobrist = deck_key(self)
     
     def __len__(self):
         return len(self.deck)
@@ -96,8 +102,8 @@ class Movement:
         p (Player): the player moving
         doubles (None, bool): whether the player rolled doubles to move
         new (int): the index of the space the player is moving to
-        nspace (str, Property): the space in the board_spaces dict, at the index
-            of self.new
+        nspace (str, Property): the space on the player's game board, at the
+            index of self.new
     """
     def __init__(self, player, new_loc = None):
         """ Initialize a Movement object and prepare the player's move.
@@ -124,7 +130,7 @@ class Movement:
             #advprint(self.p.loc)
         else:
             self.new = new_loc
-        self.nspace = board_spaces[self.new]
+        self.nspace = player.game.board[self.new]
         #advprint(self.new, self.nspace)
     
     def check_go(self, old_space, new_space):
@@ -159,72 +165,154 @@ class Auction:
     """ An auction.
     
     Attributes:
-        prop (Property): the property being auctioned
-        p (set): the Players participating in the auction
+        prop (Property, list): the property being auctioned, or a list of
+            properties sold together as one lot
+        label (str): the name of what's being auctioned
+        p (list): the Players participating in the auction, in seat order
         done (set): the Players not participating in the auction
         cbid (int): the current highest bid
         cp (Player, None): the Player with the highest bid
+        limits (dict): computer Players and the most they'll bid, worked out
+            once per auction
+        increment (int): the smallest step between bids
+        timeout (float): how many seconds human players get to bid each round
     """
+    increment = 10
+    timeout = 30
+    
     def __init__(self, property, players, state):
         """ Initialize an Auction.
         
         Arguments:
-            property (Property): the property being auctioned
+            property (Property, list): the property being auctioned, or a
+                list of properties to sell together
             players (list): the Players currently in the game
             
         Side effects:
             sets Auction attributes
         """
         self.prop = property
-        self.p = set(players)
+        self.label = ', '.join(str(p) for p in property) if isinstance(property, list) else str(property)
+        self.p = list(players)
         self.done = set()
         self.cbid = 0
         self.cp = None
         self.state = state
+        self.limits = {}
     
-    def abid(self, player):
-        """ Processes a bid during an auction.
+    def limit(self, player):
+        """ The most a computer player will bid in this auction.
         
         Arguments:
-            player (Player): the player whose turn it is to bid.
+            player (ComputerPlayer): the bidder
             
         Side effects:
-            prints messages relating to the bid
-            asks for player input for their bid
-            if their bid is valid and higher than the current bid, sets the cp
-                and cbid attributes accordingly
+            works out the bidder's limit the first time it's asked for
+            
         Returns:
-            str: if the player doesn't input a number, returns their input
+            int: the limit, as a multiple of self.increment
         """
-        b = player.bid(self)
-        if isinstance(b, str):
-            return b
-        if b <= self.cbid:
-            advprint("You must bid higher than the current max bid")
-            #sleep(0.5)
-        else:
-            self.cp = player
-            self.cbid = b
+        if player not in self.limits:
+            maxbid = player.calc_high_bid(self.prop)
+            self.limits[player] = maxbid - maxbid % self.increment
+        return self.limits[player]
+    
+    def resolve(self):
+        """ Settles an auction between computer players in one pass. Bidding
+            round by round, each bidder raises by the increment until they
+            reach their limit, so the highest limit wins, paying one increment
+            more than the second highest. Ties go to whoever is seated first.
+            
+        Side effects:
+            sets the cp and cbid attributes, if anyone bids
+        """
+        ranked = sorted(self.p, key=self.limit, reverse=True)
+        if not ranked or self.limit(ranked[0]) < self.increment:
+            return
+        second = self.limit(ranked[1]) if len(ranked) > 1 else 0
+        self.cp = ranked[0]
+        self.cbid = min(self.limit(ranked[0]), max(second, 0) + self.increment)
+    
+    def collect(self, humans):
+        """ Asks every human bidder for a bid at once, and waits until they've
+            all answered or the timeout runs out.
+        
+        Arguments:
+            humans (list): the human Players still bidding
+            
+        Side effects:
+            prints a prompt, reads input, and logs what was entered
+            prints a message for each player who didn't answer in time
+            
+        Returns:
+            dict: Players and their bid, as an int, or as the text they
+                entered if it wasn't a number. anyone who didn't answer in
+                time bids 'exit'
+        """
+        def parse(line):
+            for p in humans:
+                if line.lower().startswith(f'{p.name.lower()} '):
+                    return p, line[len(p.name):].strip().lower()
+            if len(humans) == 1:
+                return humans[0], line.strip().lower()
+            return None, line
+        prompt = f"Bids on {self.label} are open for {self.timeout:g} seconds. Current bid: ${self.cbid}\n"
+        if len(humans) > 1:
+            prompt += "Enter your name, then your bid or 'exit'\n"
+        lines = inputs.collect(prompt, self.timeout, lambda lines: {parse(l)[0] for l in lines} >= set(humans))
+        with open('log.txt', 'a', encoding='utf-8') as f:
+            f.write(f"{prompt}: {lines}\n")
+        bids = {}
+        for line in lines:
+            p, text = parse(line)
+            if p is None:
+                advprint(f"{line!r} isn't from anyone in the auction")
+                continue
+            try:
+                bids[p] = int(text)
+            except ValueError:
+                bids[p] = text
+        for p in humans:
+            if p not in bids:
+                advprint(f"{p} didn't bid in time, and is out of the auction")
+                bids[p] = 'exit'
+        return bids
         
     def turn(self):
-        """ Processes a round of an auction.
+        """ Processes a round of an auction. every remaining player bids at
+            once, and the highest valid bid leads. ties go to whoever is
+            seated first.
         
         Side effects:
-            calls self.bid for each remaining player
-            prints a message
-            if a player wants to exit the auction, adds them to self.done
+            asks the human players for their bids together, and the computer
+                players for theirs
+            prints messages about invalid bids and the new leader
+            if a player wants to exit the auction, or says nothing in time,
+                adds them to self.done
+            sets the cp and cbid attributes to the leading bid
         """
-        for p in self.p:
-            if p not in self.done and p != self.cp:
-                mybid = self.abid(p)
-                if mybid:
-                    if mybid in ('exit', 'stop'):
-                        self.done.add(p)
-                    else:
-                        advprint('bad input')
-                        #sleep(0.5)
-                    continue
+        bidders = [p for p in self.p if p not in self.done and p != self.cp]
+        humans = [p for p in bidders if getattr(p, 'type', None) != 'ai']
+        bids = self.collect(humans) if humans else {}
+        best = None
+        for p in bidders:
+            b = bids[p] if p in bids else p.bid(self)
+            bids[p] = b
+            if isinstance(b, str):
+                if b in ('exit', 'stop'):
+                    self.done.add(p)
+                else:
+                    advprint(f'bad input from {p}')
+            elif b <= self.cbid:
+                advprint(f"{p}, you must bid higher than the current max bid")
+            elif best is None or b > bids[best]:
+                best = p
+        if best is not None:
+            self.cp = best
+            self.cbid = bids[best]
+            advprint(f"{best} leads with ${self.cbid}")
     
+    @timed('auction')
     def auc(self):
         """ Handles the process of an auction.
         
@@ -235,11 +323,15 @@ class Auction:
             int: if a player placed a valid bid, returns 1
         """
         advprint('Starting auction')
+        metrics.auctions.inc()
         #sleep(0.5)
-        while len(self.p) - len(self.done) > 1:
-            self.turn()
+        if all(getattr(p, 'type', None) == 'ai' for p in self.p):
+            self.resolve()
+        else:
+            while len(self.p) - len(self.done) > 1:
+                self.turn()
         if self.cp and self.cbid:
-            advprint(f"{self.prop} is sold to {self.cp} for {self.cbid}")
+            advprint(f"{self.label} is sold to {self.cp} for {self.cbid}")
             #sleep(0.5)
             return 1
         else:
@@ -1,9 +1,10 @@
 from monopoly_basic_exp import roll_dice, advprint
+from monopoly_input import inputs
 from monopoly_exceptions import LoserError
 
 class Command:
     def __init__(self, state, mytype, prompt):
-        self.text = input(f'{prompt}').lower()
+        self.text = inputs.read(f'{prompt}').lower()
         self.state = state
         self.type = mytype
         self.oldtype = None
@@ -16,7 +17,7 @@ class Command:
         
     def action(self):
         if self.text == 'info':
-            t = Command(self.state, 'com_int', "Properties, positions, or wallets?")
+            t = Command(self.state, 'com_int', "Properties, positions, wallets, or chances?")
             if t.text in ('property', 'properties', 'wallet', 'wallets'):
                 c = Command(self.state, 'com_int', "Of yourself or all players? Enter either 'self' or 'all'")
                 if c.text == 'self':
@@ -37,6 +38,9 @@ class Command:
             elif t.text in ('position', 'positions', 'location', 'locations'):
                 for p in self.state.players:
                     advprint(f"{p} is on {self.state.board[p.loc]}\n")
+            elif t.text in ('chance', 'chances', 'odds'):
+                from monopoly_winprob import estimator, describe
+                advprint(describe(estimator.estimate(self.state)))
             else:
                 raise ValueError('unrecognized command')
         elif self.type == 'choice':
@@ -110,7 +114,7 @@ class Command:
                         return 'loop'
                 elif self.text == 'debug':
                     while True:
-                        x = input('what to debug?').strip().split(maxsplit=1)
+                        x = inputs.read('what to debug?').strip().split(maxsplit=1)
                         if x[0] == 'player':
                             for i in self.state.players:
                                 if i.name.lower() == x[1].lower():
@@ -126,7 +130,7 @@ class Command:
                             continue
                     return 'loop'
                 elif self.text == 'unmortgage':
-                    x = input("What property would you like to unmortgage?")
+                    x = inputs.read("What property would you like to unmortgage?")
                     prop = self.state.find_prop(x)
                     self.state.get_mortgaged_prop(self.state.cp, prop)
                     new = Command(self.state, self.type, self.prompt)
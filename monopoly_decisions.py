@@ -0,0 +1,183 @@
+""" A memo of ComputerPlayer's decisions, keyed by the state they read.
+
+Over a long game, computer players keep working out the same answers from the
+same holdings: what a property is worth to them at auction, what a trade would
+do to their rent, what order to pay off mortgages in. Each decision here is
+keyed by only the features it reads, like the board index, buildings and
+mortgage of every property in the sets involved, which Player keeps as a
+running hash per set. Once any of those change, the key changes with them,
+so a stale answer is never used and nothing has to be cleared by hand.
+
+Keys hold no players or games, only board positions and numbers, so one cache
+is shared by every game in the process, and policies with different weights
+get different keys. Old entries are dropped, least recently used first, once
+the cache is full.
+"""
+from collections import OrderedDict
+from monopoly_valuation import get_valuation
+
+class DecisionCache:
+    """ A size-capped least-recently-used memo with hit and miss counts.
+
+    Attributes:
+        maxsize (int): the most entries to keep
+        entries (OrderedDict): keys and their answers, least recently used first
+        hits (dict): decision names and how many times an answer was reused
+        misses (dict): decision names and how many times one was worked out
+        evictions (int): how many entries were dropped to make room
+
+    Each OrderedDict operation is atomic, so threads can share the cache
+    without a lock. at worst, two threads both work out the same answer, or
+    a count is off by one.
+    """
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+    def get(self, kind, key, compute):
+        """ Look up an answer, working it out if it isn't stored.
+
+        Arguments:
+            kind (str): the decision's name, for the statistics
+            key (tuple): the decision's name and the features it reads
+            compute (function): works out the answer, with no arguments
+
+        Side effects:
+            stores the answer, dropping the least recently used one if the
+                cache is full, and counts the hit or miss
+
+        Returns:
+            the answer
+        """
+        entries = self.entries
+        try:
+            value = entries[key]
+            entries.move_to_end(key)
+        except KeyError:
+            value = compute()
+            self.store(kind, key, value)
+            return value
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+        return value
+
+    def lookup(self, kind, key):
+        """ Look up an answer, without working it out if it isn't stored.
+
+        Arguments:
+            kind (str): the decision's name, for the statistics
+            key (tuple): the decision's name and the features it reads
+
+        Side effects:
+            counts a hit, if the answer is stored
+
+        Returns:
+            the answer, or None if it isn't stored
+        """
+        entries = self.entries
+        try:
+            value = entries[key]
+            entries.move_to_end(key)
+        except KeyError:
+            return None
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+        return value
+
+    def store(self, kind, key, value):
+        """ Store an answer that had to be worked out.
+
+        Arguments:
+            kind (str): the decision's name, for the statistics
+            key (tuple): the decision's name and the features it reads
+            value: the answer
+
+        Side effects:
+            stores the answer, dropping the least recently used one if the
+                cache is full, and counts a miss
+        """
+        entries = self.entries
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+        entries[key] = value
+        if len(entries) > self.maxsize:
+            try:
+                entries.popitem(last=False)
+                self.evictions += 1
+            except KeyError:
+                pass
+
+    def clear(self):
+        """ Drop every entry and reset the statistics.
+        """
+        self.entries.clear()
+        self.hits.clear()
+        self.misses.clear()
+        self.evictions = 0
+
+    def stats(self):
+        """ Returns:
+            dict: for each decision, its hits, misses, and hit rate, plus the
+                cache's size and evictions
+        """
+        report = {}
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            report[kind] = {'hits': hits, 'misses': misses, 'hit rate': hits / (hits + misses)}
+        report['size'] = len(self.entries)
+        report['evictions'] = self.evictions
+        return report
+
+decisions = DecisionCache()
+
+def holdings(player, sets):
+    """ The features of a player's holdings in some sets.
+
+    Arguments:
+        player (Player): the player
+        sets (iterable): the names of the sets
+
+    Returns:
+        tuple: for each set, in order, the player's running hash of which
+            properties they have in it, with their buildings and mortgages
+    """
+    holding = player.holding
+    if len(sets) == 1:
+        for s in sets:
+            return (holding[s],)
+    return tuple([holding[s] for s in sorted(sets)])
+
+def rent_change(player, horizon, gained=(), given=()):
+    """ Valuation.change, memoized.
+
+    Arguments:
+        player (Player): the player
+        horizon (int): the valuation horizon
+        gained (list): the properties the player would get
+        given (list): the properties the player would give up
+
+    Returns:
+        float: the change in expected rent over the horizon
+    """
+    opponents = player.opponents()
+    sets = {p.set for p in gained}.union([p.set for p in given])
+    key = ('rent_change', horizon, opponents, tuple([(p.loc, p.bnum, p.mstatus) for p in gained]),
+           tuple([p.loc for p in given]), holdings(player, sets))
+    return decisions.get('rent_change', key,
+                         lambda: get_valuation(horizon=horizon).change(player, opponents, gained=gained, given=given))
+
+def unmortgage_order(player, mlist):
+    """ The order a computer player pays off its mortgages in, memoized.
+
+    Arguments:
+        player (Player): the player
+        mlist (list): their mortgaged properties, in the policy's order
+
+    Returns:
+        list: the same properties, sorted
+    """
+    sets = {p.set for p in mlist}
+    key = ('unmortgage_order', tuple([(p.loc, p.pcount) for p in mlist]), holdings(player, sets))
+    board = player.game.board
+    locs = decisions.get('unmortgage_order', key, lambda: [p.loc for p in sorted(mlist)])
+    return [board[loc] for loc in locs]
@@ -0,0 +1,430 @@
+""" Searches the last phase of a two-player game for Jail, building, and
+mortgage decisions.
+
+Once only two players are left, almost every property is owned, and nothing
+has changed hands for a while, what's left of the game is a race: each player
+pays the other rent until one of them can't. That's small enough to search
+with expectimax. Each turn is a chance node over where the mover ends up, with
+the probabilities of the dice, doubles, and movement cards from
+monopoly_markov, and the rent they pay on the way. A player who starts a turn
+in Jail first picks between paying and rolling, each side picking whatever
+gives them the best chance of winning. Whoever can't cover their rent, even by
+selling and mortgaging everything, is bankrupt and the search stops there.
+Past the depth limit, a position is valued by the chance of winning a random
+walk between the two players' worths, with the rent each side collects per
+turn as its drift and spread.
+
+Positions are memoized on everything the search reads, in a size-capped cache
+of their own. Decisions themselves aren't: the exact game rarely comes up
+twice, and a repeated decision finds its positions in the memo. The search
+deepens one turn at a time, up to the depth limit or the decision's limits
+from monopoly_budget, whichever comes first, and answers from the deepest
+search it finished. If not even one turn finished, the player falls back to
+its heuristic.
+
+The search leaves out salary, taxes, and money cards, which both players meet
+alike, and money raised to pay rent partway through the search doesn't lower
+the debtor's rents. Building, selling, and mortgaging are only decided at the
+root.
+
+The solver is off by default (depth 0). Against the heuristics it hasn't
+yet won clearly more games, so players only switch to it once a depth is set.
+"""
+from functools import lru_cache
+from math import exp, expm1
+from monopoly_budget import current, Expired
+from monopoly_building import plan as plan_builds, reserve
+from monopoly_decisions import DecisionCache
+from monopoly_liquidation import holdings, solve, greedy
+from monopoly_markov import MarkovChain
+from monopoly_property import Railroad, Utility
+from monopoly_valuation import get_valuation, average_roll
+
+# the fine to leave Jail
+fine = 50
+chains = {}
+
+def chain(jail):
+    """ Returns:
+        MarkovChain: the turn-to-turn chain for a way of leaving Jail, built
+            once
+    """
+    if jail not in chains:
+        chains[jail] = MarkovChain(jail)
+    return chains[jail]
+
+@lru_cache(maxsize=4096)
+def outcomes(rents, jail, start):
+    """ Where a turn can end, and the rent paid on the way.
+
+    Arguments:
+        rents (tuple): the rent the other player charges on each space
+        jail (str): how the mover leaves Jail, if they're in it. either 'pay'
+            or 'roll'
+        start (int or tuple): the space the turn starts on, or ('jail', turns
+            served)
+
+    Returns:
+        list: tuples of (end state, probability, rent) for every end state
+        list: tuples of (rent, probability), for when only the rent matters
+    """
+    ends, visits = chain(jail).turn_from(start)
+    expected = sum([v * r for v, r in zip(visits, rents) if r])
+    ending = sum([p * rents[e] for e, p in ends.items() if not isinstance(e, tuple)])
+    # rent paid on the way to the end, after doubles or cards, is spread over
+    # every outcome, so each turn's expected rent is exact
+    extra = expected - ending
+    spread = [(e, p, (0 if isinstance(e, tuple) else rents[e]) + extra) for e, p in ends.items()]
+    grouped = {}
+    for _, p, r in spread:
+        grouped[r] = grouped.get(r, 0) + p
+    return spread, list(grouped.items())
+
+@lru_cache(maxsize=1024)
+def flow(rents):
+    """ Returns:
+        tuple: the mean and mean square of the rent some rents bring in per
+            opponent turn, over the long run
+    """
+    landings = get_valuation().landings
+    return (sum([l * r for l, r in zip(landings, rents) if r]),
+            sum([l * r * r for l, r in zip(landings, rents) if r]))
+
+def winning(a, b, drift, variance):
+    """ The chance a random walk starting at 0 reaches b before -a.
+
+    Arguments:
+        a (float): how far it is from losing
+        b (float): how far it is from winning
+        drift (float): its average step
+        variance (float): the variance of its steps
+
+    Returns:
+        float: the chance
+    """
+    if a <= 0:
+        return 0.0
+    if b <= 0:
+        return 1.0
+    if not variance or abs(drift) * (a + b) < 1e-9 * variance:
+        return a / (a + b)
+    k = 2 * drift / variance
+    if k > 0:
+        return expm1(-k * a) / expm1(-k * (a + b))
+    return exp(k * b) * expm1(k * a) / expm1(k * (a + b))
+
+def rent(prop, bnum, mstatus):
+    """ What a property would charge with some buildings and mortgage, for
+        its current owner.
+
+    Returns:
+        int: the rent. for utilities, at the average roll
+    """
+    if mstatus:
+        return 0
+    if isinstance(prop, Utility):
+        return prop.rent[prop.pcount - 1] * average_roll
+    if isinstance(prop, Railroad):
+        return prop.rent[prop.pcount - 1]
+    if prop.pcount == prop.stot and not bnum:
+        return 2 * prop.rent[0]
+    return prop.rent[bnum]
+
+def start_state(player, deciding=False):
+    """ Returns:
+        int or tuple: where a player starts their next turn, as a state of
+            monopoly_markov. deciding is whether they're already in the middle
+            of a turn in Jail, which has been counted
+    """
+    if player.inJail:
+        return ('jail', player.jailTurn - deciding)
+    return player.loc
+
+class Endgame:
+    """ Searches two-player endgames.
+
+    Attributes:
+        depth (int): the most turns to search ahead. 0 turns the solver off
+        max_unowned (int): the most unowned properties a game can have left
+            for the solver to take over
+        stable_turns (int): how many turns nothing can have changed hands
+        quantum (int): cash is rounded to a multiple of this, so positions
+            that differ by less share a memo entry
+        table (DecisionCache): memoized positions
+    """
+    def __init__(self, depth=0, max_unowned=2, stable_turns=20, quantum=10, maxsize=50000):
+        self.depth = depth
+        self.max_unowned = max_unowned
+        self.stable_turns = stable_turns
+        self.quantum = quantum
+        self.table = DecisionCache(maxsize)
+
+    def opponent(self, player):
+        """ Returns:
+            Player: the other player left in a two-player game, or None if
+                there isn't exactly one
+        """
+        game = player.game
+        left = [p for p in game.players if p is not player and p not in game.plost]
+        return left[0] if len(left) == 1 else None
+
+    def qualifies(self, player):
+        """ Whether the solver should make a player's decisions: the solver is
+            on, only one opponent is left, at most max_unowned properties are
+            unowned, and no property has changed hands in stable_turns turns.
+
+        Side effects:
+            remembers who owned what, and since when, in the player
+
+        Returns:
+            bool: whether the position qualifies
+        """
+        if not self.depth or player in player.game.plost or self.opponent(player) is None:
+            return False
+        game = player.game
+        owners = tuple([getattr(s.owner, 'name', None) for s in game.board.values() if not isinstance(s, str)])
+        if owners.count(None) > self.max_unowned:
+            return False
+        # players switched to this class after they were made don't have it yet
+        seen, since = player.__dict__.get('owners', (None, 0))
+        if seen != owners:
+            player.owners = (owners, game.turntotal)
+            return not self.stable_turns
+        return game.turntotal - since >= self.stable_turns
+
+    def side(self, player, start, cash=None, changes=()):
+        """ What the search needs to know about one player.
+
+        Arguments:
+            player (Player): the player
+            start (int or tuple): where they start their next turn
+            cash (int, None): their cash. if None, their wallet
+            changes (dict): board indices and the (buildings, mortgaged) to
+                use for them instead of the property's own
+
+        Returns:
+            tuple: their start, cash, what they could raise from their
+                properties, and the rent they charge on each space
+        """
+        changes = dict(changes)
+        rents = [0] * 40
+        liquid = 0
+        for props in player.deeds.values():
+            for p in props:
+                bnum, mstatus = changes.get(p.loc, (p.bnum, p.mstatus))
+                rents[p.loc] = rent(p, bnum, mstatus)
+                if bnum:
+                    liquid += bnum * (p.bprice // 2)
+                if not mstatus:
+                    liquid += p.mprice
+        cash = player.wallet if cash is None else cash
+        return start, self.round(cash), liquid, tuple(rents)
+
+    def round(self, cash):
+        """ Returns:
+            int: cash rounded to a multiple of the quantum
+        """
+        return int(round(cash / self.quantum)) * self.quantum
+
+    def leaf(self, sides):
+        """ Returns:
+            float: the first player's chance of winning, past the depth limit
+        """
+        me, them = sides
+        mine, theirs = flow(me[3]), flow(them[3])
+        return winning(me[1] + me[2], them[1] + them[2], mine[0] - theirs[0], mine[1] + theirs[1])
+
+    def turn(self, sides, mover, depth, deadline):
+        """ Value a position, memoized.
+
+        Arguments:
+            sides (tuple): both players' side(), the deciding player first
+            mover (int): whose turn it is, as an index into sides
+            depth (int): how many more turns to search
+            deadline (Deadline): when to give up
+
+        Raises:
+            Expired: if the deadline runs out
+
+        Returns:
+            float: the deciding player's chance of winning
+        """
+        if not depth:
+            return self.leaf(sides)
+        def compute():
+            start = sides[mover][0]
+            if not isinstance(start, tuple):
+                return self.roll(sides, mover, depth, deadline, 'pay', 0)
+            values = (self.roll(sides, mover, depth, deadline, 'pay', fine),
+                      self.roll(sides, mover, depth, deadline, 'roll', fine if start[1] == 2 else 0))
+            return max(values) if mover == 0 else min(values)
+        return self.table.get('endgame.turn', ('turn', sides, mover, depth), compute)
+
+    def roll(self, sides, mover, depth, deadline, jail, fee):
+        """ Value a turn, as a chance node over where it ends.
+
+        Arguments:
+            sides, mover, depth, deadline: as in turn()
+            jail (str): how the mover leaves Jail, if they're in it
+            fee (int): what the mover pays the bank first, like the fine
+
+        Raises:
+            Expired: if the deadline runs out
+
+        Returns:
+            float: the deciding player's chance of winning
+        """
+        deadline.tick()
+        if deadline.expired():
+            raise Expired()
+        start, cash, liquid, rents = sides[mover]
+        other = sides[1 - mover]
+        spread, grouped = outcomes(other[3], jail, start)
+        lost = 0.0 if mover == 0 else 1.0
+        total = 0.0
+        if depth == 1:
+            # where the mover ends up only matters to later turns
+            for r, p in grouped:
+                left = cash - fee - r
+                if left + liquid < 0:
+                    total += p * lost
+                    continue
+                moved = (start, self.round(left), liquid, rents)
+                paid = (other[0], self.round(other[1] + r), other[2], other[3])
+                total += p * self.leaf((moved, paid) if mover == 0 else (paid, moved))
+            return total
+        for end, p, r in spread:
+            left = cash - fee - r
+            if left + liquid < 0:
+                total += p * lost
+                continue
+            moved = (end, self.round(left), liquid, rents)
+            paid = (other[0], self.round(other[1] + r), other[2], other[3])
+            total += p * self.turn((moved, paid) if mover == 0 else (paid, moved), 1 - mover, depth - 1, deadline)
+        return total
+
+    def pick(self, options):
+        """ Search every option, one more turn ahead at a time.
+
+        Arguments:
+            options (list): tuples of (choice, sides, mover, jail, fee). jail
+                and fee are for a first turn that has already started in Jail,
+                or None and 0
+
+        Returns:
+            the best choice from the deepest search that finished, or None
+                if none did or there are no options. with only one option,
+                it's picked without searching
+        """
+        deadline = current()
+        best = None
+        if len(options) < 2:
+            return options[0][0] if options else None
+        for depth in range(1, self.depth + 1):
+            values = []
+            try:
+                for choice, sides, mover, jail, fee in options:
+                    if jail is None:
+                        values.append(self.turn(sides, mover, depth, deadline))
+                    else:
+                        values.append(self.roll(sides, mover, depth, deadline, jail, fee))
+            except Expired:
+                return best
+            best = options[values.index(max(values))][0]
+        return best
+
+    def jail(self, player):
+        """ Decide how a player leaves Jail, partway through a turn there.
+
+        Returns:
+            str: 'roll', 'pay', 'chance', or 'cc', or None if the search
+                didn't finish a turn
+        """
+        them = self.opponent(player)
+        me = self.side(player, start_state(player, deciding=True))
+        sides = (me, self.side(them, start_state(them)))
+        options = []
+        for card in ('chance', 'cc'):
+            if getattr(player, card):
+                options.append((card, sides, 0, 'pay', 0))
+        if player.wallet >= fine:
+            options.append(('pay', sides, 0, 'pay', fine))
+        options.append(('roll', sides, 0, 'roll', 0))
+        return self.pick(options)
+
+    def build(self, player):
+        """ Decide what a player builds at the start of their turn.
+
+        Returns:
+            list: the properties to build one building on, in order, or None
+                if the search didn't finish a turn
+        """
+        them = self.opponent(player)
+        board = player.game.board
+        usual = player.wallet - reserve(player, player.policy.build_reserve)
+        plans = {}
+        for budget in [usual] + [player.wallet * k // 8 for k in range(9)]:
+            steps = tuple([p.loc for p in plan_builds(player, budget)])
+            if steps in plans:
+                continue
+            changes = {}
+            for loc in steps:
+                prop = board[loc]
+                bnum, mstatus = changes.get(loc, (prop.bnum, prop.mstatus))
+                changes[loc] = (bnum + 1, mstatus)
+            cash = player.wallet - sum([board[loc].bprice for loc in steps])
+            plans[steps] = (self.side(player, start_state(player), cash, changes), self.side(them, start_state(them)))
+        steps = self.pick([(steps, sides, 0, None, 0) for steps, sides in plans.items()])
+        return None if steps is None else [board[loc] for loc in steps]
+
+    def liquidate(self, player, creditor, debt):
+        """ Decide how a player raises money for a debt, by comparing the
+            cheapest plan with the cheapest that spares each set in turn.
+
+        Arguments:
+            player (Player): the player raising money
+            creditor (Player, str, None): who they owe
+            debt (int): how much they owe
+
+        Returns:
+            list: ('sell' or 'mortgage', Property) pairs, as from
+                monopoly_liquidation.plan(), or None if the search didn't
+                finish a turn or there's no plan
+        """
+        need = debt - player.wallet
+        if need <= 0:
+            return []
+        them = self.opponent(player)
+        board = player.game.board
+        held = holdings(player)
+        plans = []
+        tries = [lambda: solve(held, need, 1), lambda: greedy(held, need, 1)]
+        for i in range(len(held)):
+            tries.append(lambda i=i: solve(held[:i] + held[i + 1:], need, 1))
+        for attempt in tries:
+            try:
+                actions = attempt()
+            except Expired:
+                continue
+            if actions is not None and actions not in plans:
+                plans.append(actions)
+        options = []
+        for actions in plans:
+            changes, raised = {}, 0
+            for action, loc in actions:
+                prop = board[loc]
+                bnum, mstatus = changes.get(loc, (prop.bnum, prop.mstatus))
+                if action == 'sell':
+                    changes[loc] = (bnum - 1, mstatus)
+                    raised += prop.bprice // 2
+                else:
+                    changes[loc] = (bnum, True)
+                    raised += prop.mprice
+            paid = debt if creditor is them else 0
+            sides = (self.side(player, start_state(player), player.wallet + raised - debt, changes),
+                     self.side(them, start_state(them), them.wallet + paid))
+            options.append((actions, sides, 1, None, 0))
+        actions = self.pick(options)
+        return None if actions is None else [(action, board[loc]) for action, loc in actions]
+
+endgame = Endgame()
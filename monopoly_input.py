@@ -0,0 +1,115 @@
+""" A threaded input layer, for reading player input with a deadline.
+
+Until something needs a deadline, reads go straight to input(). After that,
+a background thread owns stdin and every line goes through one queue, so a
+timed read never leaves a stray input() call waiting on the terminal. Other
+sources, like a network handler for a remote seat, can put lines on the same
+queue with submit().
+"""
+from queue import Queue, Empty
+from threading import Lock, Thread
+from time import monotonic
+import sys
+
+class InputLayer:
+    """ Lines of player input, from stdin and anywhere else.
+
+    Attributes:
+        lines (Queue): lines waiting to be read. None marks the end of stdin
+        reader (Thread, None): the thread reading stdin, once it's started
+        lock (Lock): guards starting the reader
+    """
+    def __init__(self):
+        self.lines = Queue()
+        self.reader = None
+        self.lock = Lock()
+
+    def start(self):
+        """ Start reading stdin in the background, if it isn't already.
+
+        Side effects:
+            starts a daemon thread that puts each line of stdin on self.lines
+        """
+        with self.lock:
+            if self.reader is not None:
+                return
+            def loop():
+                for line in sys.stdin:
+                    self.lines.put(line.rstrip('\n'))
+                self.lines.put(None)
+            self.reader = Thread(target=loop, name='input-reader', daemon=True)
+            self.reader.start()
+
+    def submit(self, line):
+        """ Add a line of input from somewhere other than stdin.
+
+        Arguments:
+            line (str): the line
+        """
+        self.lines.put(line)
+
+    def read(self, prompt='', timeout=None):
+        """ Read a line, like input().
+
+        Arguments:
+            prompt (str): what to print first
+            timeout (float, None): how many seconds to wait. if None, waits
+                as long as it takes
+
+        Side effects:
+            prints the prompt, and may start the reader
+
+        Raises:
+            EOFError: if stdin has ended
+
+        Returns:
+            str: the line, or None if the timeout ran out first
+        """
+        if self.reader is None and timeout is None:
+            return input(prompt)
+        self.start()
+        print(prompt, end='', flush=True)
+        try:
+            line = self.lines.get(timeout=timeout)
+        except Empty:
+            return None
+        if line is None:
+            # leave the marker for anyone else reading
+            self.lines.put(None)
+            raise EOFError
+        return line
+
+    def collect(self, prompt, timeout, done=lambda lines: False):
+        """ Gather lines until a deadline.
+
+        Arguments:
+            prompt (str): what to print first
+            timeout (float): how many seconds to collect for
+            done (function): given the lines so far, returns True to stop
+                early. defaults to never stopping early
+
+        Side effects:
+            prints the prompt, and starts the reader
+
+        Returns:
+            list: the lines, in the order they arrived
+        """
+        deadline = monotonic() + timeout
+        lines = []
+        print(prompt, end='', flush=True)
+        self.start()
+        while not done(lines):
+            left = deadline - monotonic()
+            if left <= 0:
+                break
+            try:
+                line = self.lines.get(timeout=left)
+            except Empty:
+                break
+            if line is None:
+                self.lines.put(None)
+                break
+            lines.append(line)
+        return lines
+
+inputs = InputLayer()
@@ -0,0 +1,193 @@
+""" Plans the cheapest way for a player to raise money.
+
+A plan is a list of house sales and mortgages. Its cost is the expected rent
+the player gives up over the valuation horizon, plus what the money costs to
+get back later: the half of each building's price that isn't refunded, and
+the 10% interest to unmortgage. Each set's options are listed on their own,
+selling houses evenly and only mortgaging once the set has no buildings. Then
+a knapsack over the sets picks the cheapest combination that covers the debt.
+
+Plans are memoized by the player's holdings and how much they need, so asking
+again on an unchanged board doesn't search again. If the knapsack runs past
+the liquidate decision's limits (see monopoly_budget), the plan falls back to
+a greedy one, which takes the options that give up the least per dollar.
+"""
+from functools import lru_cache
+from itertools import combinations
+from monopoly_budget import current, Expired
+from monopoly_property import board_spaces
+from monopoly_valuation import get_valuation
+
+def holdings(player):
+    """ A hashable snapshot of everything the planner looks at.
+
+    Arguments:
+        player (Player): the player raising money
+
+    Returns:
+        tuple: for each set the player owns anything in, a tuple of
+            (board index, buildings, mortgaged) for each property
+    """
+    return tuple(tuple((p.loc, p.bnum, p.mstatus) for p in props)
+                 for props in player.deeds.values() if props)
+
+def set_options(props, opponents):
+    """ Every sensible way to raise money from one set.
+
+    Arguments:
+        props (tuple): (board index, buildings, mortgaged) for each property
+            the player owns in the set
+        opponents (int): how many opponents might land on the properties
+
+    Returns:
+        list: tuples of (cash raised, cost, actions), leaving out any option
+            that raises less for more. actions are ('sell' or 'mortgage',
+            board index) pairs, in the order they have to happen
+    """
+    valuation = get_valuation()
+    scale = opponents * valuation.horizon
+    count = len(props)
+    def rent(loc, bnum):
+        return valuation.rents[loc][valuation.level(board_spaces[loc], count, bnum)] * scale
+    bnums = {loc: bnum for loc, bnum, _ in props}
+    options = [(0, 0, ())]
+    cash, cost, actions = 0, 0, ()
+    while any(bnums.values()):
+        # houses come off the tallest properties first
+        tallest = max(bnums.values())
+        loc = min((l for l in bnums if bnums[l] == tallest), key=lambda l: rent(l, tallest) - rent(l, tallest - 1))
+        bprice = board_spaces[loc].bprice
+        cash += bprice // 2
+        cost += rent(loc, tallest) - rent(loc, tallest - 1) + bprice - bprice // 2
+        bnums[loc] -= 1
+        actions += (('sell', loc),)
+        options.append((cash, cost, actions))
+    unmortgaged = [loc for loc, _, mstatus in props if not mstatus]
+    for n in range(1, len(unmortgaged) + 1):
+        for chosen in combinations(unmortgaged, n):
+            mcash, mcost = cash, cost
+            for loc in chosen:
+                mprice = board_spaces[loc].mprice
+                mcash += mprice
+                mcost += rent(loc, 0) + mprice // 10
+            options.append((mcash, mcost, actions + tuple(('mortgage', loc) for loc in chosen)))
+    options.sort(key=lambda o: (-o[0], o[1]))
+    frontier = []
+    for option in options:
+        if not frontier or option[1] < frontier[-1][1]:
+            frontier.append(option)
+    return frontier[::-1]
+
+# debts rarely come up twice, so only the latest answers are kept
+@lru_cache(maxsize=64)
+def solve(held, need, opponents):
+    """ Find the cheapest combination of options across sets.
+
+    Arguments:
+        held (tuple): the player's holdings, from holdings()
+        need (int): how much money has to be raised
+        opponents (int): how many opponents might land on the properties
+
+    Returns:
+        tuple: the actions to take, or None if even selling and mortgaging
+            everything wouldn't raise enough
+    """
+    options = [set_options(props, opponents) for props in held]
+    most = [0] * (len(options) + 1)
+    for i in range(len(options) - 1, -1, -1):
+        most[i] = most[i + 1] + options[i][-1][0]
+    memo = {}
+    deadline = current()
+    def best(i, need):
+        if need <= 0:
+            return 0, ()
+        if most[i] < need:
+            return None
+        key = (i, need)
+        if key not in memo:
+            deadline.tick()
+            if deadline.expired():
+                raise Expired()
+            found = None
+            for cash, cost, actions in options[i]:
+                rest = best(i + 1, need - cash)
+                if rest is not None and (found is None or cost + rest[0] < found[0]):
+                    found = cost + rest[0], actions + rest[1]
+                if cash >= need:
+                    # the rest of the options only raise more than is needed
+                    break
+            memo[key] = found
+        return memo[key]
+    found = best(0, need)
+    return None if found is None else found[1]
+
+def greedy(held, need, opponents):
+    """ Find a cheap combination of options across sets, quickly: keep moving
+        one set on to whichever of its options adds the least cost per extra
+        dollar, until there's enough.
+
+    Arguments:
+        held, need, opponents: as in solve()
+
+    Returns:
+        tuple: the actions to take, or None if even selling and mortgaging
+            everything wouldn't raise enough
+    """
+    options = [set_options(props, opponents) for props in held]
+    chosen = [0] * len(options)
+    raised = 0
+    while raised < need:
+        step = None
+        for i, opts in enumerate(options):
+            cash, cost, _ = opts[chosen[i]]
+            for j in range(chosen[i] + 1, len(opts)):
+                ratio = (opts[j][1] - cost) / (opts[j][0] - cash)
+                if step is None or ratio < step[0]:
+                    step = ratio, i, j
+        if step is None:
+            return None
+        _, i, j = step
+        raised += options[i][j][0] - options[i][chosen[i]][0]
+        chosen[i] = j
+    return tuple(action for opts, j in zip(options, chosen) for action in opts[j][2])
+
+def plan(player, debt):
+    """ Plan how a player can raise enough to pay a debt.
+
+    Arguments:
+        player (Player): the player raising money
+        debt (int): how much they owe
+
+    Returns:
+        list: ('sell' or 'mortgage', Property) pairs, in the order to carry
+            them out. empty if the player can already pay, or None if they
+            can't raise enough
+    """
+    need = debt - player.wallet
+    if need <= 0:
+        return []
+    held, opponents = holdings(player), max(player.opponents(), 1)
+    try:
+        actions = solve(held, need, opponents)
+    except Expired:
+        actions = greedy(held, need, opponents)
+    if actions is None:
+        return None
+    return [(action, player.game.board[loc]) for action, loc in actions]
+
+def describe(steps):
+    """ Put a plan into words.
+
+    Arguments:
+        steps (list): a plan, from plan()
+
+    Returns:
+        str: one step per line
+    """
+    lines = []
+    for action, prop in steps:
+        if action == 'sell':
+            lines.append(f"sell a house on {prop} for ${prop.bprice // 2}")
+        else:
+            lines.append(f"mortgage {prop} for ${prop.mprice}")
+    return '\n'.join(lines)
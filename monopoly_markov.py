@@ -0,0 +1,270 @@
+""" Exact landing probabilities, from a Markov chain over whole turns.
+
+A turn starts either on one of the 40 spaces, or in Jail after 0, 1, or 2
+turns there. The chain covers doubles, three doubles to Jail, Go To Jail,
+both ways of leaving Jail, and the movement cards. Cards are treated as drawn
+at random from a full deck, so the chain doesn't need to remember the order
+of each deck.
+
+Solved tables are cached, both in memory and in a JSON file keyed by the
+board and the rules, so they only have to be solved once.
+
+Usage:
+
+    python monopoly_markov.py [--jail pay] [--no-cards]
+"""
+from argparse import ArgumentParser
+from hashlib import sha1
+from monopoly_cards_exp import chance, community_chest, chance_destination, cc_destination, \
+    in_jail, chance_spaces, cc_spaces
+from monopoly_property import board_spaces
+import json
+import os
+
+# dice totals and their probability of being rolled as doubles or not
+dice = [(a + b, a == b, 1 / 36) for a in range(1, 7) for b in range(1, 7)]
+# the states at the start of a turn: the 40 spaces, then Jail after 0, 1, or 2 turns
+states = list(range(40)) + [('jail', 0), ('jail', 1), ('jail', 2)]
+index = {s: i for i, s in enumerate(states)}
+default_cache = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'markov_cache.json')
+
+class MarkovChain:
+    """ The turn-to-turn Markov chain for one player's movement.
+
+    Attributes:
+        jail (str): how the player leaves Jail. either 'pay', to pay the fine
+            straight away, or 'roll', to roll for doubles until the third turn
+        cards (bool): whether Chance and Community Chest cards move the player
+        matrix (list): the probability of ending a turn in each state (column),
+            given the state it started in (row)
+        visits (list): the expected number of landings on each of the 40
+            spaces during a turn, given the state it started in (row)
+    """
+    def __init__(self, jail='pay', cards=True):
+        """ Build the chain.
+
+        Arguments:
+            jail (str): either 'pay' or 'roll'. defaults to 'pay'
+            cards (bool): whether to include the movement cards. defaults to True
+
+        Side effects:
+            sets attributes, and builds the transition matrix
+        """
+        if jail not in ('pay', 'roll'):
+            raise ValueError("jail must be either 'pay' or 'roll'")
+        self.jail = jail
+        self.cards = cards
+        self.memo = {}
+        self.matrix = []
+        self.visits = []
+        for s in states:
+            ends, visits = self.turn_from(s)
+            row = [0] * len(states)
+            for e, p in ends.items():
+                row[index[e]] += p
+            self.matrix.append(row)
+            self.visits.append(visits)
+
+    def land(self, loc):
+        """ Where a player ends up after landing on a space.
+
+        Arguments:
+            loc (int): the space landed on
+
+        Returns:
+            list: tuples of (space, probability, extra landings). the space is
+                in_jail if the player was sent to Jail, and the extra landings
+                are the spaces a card moved them to
+        """
+        if loc == 30:
+            return [(in_jail, 1, ())]
+        if self.cards and loc in chance_spaces:
+            outcomes = []
+            for c in chance:
+                dest = chance_destination(c, loc)
+                if dest in (loc, in_jail):
+                    outcomes.append((dest, 1 / len(chance), ()))
+                else:
+                    for d, p, extra in self.land(dest):
+                        outcomes.append((d, p / len(chance), (dest,) + extra))
+            return outcomes
+        if self.cards and loc in cc_spaces:
+            outcomes = []
+            for c in community_chest:
+                dest = cc_destination(c, loc)
+                extra = () if dest in (loc, in_jail) else (dest,)
+                outcomes.append((dest, 1 / len(community_chest), extra))
+            return outcomes
+        return [(loc, 1, ())]
+
+    def roll_from(self, loc, doubles):
+        """ The rest of a turn, from a space, after some doubles.
+
+        Arguments:
+            loc (int): the space the player is rolling from
+            doubles (int): how many doubles they've already rolled this turn
+
+        Returns:
+            dict: end states and their probabilities
+            list: the expected landings on each space for the rest of the turn
+        """
+        key = (loc, doubles)
+        if key in self.memo:
+            return self.memo[key]
+        ends = {}
+        visits = [0] * 40
+        for roll, dbl, p in dice:
+            if dbl and doubles == 2:
+                ends[('jail', 0)] = ends.get(('jail', 0), 0) + p
+                continue
+            self.move(loc, roll, dbl, doubles + dbl, p, ends, visits)
+        self.memo[key] = ends, visits
+        return ends, visits
+
+    def move(self, loc, roll, again, doubles, p, ends, visits):
+        """ Add the outcomes of one roll to a turn's totals.
+
+        Arguments:
+            loc (int): the space the player is rolling from
+            roll (int): the total rolled
+            again (bool): whether the player rolls again after this move
+            doubles (int): how many doubles they'll have rolled this turn
+            p (float): the probability of this roll
+            ends (dict): end states and probabilities. updated in place
+            visits (list): expected landings per space. updated in place
+        """
+        new = (loc + roll) % 40
+        visits[new] += p
+        for dest, q, extra in self.land(new):
+            for e in extra:
+                visits[e] += p * q
+            if dest == in_jail:
+                ends[('jail', 0)] = ends.get(('jail', 0), 0) + p * q
+            elif again:
+                rest, rvisits = self.roll_from(dest, doubles)
+                for e, r in rest.items():
+                    ends[e] = ends.get(e, 0) + p * q * r
+                for i in range(40):
+                    visits[i] += p * q * rvisits[i]
+            else:
+                ends[dest] = ends.get(dest, 0) + p * q
+
+    def turn_from(self, state):
+        """ A whole turn, from a state.
+
+        Arguments:
+            state (int or tuple): a space, or ('jail', turns served)
+
+        Returns:
+            dict: end states and their probabilities
+            list: the expected landings on each space during the turn
+        """
+        if not isinstance(state, tuple):
+            return self.roll_from(state, 0)
+        served = state[1] + 1
+        ends = {}
+        visits = [0] * 40
+        for roll, dbl, p in dice:
+            if self.jail == 'pay' or served == 3:
+                self.move(10, roll, dbl, int(dbl), p, ends, visits)
+            elif dbl:
+                self.move(10, roll, False, 0, p, ends, visits)
+            else:
+                ends[('jail', served)] = ends.get(('jail', served), 0) + p
+        return ends, visits
+
+    def stationary(self):
+        """ Solve for the long-run share of turns starting in each state.
+
+        Returns:
+            list: the stationary distribution over states
+        """
+        n = len(states)
+        # solve pi (P - I) = 0 with sum(pi) = 1, as a linear system A x = b
+        a = [[self.matrix[j][i] - (i == j) for j in range(n)] for i in range(n)]
+        a[-1] = [1] * n
+        b = [0] * (n - 1) + [1]
+        for col in range(n):
+            pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+            a[col], a[pivot] = a[pivot], a[col]
+            b[col], b[pivot] = b[pivot], b[col]
+            for r in range(n):
+                if r != col and a[r][col]:
+                    f = a[r][col] / a[col][col]
+                    for c in range(col, n):
+                        a[r][c] -= f * a[col][c]
+                    b[r] -= f * b[col]
+        return [b[i] / a[i][i] for i in range(n)]
+
+    def solve(self):
+        """ Solve the chain.
+
+        Returns:
+            dict: 'ends', the share of turns ending on each space, with index
+                in_jail for turns ending in Jail; and 'landings', the expected
+                landings on each space per turn
+        """
+        pi = self.stationary()
+        ends = pi[:40] + [sum(pi[40:])]
+        landings = [sum(pi[s] * self.visits[s][i] for s in range(len(states))) for i in range(40)]
+        return {'ends': ends, 'landings': landings}
+
+def config_key(jail='pay', cards=True):
+    """ A key for everything a solved table depends on.
+
+    Returns:
+        str: a hash of the board, the card moves, and the rules
+    """
+    config = {'board': [str(board_spaces[i]) for i in range(40)], 'jail': jail, 'cards': cards,
+              'chance': [[chance_destination(c, loc) for loc in range(40)] for c in chance],
+              'cc': [[cc_destination(c, loc) for loc in range(40)] for c in community_chest]}
+    return sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+solved = {}
+
+def landing_table(jail='pay', cards=True, cache_path=default_cache):
+    """ Get the solved table for a set of rules, solving it only if it isn't
+        cached yet.
+
+    Arguments:
+        jail (str): either 'pay' or 'roll'. defaults to 'pay'
+        cards (bool): whether to include the movement cards. defaults to True
+        cache_path (str, None): the JSON file to cache tables in. if None,
+            only caches in memory
+
+    Side effects:
+        may read and write the cache file
+
+    Returns:
+        dict: the solved table, as returned by MarkovChain.solve
+    """
+    key = config_key(jail, cards)
+    if key in solved:
+        return solved[key]
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            try:
+                cache = json.load(f)
+            except json.decoder.JSONDecodeError:
+                cache = {}
+    if key not in cache:
+        cache[key] = MarkovChain(jail, cards).solve()
+        if cache_path:
+            temp = f'{cache_path}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(temp, cache_path)
+    solved[key] = cache[key]
+    return solved[key]
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--jail", choices=('pay', 'roll'), help="how players leave Jail", default='pay')
+    parser.add_argument("--no-cards", action='store_true', help="leave out the movement cards")
+    args = parser.parse_args()
+    table = landing_table(args.jail, not args.no_cards)
+    names = [str(board_spaces[i]) for i in range(40)] + ['In Jail']
+    for i in sorted(range(41), key=lambda i: -table['ends'][i]):
+        landing = f"{table['landings'][i]:.4%}" if i < 40 else ''
+        print(f"{names[i]:24} {table['ends'][i]:.4%} {landing}")
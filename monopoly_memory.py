@@ -0,0 +1,158 @@
+""" Memory tracking for long games, and a check that repeated games in one
+process don't keep growing.
+
+Usage:
+
+    python monopoly_memory.py [--games 12] [--computers 3] [--warmup 4] [--tolerance 262144]
+"""
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+class MemoryTracker:
+    """ Snapshots allocations every few turns, and diffs each snapshot against
+        the last.
+
+    Attributes:
+        enabled (bool): whether snapshots are being taken
+        every (int): how many turns to wait between snapshots
+        top (int): how many of the biggest changes to keep per snapshot
+        last (Snapshot, None): the previous tracemalloc snapshot
+        reports (list): a dict for each snapshot, with the turn, the traced
+            memory, and the biggest changes since the last snapshot
+    """
+    def __init__(self, every=50, top=10):
+        self.enabled = False
+        self.every = every
+        self.top = top
+        self.last = None
+        self.reports = []
+
+    def enable(self, every=None):
+        """ Start tracking.
+
+        Arguments:
+            every (int, None): how many turns to wait between snapshots. if
+                None, keeps the current setting
+
+        Side effects:
+            starts tracemalloc if it isn't running
+        """
+        if every:
+            self.every = every
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        """ Stop tracking.
+
+        Side effects:
+            stops tracemalloc, and drops the last snapshot
+        """
+        self.enabled = False
+        self.last = None
+        tracemalloc.stop()
+
+    def on_turn(self, state):
+        """ Take a snapshot, if it's been enough turns since the last one.
+
+        Arguments:
+            state (BoardState): the game being played
+
+        Side effects:
+            adds a report to self.reports when a snapshot is taken
+        """
+        if not self.enabled or state.turntotal % self.every:
+            return
+        self.snapshot(state.turntotal)
+
+    def snapshot(self, label):
+        """ Take a snapshot, and diff it against the last one.
+
+        Arguments:
+            label (int or str): what to record the snapshot as, usually the turn
+
+        Side effects:
+            adds a report to self.reports, and replaces self.last
+        """
+        snap = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        current, peak = tracemalloc.get_traced_memory()
+        changes = []
+        if self.last is not None:
+            for stat in snap.compare_to(self.last, 'lineno')[:self.top]:
+                frame = stat.traceback[0]
+                changes.append({'where': f'{frame.filename}:{frame.lineno}', 'size_diff': stat.size_diff,
+                                'count_diff': stat.count_diff, 'size': stat.size})
+        self.reports.append({'turn': label, 'current': current, 'peak': peak, 'changes': changes})
+        self.last = snap
+
+    def write(self, path):
+        """ Write the reports to a JSON file.
+
+        Arguments:
+            path (str): the file to write to
+
+        Side effects:
+            writes to a file, creating it if necessary
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.reports, f, indent=2)
+
+memory = MemoryTracker()
+
+def check_bounded(games=12, computers=3, warmup=4, tolerance=256 * 1024, seed=0):
+    """ Play many games in one process, and check that memory stops growing.
+
+    Arguments:
+        games (int): how many games to play. defaults to 12
+        computers (int): how many computer players per game. defaults to 3
+        warmup (int): how many games to play before measuring, so caches and
+            imports can settle. defaults to 4
+        tolerance (int): how many bytes memory may grow between the end of
+            warmup and the last game. defaults to 256 KiB
+        seed (int): the seed of the first game. game i uses seed + i
+
+    Side effects:
+        plays games in the working directory, writing its config, log, and
+            backup files
+
+    Returns:
+        dict: the traced memory after each game, the growth after warmup, and
+            whether it was within the tolerance
+    """
+    from main import play
+    from monopoly_bench import new_state
+    sizes = []
+    tracemalloc.start()
+    try:
+        for g in range(games):
+            play(new_state(computers, seed + g))
+            # the log is only on disk, but keeping it short keeps long checks fast
+            open('log.txt', 'w').close()
+            gc.collect()
+            sizes.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+    growth = sizes[-1] - sizes[min(warmup, games) - 1]
+    return {'sizes': sizes, 'growth': growth, 'tolerance': tolerance, 'bounded': growth <= tolerance}
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--games", type=int, help="how many games to play", default=12)
+    parser.add_argument("--computers", type=int, help="computer players per game", default=3)
+    parser.add_argument("--warmup", type=int, help="games to play before measuring", default=4)
+    parser.add_argument("--tolerance", type=int, help="bytes memory may grow after warmup", default=256 * 1024)
+    parser.add_argument("--seed", type=int, help="the seed of the first game", default=0)
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        result = check_bounded(args.games, args.computers, args.warmup, args.tolerance, args.seed)
+    print(json.dumps(result, indent=2))
+    if not result['bounded']:
+        sys.exit(1)
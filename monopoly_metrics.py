@@ -0,0 +1,187 @@
+""" Counters and histograms for watching long-running games and simulations.
+
+The engine updates the metrics in the module-level registry as it goes.
+They can be written to a Prometheus text-format file on a timer, or served
+over HTTP for a Prometheus scraper. Only the main thread's updates count, so
+playouts in worker threads don't add simulated turns and trades to the real
+game's.
+"""
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread, current_thread, main_thread
+import os
+
+class Counter:
+    """ A value that only goes up.
+
+    Attributes:
+        name (str): the metric's name
+        help (str): what the metric counts
+        value (int or float): the current count
+    """
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        if current_thread() is main_thread():
+            self.value += amount
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter',
+                f'{self.name} {self.value}']
+
+class Histogram:
+    """ Counts observations in buckets.
+
+    Attributes:
+        name (str): the metric's name
+        help (str): what the metric measures
+        buckets (tuple): the upper bound of each bucket, in increasing order
+        counts (list): how many observations fell into each bucket, with one
+            extra for those above the last bound
+        sum (float): the total of every observation
+        count (int): how many observations there have been
+    """
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        if current_thread() is not main_thread():
+            return
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {total}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{self.name}_sum {self.sum}')
+        lines.append(f'{self.name}_count {self.count}')
+        return lines
+
+latency_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+class Registry:
+    """ The set of metrics the engine reports.
+
+    Attributes:
+        metrics (dict): metric names and their Counter or Histogram
+        stop (Event): set to stop the background file writer
+    """
+    def __init__(self):
+        """ Initialize a Registry with the engine's metrics.
+
+        Side effects:
+            sets attributes, and creates a Counter or Histogram for each metric
+        """
+        self.metrics = {}
+        self.stop = Event()
+        self.games_started = self.counter('monopoly_games_started_total', 'Games started.')
+        self.games_finished = self.counter('monopoly_games_finished_total', 'Games finished.')
+        self.turns = self.counter('monopoly_turns_total', 'Turns played.')
+        self.auctions = self.counter('monopoly_auctions_total', 'Auctions held.')
+        self.trades_proposed = self.counter('monopoly_trades_proposed_total', 'Trade offers made.')
+        self.trades_accepted = self.counter('monopoly_trades_accepted_total', 'Trade offers accepted.')
+        self.bankruptcies = self.counter('monopoly_bankruptcies_total', 'Players who went bankrupt.')
+        self.saves = self.counter('monopoly_saves_written_total', 'Save files written.')
+        self.save_bytes = self.counter('monopoly_save_bytes_total', 'Bytes written to save files.')
+        self.turn_latency = self.histogram('monopoly_turn_latency_seconds', 'How long each turn took.')
+        self.save_latency = self.histogram('monopoly_save_latency_seconds', 'How long each save took.')
+
+    def counter(self, name, help):
+        self.metrics[name] = Counter(name, help)
+        return self.metrics[name]
+
+    def histogram(self, name, help, buckets=latency_buckets):
+        self.metrics[name] = Histogram(name, help, buckets)
+        return self.metrics[name]
+
+    def render(self):
+        """ Format every metric in the Prometheus text format.
+
+        Returns:
+            str: the formatted metrics
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """ Write the metrics to a file, replacing it all at once so readers
+            never see a partial file.
+
+        Arguments:
+            path (str): the file to write to
+
+        Side effects:
+            writes to a file, creating it if necessary
+        """
+        temp = f'{path}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp, path)
+
+    def write_every(self, path, interval=15):
+        """ Start writing the metrics to a file on a timer, in the background.
+
+        Arguments:
+            path (str): the file to write to
+            interval (float): seconds between writes. defaults to 15
+
+        Side effects:
+            starts a daemon thread that writes the file until self.stop is set
+
+        Returns:
+            Thread: the writer thread
+        """
+        def loop():
+            while not self.stop.wait(interval):
+                self.write(path)
+            self.write(path)
+        self.stop.clear()
+        t = Thread(target=loop, name='metrics-writer', daemon=True)
+        t.start()
+        return t
+
+    def serve(self, port, host='127.0.0.1'):
+        """ Serve the metrics over HTTP, in the background.
+
+        Arguments:
+            port (int): the port to listen on
+            host (str): the address to listen on. defaults to localhost
+
+        Side effects:
+            starts a daemon thread running an HTTP server
+
+        Returns:
+            ThreadingHTTPServer: the server. call its shutdown method to stop it
+        """
+        registry = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+        server = ThreadingHTTPServer((host, port), Handler)
+        Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+metrics = Registry()
@@ -0,0 +1,263 @@
+""" A vectorized Monte Carlo engine for studying where players land.
+
+Only movement is simulated: dice, doubles, three doubles to Jail, Go To Jail,
+Jail escapes, and the movement cards in monopoly_cards_exp. Each token is an
+independent player with its own Chance and Community Chest decks, and every
+token advances one turn at a time in lockstep, as NumPy arrays. Requires NumPy.
+
+Usage:
+
+    python monopoly_montecarlo.py [--tokens 1000000] [--turns 100] [--jail pay] [-o landings.json]
+"""
+from argparse import ArgumentParser
+from monopoly_cards_exp import chance, community_chest, chance_destination, cc_destination, \
+    in_jail, chance_spaces, cc_spaces
+from monopoly_property import board_spaces
+import json
+import numpy as np
+
+# destination tables, indexed by [card, space]
+chance_table = np.array([[chance_destination(c, loc) for loc in range(40)] for c in chance], dtype=np.int8)
+cc_table = np.array([[cc_destination(c, loc) for loc in range(40)] for c in community_chest], dtype=np.int8)
+
+class MonteCarlo:
+    """ Many independent tokens moving around the board.
+
+    Attributes:
+        n (int): how many tokens there are
+        jail (str): how tokens leave Jail. either 'pay', to pay the fine
+            straight away, or 'roll', to roll for doubles until the third turn
+        rng (Generator): the random number generator
+        loc (ndarray): each token's space
+        jailed (ndarray): whether each token is in Jail
+        jail_turns (ndarray): how many turns each token has spent in Jail
+        chance (ndarray): each token's shuffled Chance deck, one row per token
+        cc (ndarray): each token's shuffled Community Chest deck
+        chance_pos (ndarray): each token's next card in its Chance deck
+        cc_pos (ndarray): each token's next card in its Community Chest deck
+        landings (ndarray): how many times any token has landed on each of
+            the 40 spaces, counting every stop in a turn
+        ends (ndarray): how many turns have ended on each space, with index
+            in_jail for turns that ended in Jail
+        transitions (ndarray): how many turns started on one space (row) and
+            ended on another (column), using the same 41 indices as ends
+        turns (int): how many turns have been recorded
+    """
+    def __init__(self, tokens=1000000, jail='pay', seed=None):
+        """ Put every token on Go.
+
+        Arguments:
+            tokens (int): how many tokens to simulate. defaults to 1,000,000
+            jail (str): either 'pay' or 'roll'. defaults to 'pay'
+            seed (int, None): the seed for the random number generator
+
+        Side effects:
+            sets attributes, and shuffles every token's decks
+        """
+        if jail not in ('pay', 'roll'):
+            raise ValueError("jail must be either 'pay' or 'roll'")
+        self.n = tokens
+        self.jail = jail
+        self.rng = np.random.default_rng(seed)
+        self.loc = np.zeros(tokens, dtype=np.int8)
+        self.jailed = np.zeros(tokens, dtype=bool)
+        self.jail_turns = np.zeros(tokens, dtype=np.int8)
+        self.chance = self.shuffled(len(chance), tokens)
+        self.cc = self.shuffled(len(community_chest), tokens)
+        self.chance_pos = np.zeros(tokens, dtype=np.int8)
+        self.cc_pos = np.zeros(tokens, dtype=np.int8)
+        self.landings = np.zeros(40, dtype=np.int64)
+        self.ends = np.zeros(41, dtype=np.int64)
+        self.transitions = np.zeros((41, 41), dtype=np.int64)
+        self.turns = 0
+
+    def shuffled(self, cards, rows):
+        """ Make a freshly shuffled deck for each of rows tokens.
+
+        Returns:
+            ndarray: rows permutations of range(cards)
+        """
+        return self.rng.permuted(np.tile(np.arange(cards, dtype=np.int8), (rows, 1)), axis=1)
+
+    def draw(self, who, decks, pos, table):
+        """ Draw a card for some tokens, and find where it sends them.
+
+        Arguments:
+            who (ndarray): the indices of the tokens drawing
+            decks (ndarray): the decks to draw from, one row per token
+            pos (ndarray): each token's next card. advanced in place
+            table (ndarray): the deck's destination table
+
+        Side effects:
+            reshuffles a token's deck after its last card is drawn
+
+        Returns:
+            ndarray: where each drawing token ends up
+        """
+        cards = decks[who, pos[who]]
+        pos[who] += 1
+        empty = who[pos[who] == decks.shape[1]]
+        if len(empty):
+            decks[empty] = self.shuffled(decks.shape[1], len(empty))
+            pos[empty] = 0
+        return table[cards, self.loc[who]]
+
+    def land(self, who):
+        """ Process the spaces some tokens just landed on.
+
+        Arguments:
+            who (ndarray): the indices of the tokens that moved
+
+        Side effects:
+            counts the landings, and applies Go To Jail and card moves
+
+        Returns:
+            ndarray: the subset of who that was sent to Jail
+        """
+        self.landings += np.bincount(self.loc[who], minlength=40)
+        drew = who[np.isin(self.loc[who], chance_spaces)]
+        if len(drew):
+            dest = self.draw(drew, self.chance, self.chance_pos, chance_table)
+            moved = drew[(dest != self.loc[drew]) & (dest != in_jail)]
+            self.loc[drew] = np.where(dest == in_jail, self.loc[drew], dest)
+            self.landings += np.bincount(self.loc[moved], minlength=40)
+            jailed = drew[dest == in_jail]
+        else:
+            jailed = drew
+        drew = who[np.isin(self.loc[who], cc_spaces)]
+        if len(drew):
+            dest = self.draw(drew, self.cc, self.cc_pos, cc_table)
+            moved = drew[(dest != self.loc[drew]) & (dest != in_jail)]
+            self.loc[drew] = np.where(dest == in_jail, self.loc[drew], dest)
+            self.landings += np.bincount(self.loc[moved], minlength=40)
+            jailed = np.concatenate((jailed, drew[dest == in_jail]))
+        return np.union1d(jailed, who[self.loc[who] == 30])
+
+    def send_to_jail(self, who):
+        self.loc[who] = 10
+        self.jailed[who] = True
+        self.jail_turns[who] = 0
+
+    def state(self):
+        """ Returns:
+            ndarray: each token's space, or in_jail for tokens in Jail
+        """
+        return np.where(self.jailed, in_jail, self.loc)
+
+    def turn(self, record=True):
+        """ Play one turn for every token.
+
+        Arguments:
+            record (bool): whether to count this turn's landings and
+                transitions. defaults to True
+
+        Side effects:
+            moves every token, and updates the counts
+        """
+        start = self.state()
+        landings = self.landings.copy()
+        active = np.arange(self.n)
+        doubles = np.zeros(self.n, dtype=np.int8)
+        while len(active):
+            d1 = self.rng.integers(1, 7, len(active), dtype=np.int8)
+            d2 = self.rng.integers(1, 7, len(active), dtype=np.int8)
+            roll = d1 + d2
+            dbl = d1 == d2
+            again = dbl.copy()
+            inside = self.jailed[active]
+            if inside.any():
+                if self.jail == 'pay':
+                    leave = inside
+                else:
+                    self.jail_turns[active[inside]] += 1
+                    forced = self.jail_turns[active] >= 3
+                    leave = inside & (dbl | forced)
+                    # escaping by rolling doubles doesn't earn another roll, but
+                    # doubles on the third turn, after paying, still do
+                    again &= ~(inside & ~forced)
+                stay = inside & ~leave
+                self.jailed[active[leave]] = False
+                self.jail_turns[active[leave]] = 0
+                roll = roll[~stay]
+                again = again[~stay]
+                dbl = dbl[~stay]
+                active = active[~stay]
+            doubles[active] += dbl
+            caught = doubles[active] == 3
+            self.send_to_jail(active[caught])
+            active, roll, again = active[~caught], roll[~caught], again[~caught]
+            self.loc[active] = (self.loc[active] + roll) % 40
+            jailed = self.land(active)
+            self.send_to_jail(jailed)
+            keep = again & ~np.isin(active, jailed)
+            active = active[keep]
+        if record:
+            end = self.state()
+            self.ends += np.bincount(end, minlength=41)
+            self.transitions += np.bincount(start.astype(np.int64) * 41 + end, minlength=41 * 41).reshape(41, 41)
+            self.turns += 1
+        else:
+            self.landings = landings
+
+    def run(self, turns=100, burn_in=10):
+        """ Play many turns.
+
+        Arguments:
+            turns (int): how many turns to record. defaults to 100
+            burn_in (int): how many turns to play first without recording, so
+                the tokens spread out from Go. defaults to 10
+
+        Side effects:
+            moves every token, and updates the counts
+        """
+        for _ in range(burn_in):
+            self.turn(record=False)
+        for _ in range(turns):
+            self.turn()
+
+    def landing_frequencies(self):
+        """ Returns:
+            ndarray: the share of all landings on each of the 40 spaces
+        """
+        return self.landings / self.landings.sum()
+
+    def end_frequencies(self):
+        """ Returns:
+            ndarray: the share of turns ending on each of the 41 states
+        """
+        return self.ends / self.ends.sum()
+
+    def transition_matrix(self):
+        """ Returns:
+            ndarray: the observed probability of ending a turn on each state
+                (column), given the state it started on (row)
+        """
+        totals = self.transitions.sum(axis=1, keepdims=True)
+        return np.divide(self.transitions, totals, out=np.zeros((41, 41)), where=totals > 0)
+
+    def report(self):
+        """ Returns:
+            dict: the landing and end-of-turn frequencies by space name
+        """
+        names = [str(board_spaces[i]) for i in range(40)]
+        return {'tokens': self.n, 'turns': self.turns, 'jail': self.jail,
+                'landings': dict(zip(names, self.landing_frequencies().tolist())),
+                'ends': dict(zip(names + ['In Jail'], self.end_frequencies().tolist()))}
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--tokens", type=int, help="how many tokens to simulate", default=1000000)
+    parser.add_argument("--turns", type=int, help="how many turns to record", default=100)
+    parser.add_argument("--burn-in", type=int, help="turns to play before recording", default=10)
+    parser.add_argument("--jail", choices=('pay', 'roll'), help="how tokens leave Jail", default='pay')
+    parser.add_argument("--seed", type=int, help="the random seed", default=None)
+    parser.add_argument("-o", "--output", help="a file to write the frequencies to as JSON", default=None)
+    args = parser.parse_args()
+    mc = MonteCarlo(args.tokens, args.jail, args.seed)
+    mc.run(args.turns, args.burn_in)
+    result = mc.report()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    for name, freq in sorted(result['landings'].items(), key=lambda kv: -kv[1]):
+        print(f"{name:24} {freq:.4%}")
@@ -1,8 +1,19 @@
 from monopoly_exceptions import LoserError
 from monopoly_property import Property
-from random import shuffle, randrange, choice
-from monopoly_basic_exp import advprint
+from monopoly_basic_exp import advprint, rng
 from monopoly_command import Command
+from monopoly_input import inputs
+from monopoly_profiler import timed
+from monopoly_budget import decision
+from monopoly_metrics import metrics
+from monopoly_liquidation import plan, describe
+from monopoly_building import plan as plan_builds, reserve
+from monopoly_policy import default_policy
+from monopoly_zobrist import Hashed, key, toggle
+from monopoly_decisions import rent_change, unmortgage_order
+from monopoly_trading import accepts, best_offer, position, signature
+from monopoly_profiles import profile
+from monopoly_endgame import endgame
 import json
 
 class Player:
@@ -20,7 +31,19 @@ class Player:
         jailTurn (int): how many turns the player has spent in Jail. defaults to 0, should be an int from 0-3
         dcount (int): how many doubles the player has rolled in a row. defaults to 0, should be an int from 0-3
         game (GameState): the current game object
+        mortgageable (int): the total mortgage value of the player's unmortgaged properties
+        house_value (int): how much the player would get for selling every building
+        unmortgaged (int): how many unmortgaged properties the player has
+        asset_value (int): the total value of the player's properties and
+            buildings, less what they owe on mortgages
+        holding (dict): set names and a hash of which properties the player
+            has in the set, with their buildings and mortgages
     """
+    chance = Hashed()
+    cc = Hashed()
+    inJail = Hashed()
+    jailTurn = Hashed()
+
     def __init__(self, gamestate, name=None, turn_order=0, location=0, chance=0, cc=0, wallet=1500, deeds = {}, pnum=0):
         """ Initialize a Player object.
         
@@ -50,6 +73,93 @@ class Player:
         self.dcount = 0
         self.game = gamestate
         self.creditor = 'the Bank'
+        self.recount()
+    
+    def hashed_change(self, field, old, new):
+        """ Updates the game's state hash when a hashed attribute changes.
+        
+        Side effects:
+            updates self.game.zobrist, once the player is in a game
+        """
+        game = self.__dict__.get('game')
+        if game is not None:
+            name = getattr(self, 'name', None)
+            toggle(game, key('player', name, field, old), key('player', name, field, new))
+    
+    def track(self, prop, sign=1):
+        """ Adds a property to the player's running totals, or removes it.
+        
+        Arguments:
+            prop (Property): the property
+            sign (int): 1 to add the property as it is now, or -1 to remove
+                it. defaults to 1
+                
+        Side effects:
+            updates the running totals
+        """
+        if prop.mstatus:
+            self.asset_value += sign * (prop.price - prop.mprice)
+        else:
+            self.mortgageable += sign * prop.mprice
+            self.unmortgaged += sign
+            self.asset_value += sign * prop.price
+        self.house_value += sign * prop.bnum * (prop.bprice // 2)
+        self.asset_value += sign * prop.bnum * prop.bprice
+        self.holding[prop.set] ^= key('holding', prop.loc, prop.bnum, prop.mstatus)
+    
+    def recount(self):
+        """ Recalculates the running totals from scratch.
+        
+        Side effects:
+            resets the running totals, and adds every property in self.deeds
+        """
+        self.mortgageable = 0
+        self.house_value = 0
+        self.unmortgaged = 0
+        self.asset_value = 0
+        self.holding = dict.fromkeys(self.deeds, 0)
+        for aset in self.deeds.values():
+            for p in aset:
+                self.track(p)
+    
+    def liquid_value(self):
+        """ How much money the player could raise, by selling every building
+            and mortgaging every property.
+            
+        Returns:
+            int: the player's wallet plus their running totals
+        """
+        return self.wallet + self.mortgageable + self.house_value
+    
+    def net_worth(self):
+        """ Returns:
+            int: the player's wallet plus the value of their properties and buildings
+        """
+        return self.wallet + self.asset_value
+    
+    def opponents(self):
+        """ Count the players this player is still playing against.
+        
+        Returns:
+            int: how many other players haven't lost
+        """
+        return len(self.game.players) - len(self.game.plost) - 1
+    
+    def liquidate(self, steps):
+        """ Carry out a plan from monopoly_liquidation.
+        
+        Arguments:
+            steps (list): ('sell' or 'mortgage', Property) pairs
+            
+        Side effects:
+            sells houses and mortgages properties, adding the money to the
+                player's wallet
+        """
+        for action, prop in steps:
+            if action == 'sell':
+                self += prop.sell_house()
+            else:
+                prop.mortgage()
         
     def count_set(self, setname=None):
         """ Counts how many properties the player owns per set.
@@ -93,10 +203,8 @@ class Player:
                 sell a house, returns None
             else, the Player has lost, returning 1
         """
-        for aset in self.deeds.values():
-            for p in aset:
-                if not p.mstatus or p.bnum:
-                    return
+        if self.unmortgaged or self.house_value:
+            return
         if self.wallet >= debt:
             return 
         return 1
@@ -115,11 +223,13 @@ class Player:
         elif isinstance(other, Property):
             if other.mstatus:
                 advprint("This property is mortgaged.")
-                a = self.game.get_mortgaged_prop(self, other)
+                a = self.get_mortgaged_prop(other)
                 if not a:
                     return self
             self.deeds[other.set].append(other)
             other.owner = self
+            self.track(other)
+            self.game.update_rents(other.set)
             return self
         else:
             raise TypeError(f"Invalid type: {type(other)}")
@@ -145,6 +255,8 @@ class Player:
             return self
         elif isinstance(other, Property):
             self.deeds[other.set].remove(other)
+            self.track(other, -1)
+            self.game.update_rents(other.set)
             return self
         else:
             raise TypeError(f"Invalid type: {type(other)}")
@@ -153,6 +265,7 @@ class Player:
         if isinstance(setname, str):
             for i in self.deeds[setname]:
                 i.pcount = len(self.deeds[setname])        
+            self.game.update_rents(setname)
             return self
         raise TypeError(f"Property objects do not support multiplication with objects of type {type(setname)}")
     
@@ -163,6 +276,7 @@ class Player:
         return ans
     
     def process_trade(self, other, gain, loss):
+        metrics.trades_accepted.inc()
         try:
             other -= gain['money']
             self += gain['money']
@@ -204,6 +318,9 @@ class Player:
         for r in loss['properties']:
             self -= r
             other += r
+        for prop in gain['properties'] + loss['properties']:
+            self * prop.set
+            other * prop.set
     
 class HumanPlayer(Player):
     def __init__(self, *args, **kwargs):
@@ -212,7 +329,7 @@ class HumanPlayer(Player):
         if not kwargs.get('name', False):
             while True:
                 try:
-                    p_input = input(f"Player {kwargs.get('pnum', 0)}, enter your name: ")
+                    p_input = inputs.read(f"Player {kwargs.get('pnum', 0)}, enter your name: ")
                     p_input = p_input.replace(' ', '_')
                     if p_input.lower() in protected_words:
                         advprint("Invald name")
@@ -245,13 +362,6 @@ class HumanPlayer(Player):
                 advprint("You pay the $50 fine and leave Jail.")
                 return 'pay'
     
-    def bid(self, auc):
-        x = Command(auc.state, 'money', f"{self.name}, what is your bid? Current bid: ${auc.cbid}\n")
-        try:
-            return x.action()
-        except ValueError:
-            return x.text
-        
     def buy_choice(self, prop):
         a = Command(self.game, 'choice', "Would you like to buy it?\n")
         return a.action()
@@ -287,11 +397,15 @@ class HumanPlayer(Player):
             advprint()
             advprint(f"Your current balance: ${self.wallet}")
             for s in self.deeds:
-                for prop in s:
+                for prop in self.deeds[s]:
                     if prop.bnum:
                         advprint(f"{prop} : {'hotel' if prop.bnum == 5 else f'{prop.bnum} houses'}, sell price: ${prop.bprice // 2}")
                     else:
                         advprint(f"{prop} : {'Mortgaged' if prop.mstatus else f'Unmortgaged, mortgage price: ${prop.mprice}'}")
+            steps = plan(self, debt)
+            if steps:
+                advprint()
+                advprint(f"Suggested plan, giving up the least future rent:\n{describe(steps)}")
         while self.wallet < debt:
             if self.check_lost(debt):
                 advprint("You lose!")
@@ -375,7 +489,7 @@ class HumanPlayer(Player):
             self -= prop.iprice
         return True    
 
-    def trade(self, other):
+    def trade(self, other, counters=3):
         def parse_offer(offer):
             props = []
             cards = 0
@@ -388,29 +502,29 @@ class HumanPlayer(Player):
                     if i[0] == '$':
                         money = int(i[1:])
                     else:
-                        x = self.game.findprop(i)
+                        x = self.game.find_prop(i)
                         if x:
                             props.append(x)
                         else:
                             advprint("There was an error entering your properties.")
                             error += 1
             return props, cards, money, error
-        request = input(f"What does {self} want to trade for?\n")
+        request = inputs.read(f"What does {self} want to trade for?\n")
         rlist = request.strip().split(', ')
         while not rlist:
-            request = input('Please enter your request, like this: {property1, property2, ...}, ${money}, {GOJF card(s)}\n')
+            request = inputs.read('Please enter your request, like this: {property1, property2, ...}, ${money}, {GOJF card(s)}\n')
             rlist = request.strip().split(', ')
-        rprops, rcards, rmoney, rerror = parse_offer(request)
+        rprops, rcards, rmoney, rerror = parse_offer(rlist)
         for r in rprops:
             if r not in other.deeds[r.set]:
                 advprint(f"{other} does not own {r}")
                 rerror += 1
         if rerror:
             return
-        offer = input(f"What does {self} offer?\n")
+        offer = inputs.read(f"What does {self} offer?\n")
         olist = offer.strip().split(', ')
         while not olist:
-            offer = input('Please enter your offer, like this: {property1, property2, ...}, ${money}, {GOJF card(s)}\n')
+            offer = inputs.read('Please enter your offer, like this: {property1, property2, ...}, ${money}, {GOJF card(s)}\n')
             olist = offer.strip().split(', ')
         oprops, ocards, omoney, oerror = parse_offer(olist)
         for o in oprops:
@@ -421,9 +535,10 @@ class HumanPlayer(Player):
             return         
         rtotal = {'properties': rprops, 'money': rmoney, 'cards': rcards}
         ototal = {'properties': oprops, 'money': omoney, 'cards': ocards}                
-        other.evaluate_offer(self, rtotal, ototal)
+        metrics.trades_proposed.inc()
+        return other.evaluate_offer(self, rtotal, ototal, counters)
 
-    def evaluate_offer(self, other, request, offer):
+    def evaluate_offer(self, other, request, offer, counters=3):
         advprint(f"Trade offer from {other}!")
         advprint(f"{other}'s request:")
         advprint(f"GOJF cards: {request['cards']}")
@@ -436,15 +551,20 @@ class HumanPlayer(Player):
         advprint(f"Money: ${offer['money']}")
         for prop in offer['properties']:
             advprint(prop)        
-        c = input("Do you accept this offer? Yes, no, or counter\n").lower()
+        c = inputs.read("Do you accept this offer? Yes, no, or counter\n").lower()
         while c not in ('yes', 'no', 'counter'):
-            c = input("Do you accept this offer? Yes, no, or counter\n").lower()
+            c = inputs.read("Do you accept this offer? Yes, no, or counter\n").lower()
         if c == 'yes':
             self.process_trade(other, offer, request)
+            return True
         elif c == 'no':
             print("Trade cancelled")
+            return False
+        elif counters:
+            return self.trade(other, counters - 1)
         else:
-            self.trade(other)
+            advprint("No more counteroffers")
+            return False
         
     def do_turn(self):
         command = Command(self.game, 'turn', f'\nWhat would {self} like to do? note: only [roll, jail, build, info, trade, exit, debug, save, load, unmortgage] are currently implemented ')
@@ -522,100 +642,99 @@ class HumanPlayer(Player):
         return 'yay'    
 
 class ComputerPlayer(Player):
+    policy = default_policy
+    strategy = 'heuristic'
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.mort_priority = ('Utilities', 'Brown', 'Dark Blue', 'Light Blue', 'Pink', 'Green', 'Railroads', 'Yellow', 'Orange', 'Red')
-        self.house_sell_priority = ('Brown', 'Light Blue', 'Yellow', 'Dark Blue', 'Green', 'Pink', 'Orange', 'Red')
-        self.build_priority = ('Red', 'Orange', 'Yellow', 'Pink', 'Light Blue', 'Dark Blue', 'Green', 'Brown')
         self.name = f"Computer {kwargs.get('pnum', 0)}"
         self.type = 'ai'
-    
+        self.declined = {}
+        
+    @timed('ai.jail_turn')
+    @decision('jail')
     def jail_turn(self):
+        if endgame.qualifies(self):
+            choice = endgame.jail(self)
+            if choice is not None:
+                return choice
         if self.chance:
             return 'chance'
         elif self.cc:
             return 'cc'
-        elif (self.game.turntotal / len(self.game.players) < 5\
-            or sum(self.count_set().values()) < 5) and self.game.turntotal / len(self.game.players) < 15:
+        rounds = self.game.turntotal / len(self.game.players)
+        if (rounds < self.policy.jail_pay_turns or sum(self.count_set().values()) < self.policy.jail_pay_props) \
+                and rounds < self.policy.jail_roll_turns:
             return 'pay'
         else:
             return 'roll'
         
+    @timed('ai.calc_high_bid')
+    @decision('bid')
     def calc_high_bid(self, prop):
-        bal_lim = int(self.wallet / 10)
+        lot = prop if isinstance(prop, list) else [prop]
+        policy = self.policy
+        bal_lim = int(self.wallet * policy.bid_wallet_share)
         setfactor = 1
-        minbaladjust = 200
-        if self.wallet < minbaladjust:
-            setfactor *= 0.75
-        if len(self.deeds[prop.set]):
-            setfactor *= 4/3
-        if len(self.deeds[prop.set]) + 1 == prop.stot:
-            setfactor *= 2
-        pricefactor = prop.price * setfactor
-        price_lim = min(self.wallet - 50, pricefactor)
-        maxbid = round(max(bal_lim, price_lim), ndigits=-1)
-        return randrange(maxbid - 30, maxbid + 40, step=10)
+        if self.wallet < policy.bid_low_wallet:
+            setfactor *= policy.bid_low_factor
+        pricefactor = (sum(p.mprice for p in lot) + rent_change(self, policy.horizon, gained=lot)) * setfactor
+        price_lim = min(self.wallet - policy.bid_margin, pricefactor)
+        maxbid = int(round(max(bal_lim, price_lim), ndigits=-1))
+        spread = int(policy.bid_spread) // 10 * 10
+        return rng().randrange(maxbid - spread, maxbid + spread + 10, step=10)
 
+    @timed('ai.bid')
     def bid(self, auc):
-        maxbid = self.calc_high_bid(auc.prop)
-        for i in range(10, maxbid + 1, 10):
-            if i > auc.cbid:
-                return i
+        nextbid = auc.cbid - auc.cbid % auc.increment + auc.increment
+        if nextbid <= auc.limit(self):
+            return nextbid
         return 'exit'
     
+    @timed('ai.buy_choice')
+    @decision('buy')
     def buy_choice(self, prop):
-        if prop.price < self.wallet - 50:
+        if prop.price < self.wallet - self.policy.buy_margin:
             return True
         return False
     
-    def get_assets(self):
-        mlist = []
-        for s in self.mort_priority:
-            for p in self.deeds[s]:
-                mlist.append(p) if p.bnum == 0 else None
-        mlist.sort(key=lambda c: self.mort_priority.index(c.set))
-        mlist.sort(key=lambda c: (c.stot - c.pcount) / c.stot, reverse=True)
-        hlist = []
-        for s in self.house_sell_priority:
-            if len(self.deeds[s]) == 0:
-                continue
-            if self.deeds[s][0].bnum:
-                hlist.append(s)
-        hlist.sort(key=lambda c: self.deeds[c][0].bnum)
-        return mlist, hlist
-    
+    @timed('ai.raise_money')
+    @decision('liquidate')
     def raise_money(self, creditor, debt):
-        mlist, hlist = self.get_assets()
-        while self.wallet < debt:
-            if mlist:
-                mlist.pop(0).mortgage()
-            elif hlist:
-                h = hlist.pop(0)
-                for i in self.deeds[h]:
-                    i.sell_house()
-            else:
-                advprint(f"{self} has lost!")
-                return
+        steps = None
+        if self.liquid_value() >= debt:
+            if endgame.qualifies(self):
+                steps = endgame.liquidate(self, creditor, debt)
+            if steps is None:
+                steps = plan(self, debt)
+        if steps is None:
+            advprint(f"{self} has lost!")
+            return
+        self.liquidate(steps)
         return debt
     
+    @timed('ai.to_unmortgage')
+    @decision('unmortgage')
     def to_unmortgage(self):        
         mlist = []
-        for s in self.mort_priority[::-1]:
+        for s in self.policy.mort_priority[::-1]:
             for p in self.deeds[s]:
                 mlist.append(p) if p.mstatus == True else None
-        mlist.sort()
+        if len(mlist) > 1:
+            mlist = unmortgage_order(self, mlist)
         for p in mlist:
-            if self.wallet > p.mprice * 2.5:
+            if self.wallet > p.mprice * self.policy.unmortgage_factor:
                 p.unmortgage()
                 
+    @timed('ai.get_mortgaged_prop')
     def get_mortgaged_prop(self, prop):
         if not prop.mstatus:
             raise ValueError("This property is not mortgaged")
         prop.owner = self
         if self.count_set(setname=prop.set) + 1 == prop.pcount:
-            target = prop.mprice * 2
+            target = prop.mprice * self.policy.receive_full_factor
         else:
-            target = prop.mprice * 2.5
+            target = prop.mprice * self.policy.receive_factor
         if self.wallet >= target:
             prop.unmortgage()
         else:
@@ -623,143 +742,96 @@ class ComputerPlayer(Player):
                 self -= prop.iprice
             except LoserError:
                 return
+        return True
     
+    @timed('ai.to_build')
+    @decision('build')
     def to_build(self):
-        #add check for incompleteness
-        adjustments = {}
-        check = False
-        for i in self.build_priority:
-            try:
-                prop = self.deeds[i][0]
-                adjustments[i] = prop.bnum
-            except IndexError:
-                continue
-        priority_adj = sorted(self.build_priority, key=lambda c: adjustments.get(c, 0), reverse=True)
-        for j in priority_adj:
-            try:
-                prop = self.deeds[j][0]
-                if self.count_set(setname=prop.set) != prop.stot or prop.bnum == 5:
-                    continue
-                for i in self.deeds[prop.set]:
-                    if i.mstatus == True:
-                        continue
-                    if prop.bnum > i.bnum and prop != i:
-                        continue           
-                if self.wallet > 2 * prop.bprice * prop.stot:
-                    for i in self.deeds[prop.set]:
-                        i.build_house()
-                    check = True
-            except IndexError:
-                continue
-        return check
+        steps = endgame.build(self) if endgame.qualifies(self) else None
+        if steps is None:
+            steps = plan_builds(self, self.wallet - reserve(self, self.policy.build_reserve))
+        for prop in steps:
+            self -= prop.build_house()
+        return bool(steps)
                 
-    def get_interest(self, prop):
-        if prop.set in ('red', 'orange'):
-            return 'yes'
-        if len(self.deeds[prop.set]):
+    @timed('ai.evaluate_offer')
+    @decision('trade')
+    def evaluate_offer(self, other, request, offer, counters=3):
+        if self.game.turntotal / len(self.game.players) < 10:
+            return False
+        if self.eval_trade(other, request, offer):
             return True
+        if counters:
+            return self.counter(other, counters - 1)
+        return False
     
-    def evaluate_offer(self, other, request, offer):
-        if self.game.turntotal / self.game.players < 10:
-            return False
-        if not offer.get('properties', 0):
+    def counter(self, other, counters):
+        declined = self.turned_down(other)
+        found = best_offer(self, other, exclude=declined)
+        if not found:
             return False
-        if not offer.a.get('properties', 0):
-            for i in offer['properties']:
-                if self.get_interest(i):
-                    self.eval_trade(other, request, offer)
-                    return
-        else:
-            self.evaluate_offer(offer)
+        advprint(f"{self} makes a counteroffer")
+        request, offer = found
+        metrics.trades_proposed.inc()
+        # a counteroffer to this one means it was turned down, so it's
+        # counted before asking, and isn't made again later in the exchange
+        declined.add(signature(request, offer))
+        return other.evaluate_offer(self, request, offer, counters)
+
+    def turned_down(self, other):
+        """ The offers another player has turned down since either of them
+            last had something different to trade.
+
+        Arguments:
+            other (Player): the other player
+
+        Side effects:
+            starts a new set of offers for the other player when their
+                position or this player's has changed
+
+        Returns:
+            set: the signature()s of the offers, which can be added to
+        """
+        where = position(self, other)
+        # players made as another class and switched to this one, like the
+        # tournament's and the playouts', never ran __init__
+        declined = self.__dict__.setdefault('declined', {})
+        seen, offers = declined.get(other.name, (None, None))
+        if seen != where:
+            offers = set()
+            declined[other.name] = (where, offers)
+        return offers
     
+    @timed('ai.eval_trade')
     def eval_trade(self, other, request, offer):
-        def count_set(o, setname):
-            ans = 0
-            for i in o:
-                if i.set == setname:
-                    ans += 1
-            return ans
-        if self.count_props - len(request['properties']) + len(offer['properties']) < 6:
-            return False
-        oval_raw = offer['money']
-        oval_raw += offer['cards'] * 40
-        offer_value = oval_raw
-        offer_value *= 1.2 if self.count_props() < 6 else 1
-        for prop in offer['properties']:
-            pval = prop.price
-            if self.count_set(setname=prop.set) + count_set(offer, prop.set) == prop.stot:
-                pval *= 1.5
-            if self.count_set(setname=prop.set) + count_set(offer, prop.set) > 1:
-                pval *= 1.1
-            if prop.set in ('Utilities', 'Green'):
-                pval *= 0.9
-            if prop.set in ('Red', 'Orange'):
-                pval *= 1.05
-            if prop.mstatus:
-                pval *= 0.5
-            offer_value += pval
-        if offer_value < 1.5 * oval_raw:
-            return False
-        rval_raw = request['money']
-        rval_raw += request['cards'] * 40
-        request_value = rval_raw
-        request_value *= 1.2 if self.count_props() < 6 else 1
-        for prop in request['properties']:
-            if prop.pcount == prop.stot:
-                return False
-            pval = prop.price
-            if self.count_set(setname=prop.set) > 1:
-                pval *= 1.1
-            if prop.set in ('Utilities', 'Green'):
-                pval *= 0.9
-            if prop.set in ('Red', 'Orange'):
-                pval *= 1.05
-            if prop.mstatus:
-                pval *= 0.5
-            request_value += pval
-        if offer_value > request_value:
+        if accepts(self, offer, request, other):
             advprint("Trade accepted")
             self.process_trade(other, offer, request)
-        else:
-            advprint("Trade cancelled")
-
-    def choose_target(self):
-        candidates = []
-        for s in self.deeds:
-            for p in self.deeds[s]:
-                if p.stot - p.pcount == 1 and p.set not in candidates:
-                    candidates.append(p)
-        if len(candidates) == 0:
-            return False
-        return candidates
+            return True
+        advprint("Trade cancelled")
+        return False
 
+    @timed('ai.trade')
+    @decision('trade')
     def trade(self, other=None):
-        candidates = self.choose_target()
-        if not candidates:
+        if self.game.turntotal / len(self.game.players) < 10:
             return
-        shuffle(candidates)
-        for k in candidates:
-            for i in self.game.players:
-                if i != self and i.count_set(setname=k.set):
-                    target = i.deeds[k.set][0]
-                    for j in i.deeds:
-                        ocount = i.count_set(setname=j)
-                        scount = self.count_set(setname=j)
-                        if ocount >= scount and scount != 0 and ocount + scount == self.deeds[j][0].stot:
-                            offer = self.deeds[j][0]
-                            break
-                    try:
-                        money = 0
-                        if target.price > offer.price * 1.5:
-                            money = target.price - (offer.price * 1.5) + 20
-                        elif offer.price > target.price * 1.5:
-                            money = offer.price - (target.price * 1.5) + 20
-                        ototal = {'properties': [offer], 'money': money}
-                        rtotal = {'properties': [target], 'money': money}
-                        target.owner.evaluate_offer(self, rtotal, ototal)
-                        return
-                    except:
-                        break
+        if other is None:
+            targets = [p for p in self.game.players if p is not self and p not in self.game.plost]
+            # trades help both sides, so try the least dangerous opponents first
+            targets.sort(key=lambda p: profile(p).threat)
+        else:
+            targets = [other]
+        for target in targets:
+            declined = self.turned_down(target)
+            found = best_offer(self, target, exclude=declined)
+            if found:
+                request, offer = found
+                metrics.trades_proposed.inc()
+                # don't ask again until one of them has something different
+                # to trade, or make it as a counteroffer to their counteroffer
+                declined.add(signature(request, offer))
+                return bool(target.evaluate_offer(self, request, offer))
 
     def to_trade(self):
         for i in self.deeds:
@@ -782,6 +854,23 @@ class ComputerPlayer(Player):
         self.move()
         return 'exit'
 
+def strategy_class(name):
+    """ Find the class for a computer strategy.
+    
+    Arguments:
+        name (str, None): the strategy's name. either 'heuristic' or 'rollout'.
+            if None, uses 'heuristic'
+            
+    Returns:
+        type: ComputerPlayer, or the subclass for the strategy
+    """
+    if name == 'rollout':
+        from monopoly_rollout import RolloutPlayer
+        return RolloutPlayer
+    if name not in (None, 'heuristic'):
+        raise ValueError(f'unknown strategy: {name}')
+    return ComputerPlayer
+
 def make_players(state):
     """ Makes player objects for however many players there are, and determines
     turn order.
@@ -798,14 +887,18 @@ def make_players(state):
     with open('config.json', 'r', encoding='utf-8') as f:
         settings = json.load(f)
     players = []
+    base = len(protected_words)
     for i in range(settings['humans']):
         p_det = HumanPlayer(state, pnum=i + 1)
-        protected_words.append(p_det.name)
+        protected_words.append(p_det.name.lower())
         players.append(p_det)
+    # names only need to be unique within a game, so free them up for the next one
+    del protected_words[base:]
+    cclass = strategy_class(settings.get('strategy'))
     for i in range(settings['computers']):
-        c = ComputerPlayer(state, pnum=i + 1) # add args
+        c = cclass(state, pnum=i + 1) # add args
         players.append(c)
-    shuffle(players)
+    rng().shuffle(players)
     x = 0
     for i in players:
         i.turn = x
@@ -0,0 +1,115 @@
+""" The weights behind ComputerPlayer's heuristics, gathered in one object so
+they can be saved, loaded, and tuned.
+"""
+import json
+
+class Policy:
+    """ A set of ComputerPlayer weights.
+
+    Attributes:
+        mort_priority (list): sets in the order to give up on first. to_unmortgage
+            pays off mortgages in the reverse order
+        bid_wallet_share (float): the share of its wallet a player will always
+            bid up to
+        bid_low_wallet (int): below this much money, bids are scaled down
+        bid_low_factor (float): how much bids are scaled down by
+        bid_margin (int): how much money to keep back when bidding
+        bid_spread (int): how far a bid limit is randomly moved either way
+        buy_margin (int): how much money to keep back after buying
+        jail_pay_turns (float): turns per player before this, a player always
+            pays to leave Jail
+        jail_pay_props (int): a player with fewer properties than this also pays
+        jail_roll_turns (float): turns per player after this, a player always rolls
+        unmortgage_factor (float): a player unmortgages a property once they
+            have this many times its mortgage value
+        receive_full_factor (float): when given a mortgaged property that
+            completes a set, unmortgage it with this many times its mortgage value
+        receive_factor (float): likewise for any other mortgaged property
+        build_reserve (int): the least money to hold back when building
+        horizon (int): how many turns of each opponent to value rent over
+        trade_min_props (int): the fewest properties a trade may leave a player with
+        trade_card_value (int): what a Get Out of Jail Free card is worth
+        trade_few_props_factor (float): how much more money is worth to a
+            player with fewer than trade_min_props properties
+        trade_offer_factor (float): how many times its cash value a trade
+            offer must be worth
+        trade_rival_weight (float): how much of their share of what a trade
+            does for the other side counts against it. 0 judges trades only
+            by what they do for the player
+        trade_price_ratio (float): no longer used, since proposals come from
+            monopoly_trading. kept so older policy files still load
+        trade_sweetener (int): no longer used, likewise
+    """
+    defaults = {
+        'mort_priority': ['Utilities', 'Brown', 'Dark Blue', 'Light Blue', 'Pink', 'Green', 'Railroads', 'Yellow', 'Orange', 'Red'],
+        'bid_wallet_share': 0.1,
+        'bid_low_wallet': 200,
+        'bid_low_factor': 0.75,
+        'bid_margin': 50,
+        'bid_spread': 30,
+        'buy_margin': 50,
+        'jail_pay_turns': 5,
+        'jail_pay_props': 5,
+        'jail_roll_turns': 15,
+        'unmortgage_factor': 2.5,
+        'receive_full_factor': 2,
+        'receive_factor': 2.5,
+        'build_reserve': 150,
+        'horizon': 60,
+        'trade_min_props': 6,
+        'trade_card_value': 40,
+        'trade_few_props_factor': 1.2,
+        'trade_offer_factor': 1.5,
+        'trade_rival_weight': 1.0,
+        'trade_price_ratio': 1.5,
+        'trade_sweetener': 20,
+    }
+
+    def __init__(self, **weights):
+        """ Make a Policy, with the default for any weight not given.
+
+        Raises:
+            ValueError: if a weight isn't recognized
+        """
+        unknown = set(weights) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"unknown policy weights: {', '.join(sorted(unknown))}")
+        for name, value in self.defaults.items():
+            setattr(self, name, weights.get(name, value))
+
+    def as_dict(self):
+        """ Returns:
+            dict: every weight and its value
+        """
+        return {name: getattr(self, name) for name in self.defaults}
+
+    def __repr__(self):
+        changed = {k: v for k, v in self.as_dict().items() if v != self.defaults[k]}
+        return f'<Policy {changed}>'
+
+    def save(self, path):
+        """ Write the weights to a JSON file.
+
+        Arguments:
+            path (str): the file to write to
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """ Read weights from a JSON file. weights left out keep their defaults.
+
+        Arguments:
+            path (str): the file to read
+
+        Raises:
+            ValueError: if the file has an unrecognized weight
+
+        Returns:
+            Policy: the policy
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+default_policy = Policy()
@@ -0,0 +1,265 @@
+""" Per-phase timing for the game loop.
+
+The profiler is off by default, and timed functions cost one attribute check
+when it is. Turn it on with profiler.enable(), or by passing --profile to
+main.py. Only the main thread is timed, so playouts in worker threads don't
+tangle the phase stack.
+"""
+from functools import wraps
+from threading import current_thread, main_thread
+from time import perf_counter_ns
+import json
+
+def summarize(durations):
+    """ Summarize a list of durations.
+
+    Arguments:
+        durations (list): durations in nanoseconds
+
+    Returns:
+        dict: the count, and the total, median, 95th percentile, and max in seconds
+    """
+    ordered = sorted(durations)
+    n = len(ordered)
+    if not n:
+        return {'count': 0, 'total': 0, 'p50': 0, 'p95': 0, 'max': 0}
+    return {'count': n, 'total': sum(ordered) / 1e9, 'p50': ordered[(n - 1) // 2] / 1e9,
+            'p95': ordered[int(0.95 * (n - 1))] / 1e9, 'max': ordered[-1] / 1e9}
+
+class Profiler:
+    """ Collects how long each phase of a game takes.
+
+    Attributes:
+        enabled (bool): whether phases are currently being timed
+        stack (list): the names of the phases currently running, outermost first
+        child (list): for each running phase, the time spent in its finished
+            nested phases, in nanoseconds
+        times (dict): phase names and the durations recorded for them this game,
+            in nanoseconds
+        folded (dict): semicolon-joined phase stacks and the time spent in them,
+            not counting nested phases, in nanoseconds
+        games (list): the summary of each finished game
+        totals (dict): phase names and their durations across every finished game
+        folded_totals (dict): folded stacks across every finished game
+        decisions (dict): decision kinds and how many were made under
+            monopoly_budget's limits
+        overruns (dict): decision kinds and how far past their time limit
+            each overrun went, in nanoseconds
+        op_overruns (dict): decision kinds and how many went past their
+            operation limit
+    """
+    def __init__(self):
+        """ Initialize a disabled Profiler.
+
+        Side effects:
+            sets attributes
+        """
+        self.enabled = False
+        self.stack = []
+        self.child = []
+        self.times = {}
+        self.folded = {}
+        self.games = []
+        self.totals = {}
+        self.folded_totals = {}
+        self.decisions = {}
+        self.overruns = {}
+        self.op_overruns = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """ Throw away everything recorded so far.
+
+        Side effects:
+            clears every recorded time, keeping the enabled flag
+        """
+        enabled = self.enabled
+        self.__init__()
+        self.enabled = enabled
+
+    def push(self, name):
+        """ Start timing a phase.
+
+        Arguments:
+            name (str): the phase's name
+
+        Side effects:
+            adds the phase to the stack
+
+        Returns:
+            int: the start time, to pass to pop()
+        """
+        self.stack.append(name)
+        self.child.append(0)
+        return perf_counter_ns()
+
+    def pop(self, start):
+        """ Stop timing the innermost phase.
+
+        Arguments:
+            start (int): the value returned by the matching push()
+
+        Side effects:
+            records the phase's duration, and its time outside nested phases
+        """
+        elapsed = perf_counter_ns() - start
+        key = ';'.join(self.stack)
+        name = self.stack.pop()
+        nested = self.child.pop()
+        if self.child:
+            self.child[-1] += elapsed
+        self.times.setdefault(name, []).append(elapsed)
+        self.folded[key] = self.folded.get(key, 0) + elapsed - nested
+
+    def phase(self, name):
+        """ Time a block of code.
+
+        Arguments:
+            name (str): the phase's name
+
+        Returns:
+            Phase: a context manager that times its block while the profiler
+                is enabled
+        """
+        return Phase(self, name)
+
+    def timed(self, name):
+        """ A decorator that times every call to a function as a phase.
+
+        Arguments:
+            name (str): the phase's name
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or current_thread() is not main_thread():
+                    return func(*args, **kwargs)
+                start = self.push(name)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.pop(start)
+            return wrapper
+        return decorator
+
+    def decision(self, kind, deadline):
+        """ Record a finished decision, and whether it overran its limits.
+
+        Arguments:
+            kind (str): the decision
+            deadline (Deadline): its deadline, from monopoly_budget
+
+        Side effects:
+            counts the decision, and any overrun, if made on the main thread
+        """
+        if current_thread() is not main_thread():
+            return
+        self.decisions[kind] = self.decisions.get(kind, 0) + 1
+        if deadline.seconds is not None:
+            over = deadline.elapsed() - deadline.seconds
+            if over > 0:
+                self.overruns.setdefault(kind, []).append(int(over * 1e9))
+        if deadline.operations is not None and deadline.ops > deadline.operations:
+            self.op_overruns[kind] = self.op_overruns.get(kind, 0) + 1
+
+    def budget_report(self):
+        """ Returns:
+            dict: for each kind of decision, how many were made, and how many
+                overran their time limit, by how much, and their operation limit
+        """
+        return {kind: {'decisions': n, 'over time': summarize(self.overruns.get(kind, [])),
+                       'over operations': self.op_overruns.get(kind, 0)}
+                for kind, n in sorted(self.decisions.items())}
+
+    def start_game(self):
+        """ Start recording a new game.
+
+        Side effects:
+            clears the current game's times
+        """
+        self.times = {}
+        self.folded = {}
+
+    def end_game(self, label=None):
+        """ Finish recording a game.
+
+        Arguments:
+            label (str, None): a name for the game in the report
+
+        Side effects:
+            adds the game's summary to self.games, and its times to the totals
+        """
+        if not self.enabled or not self.times:
+            return
+        self.games.append({'label': label or f'game {len(self.games) + 1}',
+                           'phases': {k: summarize(v) for k, v in self.times.items()}})
+        for k, v in self.times.items():
+            self.totals.setdefault(k, []).extend(v)
+        for k, v in self.folded.items():
+            self.folded_totals[k] = self.folded_totals.get(k, 0) + v
+        self.times = {}
+        self.folded = {}
+
+    def report(self):
+        """ Build the timing breakdown.
+
+        Returns:
+            dict: the summary of each game, and of every game together, the
+                decision cache's and endgame solver's statistics, and decision
+                budget overruns
+        """
+        from monopoly_decisions import decisions
+        from monopoly_endgame import endgame
+        return {'games': self.games, 'aggregate': {k: summarize(v) for k, v in self.totals.items()},
+                'decision cache': decisions.stats(), 'endgame cache': endgame.table.stats(),
+                'decision budgets': self.budget_report()}
+
+    def folded_stacks(self):
+        """ Build the flamegraph-compatible folded stacks.
+
+        Returns:
+            str: one line per stack, with its time in microseconds
+        """
+        return '\n'.join(f'{k} {v // 1000}' for k, v in sorted(self.folded_totals.items())) + '\n'
+
+    def write(self, path):
+        """ Write the breakdown to a file.
+
+        Arguments:
+            path (str): the file to write to. if it ends in .folded, writes
+                folded stacks. otherwise writes JSON
+
+        Side effects:
+            writes to a file, creating it if necessary
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.folded'):
+                f.write(self.folded_stacks())
+            else:
+                json.dump(self.report(), f, indent=2)
+
+class Phase:
+    """ A context manager for timing one block of code with a Profiler.
+    """
+    def __init__(self, prof, name):
+        self.prof = prof
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if self.prof.enabled and current_thread() is main_thread():
+            self.start = self.prof.push(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self.prof.pop(self.start)
+            self.start = None
+
+profiler = Profiler()
+timed = profiler.timed
@@ -0,0 +1,154 @@
+""" What computer players know about their opponents, for judging trades.
+
+A trade that helps a player can help the other side more. Handing someone the
+last property of a set they have the cash to build on is the classic bad
+trade. A profile sums up one opponent: which sets they're short of and by how
+much, how much cash they could raise to build with, what their properties earn
+now, and so how big a threat they are.
+
+Each set's share of a profile is kept in the shared decision cache, keyed by
+the player's running hash of that set (see Player.holding). When a property
+changes hands, or a building or mortgage changes, only that set's share is
+worked out again, and a profile is otherwise ten cache lookups plus the
+player's running totals.
+"""
+from monopoly_decisions import decisions, holdings, rent_change
+from monopoly_property import board_spaces, Railroad, Utility
+from monopoly_valuation import get_valuation
+
+# the properties in each set that can be built on
+streets = {}
+for space in board_spaces.values():
+    if not isinstance(space, (str, Railroad, Utility)):
+        streets.setdefault(space.set, []).append(space)
+
+class Profile:
+    """ A summary of one player, as an opponent in trades.
+
+    Attributes:
+        name (str): the player's name
+        needs (dict): set names and how many more properties the player
+            needs for the full set, for every set they have part of but not all
+        cash (int): how much money they could raise, by selling every building
+            and mortgaging every property
+        income (float): the rent they expect per opponent turn from what
+            they have now
+        reach (tuple): for each street set they're one property short of,
+            the set's name and how many houses per property they could afford
+            to build, up to 5, if they got the last one
+        threat (float): the rent they expect to collect per round, from every
+            opponent
+    """
+    def __init__(self, name, needs, cash, income, reach, threat):
+        self.name = name
+        self.needs = needs
+        self.cash = cash
+        self.income = income
+        self.reach = reach
+        self.threat = threat
+
+    def __repr__(self):
+        return f'<Profile {self.name}: needs {self.needs}, threat {self.threat:.0f}>'
+
+def set_profile(player, s, horizon):
+    """ A player's standing in one set, memoized.
+
+    Arguments:
+        player (Player): the player
+        s (str): the set's name
+        horizon (int): the valuation horizon, for which tables to use
+
+    Returns:
+        tuple: how many more of the set they need, and what the ones they have
+            earn per opponent turn
+    """
+    def compute():
+        owned = player.deeds[s]
+        total = owned[0].stot if owned else 0
+        return total - len(owned), get_valuation(horizon=horizon).set_income(owned, len(owned))
+    return decisions.get('set_profile', ('set_profile', s, horizon, player.holding[s]), compute)
+
+def houses(cash, s):
+    """ Returns:
+        int: how many houses per property, up to 5, some cash would build
+            across a whole street set
+    """
+    props = streets[s]
+    return min(5, cash // (props[0].bprice * len(props)))
+
+def profile(player, horizon=60):
+    """ Sum up a player as an opponent.
+
+    Arguments:
+        player (Player): the player
+        horizon (int): the valuation horizon. defaults to 60
+
+    Returns:
+        Profile: their profile
+    """
+    needs = {}
+    income = 0
+    for s, owned in player.deeds.items():
+        if not owned:
+            continue
+        missing, earns = set_profile(player, s, horizon)
+        income += earns
+        if missing:
+            needs[s] = missing
+    cash = player.liquid_value()
+    reach = tuple([(s, houses(cash, s)) for s, missing in sorted(needs.items()) if missing == 1 and s in streets])
+    return Profile(player.name, needs, cash, income, reach, income * player.opponents())
+
+def rival_gain(rival, gained, given, horizon, reach=None):
+    """ What a trade is worth to the other side of it, in rent over the
+        horizon, counting the houses they could build on any set it completes.
+
+    Arguments:
+        rival (Player): the other side
+        gained (list): the properties they'd get
+        given (list): the properties they'd give up
+        horizon (int): the valuation horizon
+        reach (tuple, None): their profile's reach. if None, it's worked out
+
+    Returns:
+        float: the change in the rent they'd collect, from all their opponents
+    """
+    if reach is None:
+        reach = profile(rival, horizon).reach
+    sets = {p.set for p in gained}.union([p.set for p in given])
+    reach = tuple([r for r in reach if r[0] in sets])
+    key = ('rival_gain', horizon, rival.opponents(), tuple([(p.loc, p.bnum, p.mstatus) for p in gained]),
+           tuple([p.loc for p in given]), holdings(rival, sets), reach)
+    def compute():
+        total = rent_change(rival, horizon, gained=gained, given=given)
+        valuation = get_valuation(horizon=horizon)
+        for s, built in reach:
+            if not built or any(p.set == s for p in given):
+                continue
+            if len(rival.deeds[s]) + sum(p.set == s for p in gained) == streets[s][0].stot:
+                for p in streets[s]:
+                    rents = valuation.rents[p.loc]
+                    total += (rents[built + 1] - rents[1]) * rival.opponents() * horizon
+        return total
+    return decisions.get('rival_gain', key, compute)
+
+def rival_cost(player, rival, gained, given, policy, reach=None):
+    """ What the other side's gain from a trade costs a player: their share
+        of the extra rent the other side will collect.
+
+    Arguments:
+        player (Player): the player
+        rival (Player): the other side of the trade
+        gained (list): the properties the rival would get
+        given (list): the properties the rival would give up
+        policy (Policy): the player's weights
+        reach (tuple, None): the rival's profile's reach, if already known
+
+    Returns:
+        float: the cost, in dollars. negative if the trade leaves the rival
+            worse off
+    """
+    if not policy.trade_rival_weight or not (gained or given):
+        return 0
+    share = 1 / max(rival.opponents(), 1)
+    return policy.trade_rival_weight * share * rival_gain(rival, gained, given, policy.horizon, reach)
@@ -1,5 +1,6 @@
 from monopoly_basic_exp import roll_dice, advprint
 from monopoly_exceptions import LoserError, ImprovementError
+from monopoly_profiler import timed
 
 class Property:
     """ An object for properties.
@@ -23,6 +24,7 @@ class Property:
             owns.
         iprice (int): how much a player pays in interest when recieving this
             property mortgaged.
+        loc (int): its index in board_spaces
     """
     def __init__(self, name:str, my_set:str, set_total:int, price:int, mortgage_price:int, \
                  rent_prices:list, building_price:int, building_num:int=0, \
@@ -62,7 +64,60 @@ class Property:
         self.extra = False
         self.pcount = 0
         self.iprice = self.mprice // 10
+        self.loc = None
     
+    def base_rent(self):
+        """ Works out the rent from scratch, without any extra rent.
+        
+        Returns:
+            int: 0 if the property is unowned or mortgaged
+                elif the owner has the full set, and self has no improvements, 
+                    double the unimproved rent
+                else, the rent value from self.rent, using its improvement
+                    level as the index
+        """
+        if self.mstatus or not self.owner:
+            return 0
+        if self.pcount == self.stot and self.bnum == 0:
+            return 2 * self.rent[0]
+        return self.rent[self.bnum]
+    
+    def cached_rent(self):
+        """ Looks up the rent in the owner's game's rent table.
+        
+        Returns:
+            int: the rent in the table, or from base_rent if the owner isn't
+                in a game
+        """
+        try:
+            return self.owner.game.rents[self.loc]
+        except AttributeError:
+            return self.base_rent()
+    
+    def changed(self):
+        """ Tells the owner's game that this property's rent may have changed.
+        
+        Side effects:
+            updates the rent table for the property's set
+        """
+        game = getattr(self.owner, 'game', None)
+        if game is not None:
+            game.update_rents(self.set)
+
+    def retrack(self, sign=1):
+        """ Adds this property to its owner's running totals, or removes it.
+            Does nothing if the owner hasn't taken the deed yet.
+
+        Arguments:
+            sign (int): 1 to add the property as it is now, or -1 to remove it
+
+        Side effects:
+            updates the owner's running totals
+        """
+        deeds = getattr(self.owner, 'deeds', None)
+        if deeds is not None and self in deeds[self.set]:
+            self.owner.track(self, sign)
+
     def get_rent(self):
         """ Determines how much to charge for rent.
         
@@ -77,15 +132,14 @@ class Property:
                     returns double the unimproved rent
                 else, returns the rent value from self.rent, using its 
                     improvement level as the index
+                all but extra rent are read from the game's rent table
         """
         if self.extra:
             self.extra = False
             return self.rent[self.bnum] * 2
-        elif self.pcount == self.stot and self.bnum == 0:
-            return 2 * self.rent[0]
-        else:
-            return self.rent[self.bnum]
+        return self.cached_rent()
     
+    @timed('pay_rent')
     def pay_rent(self, lord, guest):
         """ Charges rent between two players.
         
@@ -132,7 +186,10 @@ class Property:
         """
         if self.bnum == 5:
             return None
+        self.retrack(-1)
         self.bnum += num
+        self.retrack()
+        self.changed()
         advprint(f"{self.owner} built {self.name} to level {self.bnum}")
         return self.bprice * num
     
@@ -154,7 +211,10 @@ class Property:
         """
         if self.bnum == 0:
             return
+        self.retrack(-1)
         self.bnum -= num
+        self.retrack()
+        self.changed()
         advprint(f"{self.owner} sold a house on {self.name}")
         return int((self.bprice * num * 0.5) // 1)
     
@@ -185,7 +245,10 @@ class Property:
                 advprint("All properties in a set must have no houses in order to mortgage any property in that set")
                 return
         self.owner += self.mprice
+        self.retrack(-1)
         self.mstatus = True
+        self.retrack()
+        self.changed()
         advprint(f"{self.owner} mortgaged {self.name}")
         return True
     
@@ -209,7 +272,10 @@ class Property:
             advprint("You don't have enough money to unmortgage this")
             return
         self.owner -= int((self.mprice * 1.1) // 1)
+        self.retrack(-1)
         self.mstatus = False
+        self.retrack()
+        self.changed()
         advprint(f"{self.owner} unmortgaged {self} for ${int(self.mprice * 1.1)}")
         return True
     
@@ -228,11 +294,11 @@ class Property:
         
         if self.pcount == self.stot and other.pcount == other.stot:
             mcount1 = 0
-            for i in self.deeds[self.set]:
+            for i in self.owner.deeds[self.set]:
                 if i.mstatus:
                     mcount1 += 1
             mcount2 = 0
-            for i in self.deeds[other.set]:
+            for i in self.owner.deeds[other.set]:
                 if i.mstatus:
                     mcount2 += 1
             return min(mcount1 / self.stot, mcount2 / other.stot)
@@ -259,9 +325,19 @@ class Railroad(Property):
         """
         if self.extra:
             self.extra = False
-            return self.rent[self.pcount - 1] * 2        
-        else:
-            return self.rent[self.pcount - 1]
+            return self.rent[self.pcount - 1] * 2
+        return self.cached_rent()
+    
+    def base_rent(self):
+        """ Works out the rent from scratch, without any extra rent.
+        
+        Returns:
+            int: 0 if the railroad is unowned or mortgaged, otherwise the rent
+                for the number of railroads its owner has
+        """
+        if self.mstatus or not self.owner:
+            return 0
+        return self.rent[self.pcount - 1]
         
     def build_house(self, num=1):
         raise ImprovementError('no building houses on railroads!')
@@ -293,7 +369,19 @@ class Utility(Property):
         if self.extra:
             self.extra = False
             return self.rent[1] * dice_roll
-        return self.rent[self.pcount - 1] * dice_roll    
+        return self.cached_rent() * dice_roll    
+    
+    def base_rent(self):
+        """ Works out the dice multiplier from scratch. the dice are rolled
+            separately, in get_rent.
+        
+        Returns:
+            int: 0 if the utility is unowned or mortgaged, otherwise the
+                multiplier for the number of utilities its owner has
+        """
+        if self.mstatus or not self.owner:
+            return 0
+        return self.rent[self.pcount - 1]
         
     def build_house(self, num=1):
         raise ImprovementError('no building houses on utilities!')
@@ -303,29 +391,48 @@ class Utility(Property):
     
 board_spaces = {0: 'Go', 1: Property('Mediterranean Avenue', 'Brown', 2, 60, 30, [2, 10, 30, 90, 160, 250], 50),
                 2: 'Community Chest', 3: Property('Baltic Avenue', 'Brown', 2, 60, 30, [4, 20, 60, 180, 320, 450], 50),
-                4: 'Income Tax', 5: Railroad('Reading Railroad', 'Railroads', 3, 200, 100, [25, 50, 100, 200], 0),
+                4: 'Income Tax', 5: Railroad('Reading Railroad', 'Railroads', 4, 200, 100, [25, 50, 100, 200], 0),
                 6: Property('Oriental Avenue', 'Light Blue', 3, 100, 50, [6, 30, 90, 270, 400, 550], 50),
                 7: 'Chance', 8: Property('Vermont Avenue', 'Light Blue', 3, 100, 50, [6, 30, 90, 270, 400, 550], 50),
                 9: Property('Connecticut Avenue', 'Light Blue', 3, 120, 60, [8, 40, 100, 300, 450, 600], 50),
                 10: 'Jail', 11: Property('St. Charles Place', 'Pink', 3, 140, 70, [10, 50, 150, 450, 625, 750], 100),
-                12: Utility('Electric Company', 'Utilities', 3, 150, 75, [4, 10], 0),
+                12: Utility('Electric Company', 'Utilities', 2, 150, 75, [4, 10], 0),
                 13: Property('States Avenue', 'Pink', 3, 140, 70, [10, 50, 150, 450, 625, 750], 100),
                 14: Property('Virginia Avenue', 'Pink', 3, 160, 80, [12, 60, 180, 500, 700, 900], 100),
-                15: Railroad('Pennsylvania Railroad', 'Railroads', 3, 200, 100, [25, 50, 100, 200], 0),
+                15: Railroad('Pennsylvania Railroad', 'Railroads', 4, 200, 100, [25, 50, 100, 200], 0),
                 16: Property('St. James Place', 'Orange', 3, 180, 90, [14, 70, 200, 550, 750, 950], 100),
                 17: 'Community Chest', 18: Property('Tennessee Avenue', 'Orange', 3, 180, 90, [14, 70, 200, 550, 750, 950], 100),
                 19: Property('New York Avenue', 'Orange', 3, 200, 100, [16, 80, 220, 600, 800, 1000], 100),
                 20: 'Free Parking', 21: Property('Kentucky Avenue', 'Red', 3, 220, 110, [18, 90, 250, 700, 875, 1050], 150),
                 22: 'Chance', 23: Property('Indiana Avenue', 'Red', 3, 220, 110, [18, 90, 250, 700, 875, 1050], 150),
                 24: Property('Illinois Avenue', 'Red', 3, 240, 120, [20, 100, 300, 750, 925, 1100], 150),
-                25: Railroad('B&O Railroad', 'Railroads', 3, 200, 100, [25, 50, 100, 200], 0),
+                25: Railroad('B&O Railroad', 'Railroads', 4, 200, 100, [25, 50, 100, 200], 0),
                 26: Property('Atlantic Avenue', 'Yellow', 3, 260, 130, [22, 110, 330, 800, 975, 1150], 150),
                 27: Property('Ventnor Avenue', 'Yellow', 3, 260, 130, [22, 110, 330, 800, 975, 1150], 150),
-                28: Utility('Water Works', 'Utilities', 3, 150, 75, [4, 10], 0),
+                28: Utility('Water Works', 'Utilities', 2, 150, 75, [4, 10], 0),
                 29: Property('Marvin Gardens', 'Yellow', 3, 280, 140, [24, 120, 360, 850, 1025, 1200], 150),
                 30: 'Go To Jail', 31: Property('Pacific Avenue', 'Green', 3, 300, 150, [26, 130, 390, 900, 1100, 1275], 200),
                 32: Property('North Carolina Avenue', 'Green', 3, 300, 150, [26, 130, 390, 900, 1100, 1275], 200),
                 33: 'Community Chest', 34: Property('Pennsylvania Avenue', 'Green', 3, 320, 160, [28, 150, 450, 1000, 1200, 1400], 200),
-                35: Railroad('Short Line', 'Railroads', 3, 200, 100, [25, 50, 100, 200], 0),
-                36: 'Chance', 37: Property('Park Place', 'Dark Blue', 3, 350, 175, [35, 175, 500, 1100, 1300, 1500], 200),
-                38: 'Luxury Tax', 39: Property('Boardwalk', 'Dark Blue', 3, 400, 200, [50, 200, 600, 1400, 1700, 2000], 200)}
\ No newline at end of file
+                35: Railroad('Short Line', 'Railroads', 4, 200, 100, [25, 50, 100, 200], 0),
+                36: 'Chance', 37: Property('Park Place', 'Dark Blue', 2, 350, 175, [35, 175, 500, 1100, 1300, 1500], 200),
+                38: 'Luxury Tax', 39: Property('Boardwalk', 'Dark Blue', 2, 400, 200, [50, 200, 600, 1400, 1700, 2000], 200)}
+
+for i, space in board_spaces.items():
+    if isinstance(space, Property):
+        space.loc = i
+
+def reset_board():
+    """ Puts every property on the board back to its starting state.
+    
+    Side effects:
+        clears the owner, buildings, mortgage, and extra rent of every Property
+            in board_spaces
+    """
+    for space in board_spaces.values():
+        if isinstance(space, Property):
+            space.owner = None
+            space.bnum = 0
+            space.mstatus = False
+            space.extra = False
+            space.pcount = 0
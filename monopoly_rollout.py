@@ -0,0 +1,307 @@
+""" A computer player that decides by playing the game forward.
+
+For each of its options, RolloutPlayer clones the game, applies the option,
+and plays a number of short random playouts with every player using the
+ComputerPlayer heuristics. It picks the option with the best average net worth
+at the end. Each playout i uses the same seed for every option, so the options
+are compared under the same dice and cards.
+
+Playouts run in a pool of worker processes by default, or threads. Each
+decision has a time budget, and once it runs out the decision is made on
+whatever playouts have finished. If none of an option's playouts have
+finished, the player falls back to the heuristic. A decision's limits from
+monopoly_budget cut the budget shorter, and an operation limit caps how many
+playouts are run, one operation each.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from monopoly_basic_exp import advprint, seeded, set_quiet
+from monopoly_budget import current, decision
+from monopoly_classes_exp import Auction
+from monopoly_player import ComputerPlayer
+from monopoly_building import plan as plan_builds
+from monopoly_profiler import timed
+import os
+import pickle
+import random
+
+def force(player, name, value):
+    """ Make a player's next call to a method return a set value, once.
+
+    Arguments:
+        player (Player): the player
+        name (str): the method's name
+        value: what the next call should return
+    """
+    def once(*args, **kwargs):
+        del player.__dict__[name]
+        return value
+    setattr(player, name, once)
+
+def heuristic(state):
+    """ Switch every player in a cloned game to the ComputerPlayer heuristics,
+        so playouts never prompt for input or start playouts of their own.
+
+    Arguments:
+        state (BoardState): the cloned game
+    """
+    for p in state.players:
+        if type(p) is not ComputerPlayer:
+            p.__class__ = ComputerPlayer
+            p.type = 'ai'
+
+def finish_turn(state):
+    """ Move a cloned game on to the next player, after a decision made in the
+        middle of someone's turn. whatever was left of that turn is skipped.
+    """
+    state.turntotal += 1
+    state.turn = (state.turn + 1) % len(state.players)
+
+def apply(state, me, kind, option, detail):
+    """ Play out one option of a decision in a cloned game.
+
+    Arguments:
+        state (BoardState): the cloned game
+        me (Player): the deciding player, in the clone
+        kind (str): the decision: 'buy', 'jail', 'build', 'bid', or 'trade'
+        option: the option chosen
+        detail: anything else the decision needs, as board indices and
+            player indices rather than objects
+
+    Side effects:
+        changes the cloned game
+    """
+    if kind == 'buy':
+        prop = state.board[detail]
+        if option:
+            state.buy_property(me, prop)
+        else:
+            auc = Auction(prop, [p for p in state.players if p not in state.plost], state)
+            if auc.auc():
+                state.buy_property(auc.cp, prop, other_price=auc.cbid)
+        finish_turn(state)
+    elif kind == 'bid':
+        prop = state.board[detail]
+        auc = Auction(prop, [p for p in state.players if p not in state.plost], state)
+        auc.limits[me] = option - option % auc.increment
+        if auc.auc():
+            state.buy_property(auc.cp, prop, other_price=auc.cbid)
+        finish_turn(state)
+    elif kind == 'jail':
+        # the clone was made partway through a turn in Jail, which has
+        # already been counted, so the turn carries on from the decision
+        state.cp = me
+        outcome = state.p_jail_reset(option)
+        if outcome:
+            state.move(new_loc=(10 + outcome[0]) % 40)
+        elif outcome is False:
+            me.move()
+        finish_turn(state)
+    elif kind == 'build':
+        if not option:
+            force(me, 'to_build', False)
+    elif kind == 'trade':
+        if option:
+            other, offer, request = detail
+            decode = lambda d: {'properties': [state.board[i] for i in d['properties']],
+                                'money': d['money'], 'cards': d['cards']}
+            me.process_trade(state.players[other], decode(offer), decode(request))
+
+def rollout(blob, me, kind, option, detail, seed, depth):
+    """ One playout of one option, run in a worker.
+
+    Arguments:
+        blob (bytes): the pickled game
+        me (int): the deciding player's index in the game's player list
+        kind (str): the decision, as in apply()
+        option: the option to play out
+        detail: the decision's details, as in apply()
+        seed (int): the seed for the playout's own random number generator
+        depth (int): how many turns to play
+
+    Returns:
+        int: the deciding player's net worth at the end, or 0 if they lost
+    """
+    set_quiet()
+    state = pickle.loads(blob)
+    with seeded(seed):
+        heuristic(state)
+        player = state.players[me]
+        apply(state, player, kind, option, detail)
+        for _ in range(depth):
+            if len(state.players) - len(set(state.plost)) <= 1:
+                break
+            state.step()
+    if player in state.plost:
+        return 0
+    return player.net_worth()
+
+class Rollouts:
+    """ The pool that playouts run in, shared by every RolloutPlayer.
+
+    Attributes:
+        workers (int): how many workers to run
+        threads (bool): whether to use threads instead of processes. threads
+            avoid starting processes, but only one runs Python at a time.
+            either way, each playout has its own random number generator, and
+            isn't profiled or counted in the metrics
+        pool (Executor, None): the pool, once it's started
+    """
+    def __init__(self, workers=None, threads=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.pool = None
+
+    def start(self):
+        """ Start the pool, if it isn't running.
+
+        Returns:
+            Executor: the pool
+        """
+        if self.pool is None:
+            pclass = ThreadPoolExecutor if self.threads else ProcessPoolExecutor
+            self.pool = pclass(max_workers=self.workers, initializer=set_quiet)
+        return self.pool
+
+    def shutdown(self):
+        """ Stop the pool, dropping any playouts that haven't started.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def evaluate(self, state, me, kind, options, detail, rollouts, depth, budget):
+        """ Play out every option of a decision.
+
+        Arguments:
+            state (BoardState): the real game, which isn't changed
+            me (int): the deciding player's index in the game's player list
+            kind (str): the decision, as in apply()
+            options (list): the options to compare
+            detail: the decision's details, as in apply()
+            rollouts (int): how many playouts to run for each option
+            depth (int): how many turns each playout lasts
+            budget (float): how many seconds to wait for playouts
+
+        Side effects:
+            uses the random module once, to seed the playouts
+
+        Returns:
+            dict: options and their average outcome, for every option with at
+                least one finished playout
+        """
+        pool = self.start()
+        blob = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        base = random.getrandbits(32)
+        futures = {}
+        # submitted a round at a time, so a short budget still covers every option
+        for i in range(rollouts):
+            for option in options:
+                futures[pool.submit(rollout, blob, me, kind, option, detail, base + i, depth)] = option
+        done, waiting = wait(futures, timeout=budget)
+        for f in waiting:
+            f.cancel()
+        results = {}
+        for f in done:
+            if f.exception() is None:
+                results.setdefault(futures[f], []).append(f.result())
+        return {option: sum(r) / len(r) for option, r in results.items()}
+
+engine = Rollouts()
+
+class RolloutPlayer(ComputerPlayer):
+    """ A computer player that makes its buying, bidding, Jail, building, and
+        trade choices with playouts.
+
+    Attributes:
+        rollouts (int): how many playouts to run for each option
+        depth (int): how many turns each playout lasts
+        budget (float): how many seconds each decision may take
+    """
+    strategy = 'rollout'
+    rollouts = 16
+    depth = 40
+    budget = 1.0
+
+    def choose(self, kind, options, detail=None):
+        """ Pick the option whose playouts end with the best net worth.
+
+        Arguments:
+            kind (str): the decision, as in apply()
+            options (list): the options to compare
+            detail: the decision's details, as in apply()
+
+        Returns:
+            the best option, or None if any option has no finished playouts
+        """
+        options = list(options)
+        if len(options) == 1:
+            return options[0]
+        deadline = current()
+        rollouts = min(self.rollouts, deadline.ops_left(self.rollouts * len(options)) // len(options))
+        if not rollouts:
+            return None
+        scores = engine.evaluate(self.game, self.game.players.index(self), kind, options, detail,
+                                 rollouts, self.depth, min(self.budget, deadline.remaining(self.budget)))
+        deadline.tick(rollouts * len(options))
+        if len(scores) < len(options):
+            return None
+        best = max(options, key=lambda o: scores[o])
+        advprint(f"{self} weighed {kind} options {scores} and chose {best}")
+        return best
+
+    @timed('rollout.buy_choice')
+    @decision('buy')
+    def buy_choice(self, prop):
+        if prop.price > self.wallet:
+            return super().buy_choice(prop)
+        choice = self.choose('buy', (True, False), prop.loc)
+        return super().buy_choice(prop) if choice is None else choice
+
+    @timed('rollout.jail_turn')
+    @decision('jail')
+    def jail_turn(self):
+        options = ['roll']
+        if self.wallet >= 50:
+            options.append('pay')
+        if self.chance:
+            options.append('chance')
+        if self.cc:
+            options.append('cc')
+        choice = self.choose('jail', options)
+        return super().jail_turn() if choice is None else choice
+
+    @timed('rollout.to_build')
+    @decision('build')
+    def to_build(self):
+        if not plan_builds(self):
+            return False
+        if self.choose('build', (True, False)) is False:
+            return False
+        return super().to_build()
+
+    @timed('rollout.calc_high_bid')
+    @decision('bid')
+    def calc_high_bid(self, prop):
+        base = super().calc_high_bid(prop)
+        if isinstance(prop, list):
+            return base
+        options = sorted({o for o in (0, prop.mprice, prop.price, base) if 0 <= o <= self.wallet})
+        choice = self.choose('bid', options, prop.loc)
+        return base if choice is None else choice
+
+    @timed('rollout.eval_trade')
+    @decision('trade')
+    def eval_trade(self, other, request, offer):
+        encode = lambda d: {'properties': [p.loc for p in d['properties']],
+                            'money': d.get('money', 0), 'cards': d.get('cards', 0)}
+        detail = (self.game.players.index(other), encode(offer), encode(request))
+        choice = self.choose('trade', (True, False), detail)
+        if choice is None:
+            return super().eval_trade(other, request, offer)
+        if choice:
+            advprint("Trade accepted")
+            self.process_trade(other, {**offer, 'cards': offer.get('cards', 0)},
+                               {**request, 'cards': request.get('cards', 0)})
+        else:
+            advprint("Trade cancelled")
+        return choice
@@ -0,0 +1,255 @@
+""" Spots games that have stopped going anywhere, and settles them early.
+
+Computer players often reach a point where nobody can finish anyone off: every
+property is owned, nobody has a set to build on, and everyone's cash keeps
+growing from passing Go. Left alone, those games run to the turn limit. The
+detector watches a sliding window of turns, and calls a game stalled once
+either
+
+    - no property has changed hands in a whole window, and no player's net
+      worth is falling fast enough to bankrupt them within ruin_turns, or
+    - the same position, with every property, player location, and Jail
+      status as it was, has come up repeat_limit times in the window.
+      wallets keep growing in a stalemate, so they're left out, along with
+      the decks.
+
+A stalled game is then adjudicated, either to the player with the highest net
+worth, or to the player who wins most often in short simulated playouts from
+where the game stands.
+"""
+from collections import Counter, deque
+from monopoly_basic_exp import output, seeded, set_quiet
+from monopoly_zobrist import location_key
+
+class Trend:
+    """ A sliding window of evenly spaced values, split into halves with
+        running sums, so how fast they're changing can be read off at any
+        time without adding the window up again.
+
+    Attributes:
+        window (int): the most values kept
+        older (deque): the older half of the values
+        newer (deque): the newer half, with the middle value first when
+            there's an odd number of them
+        older_sum (int): the sum of older
+        newer_sum (int): the sum of newer
+    """
+    def __init__(self, window):
+        self.window = window
+        self.older = deque()
+        self.newer = deque()
+        self.older_sum = 0
+        self.newer_sum = 0
+
+    def __len__(self):
+        return len(self.older) + len(self.newer)
+
+    def balance(self):
+        """ Move the newer half's first value to the older half, if the
+            newer half has grown too long.
+        """
+        if len(self.newer) > len(self.older) + 1:
+            value = self.newer.popleft()
+            self.newer_sum -= value
+            self.older.append(value)
+            self.older_sum += value
+
+    def append(self, value):
+        """ Add the next value, dropping the oldest if the window is full.
+        """
+        self.newer.append(value)
+        self.newer_sum += value
+        self.balance()
+        if len(self) > self.window:
+            self.older_sum -= self.older.popleft()
+            self.balance()
+
+    def rate(self):
+        """ How fast the values are changing: the difference between the
+            averages of the second and first halves, per step. the middle
+            value of an odd number isn't in either half.
+
+        Returns:
+            float: the change per turn
+        """
+        half = len(self.older)
+        if not half:
+            return 0
+        second = self.newer_sum
+        if len(self.newer) > half:
+            second -= self.newer[0]
+        return (second - self.older_sum) / (half * (len(self) - half))
+
+def position_hash(state):
+    """ A hash of the game without wallets or decks: every property's owner,
+        buildings, and mortgage, every player's location, Jail status, and
+        cards, and whose turn it is.
+
+    Returns:
+        int: the hash
+    """
+    h = state.zobrist
+    for p in state.players:
+        h ^= location_key(p)
+    return h
+
+def standing(state):
+    """ Returns:
+        list: the players who haven't lost, in turn order
+    """
+    lost = set(state.plost)
+    return [p for p in state.players if p not in lost]
+
+def by_worth(state):
+    """ Adjudicate a game by net worth.
+
+    Arguments:
+        state (BoardState): the game
+
+    Returns:
+        dict: each standing player's share of the standing players' total net
+            worth, by name
+    """
+    players = standing(state)
+    total = sum(max(p.net_worth(), 0) for p in players) or 1
+    return {p.name: max(p.net_worth(), 0) / total for p in players}
+
+def by_playouts(state, playouts=32, depth=200):
+    """ Estimate each player's chance of winning, by playing the game forward.
+
+    Arguments:
+        state (BoardState): the game, which isn't changed
+        playouts (int): how many games to play forward. defaults to 32
+        depth (int): how many turns each lasts. a playout still going at the
+            end goes to the player with the highest net worth. defaults to 200
+
+    Side effects:
+        each playout has its own random number generator, so the game's
+            isn't touched
+
+    Returns:
+        dict: each standing player's share of the playouts won, by name
+    """
+    from monopoly_rollout import heuristic
+    quiet = getattr(output, 'quiet', False)
+    set_quiet()
+    wins = dict.fromkeys((p.name for p in standing(state)), 0)
+    try:
+        for i in range(playouts):
+            clone = state.clone()
+            with seeded(i):
+                heuristic(clone)
+                for _ in range(depth):
+                    if len(standing(clone)) <= 1:
+                        break
+                    clone.step()
+            winner = max(standing(clone), key=lambda p: p.net_worth())
+            wins[winner.name] += 1
+    finally:
+        set_quiet(quiet)
+    return {name: count / playouts for name, count in wins.items()}
+
+class StalemateDetector:
+    """ Watches a game for stalemate, one turn at a time.
+
+    Attributes:
+        window (int): how many turns to look back over. 0 turns detection off
+        min_turns (int): the fewest turns a game plays before it can be
+            called stalled
+        ruin_turns (int): a player whose net worth would hit 0 within this
+            many turns, at its current trend, is still in trouble
+        repeat_limit (int): how many times one state may come up in the window
+        adjudicate (str): 'worth' or 'playouts', how to settle a stalled game
+        worth (dict): player names and the Trend of their recent net worths
+        owners (tuple, None): the owner of every property, as of the last turn
+        turns (int): how many turns have been watched
+        last_change (int): the turn property last changed hands
+        hashes (deque): the recent position_hash()es
+        seen (Counter): the recent position hashes and how many times each came up
+        reason (str, None): why the game was called stalled, once it has been
+    """
+    def __init__(self, window=200, min_turns=300, ruin_turns=1000, repeat_limit=3, adjudicate='worth'):
+        if adjudicate not in ('worth', 'playouts'):
+            raise ValueError(f'unknown adjudication: {adjudicate}')
+        self.window = window
+        self.min_turns = min_turns
+        self.ruin_turns = ruin_turns
+        self.repeat_limit = repeat_limit
+        self.adjudicate = adjudicate
+        self.worth = {}
+        self.owners = None
+        self.turns = 0
+        self.last_change = 0
+        self.hashes = deque()
+        self.seen = Counter()
+        self.reason = None
+
+    def reset(self):
+        """ Forget every turn watched so far, for a new or loaded game.
+        """
+        self.__init__(self.window, self.min_turns, self.ruin_turns, self.repeat_limit, self.adjudicate)
+
+    def observe(self, state):
+        """ Record the state after a turn, and check for stalemate.
+
+        Arguments:
+            state (BoardState): the game
+
+        Side effects:
+            adds the turn to the window, and sets self.reason if the game has
+                stalled
+
+        Returns:
+            bool: whether the game has stalled
+        """
+        if not self.window:
+            return False
+        self.turns += 1
+        players = standing(state)
+        for p in players:
+            self.worth.setdefault(p.name, Trend(self.window)).append(p.net_worth())
+        owners = tuple([space.owner for space in state.board.values() if not isinstance(space, str)])
+        if owners != self.owners:
+            self.owners = owners
+            self.last_change = self.turns
+        h = position_hash(state)
+        self.hashes.append(h)
+        self.seen[h] += 1
+        if len(self.hashes) > self.window:
+            old = self.hashes.popleft()
+            self.seen[old] -= 1
+            if not self.seen[old]:
+                del self.seen[old]
+        if self.seen[h] >= self.repeat_limit:
+            self.reason = f'the same position came up {self.repeat_limit} times in {self.window} turns'
+            return True
+        if state.turntotal < self.min_turns or self.turns - self.last_change < self.window:
+            return False
+        for p in players:
+            change = self.worth[p.name].rate()
+            if change < 0 and p.net_worth() / -change < self.ruin_turns:
+                return False
+        self.reason = f'no property changed hands in {self.window} turns, and nobody was heading for bankruptcy'
+        return True
+
+    def result(self, state, playouts=32, depth=200):
+        """ Adjudicate a stalled game.
+
+        Arguments:
+            state (BoardState): the game
+            playouts (int): how many playouts to use, if adjudicating by playouts
+            depth (int): how many turns each playout lasts
+
+        Returns:
+            dict: the winner's name, the reason the game ended, the turn, and
+                each standing player's net worth share or chance of winning
+        """
+        if self.adjudicate == 'playouts':
+            odds = by_playouts(state, playouts, depth)
+            method = 'estimated chance of winning'
+        else:
+            odds = by_worth(state)
+            method = 'share of net worth'
+        winner = max(odds, key=odds.get)
+        return {'winner': winner, 'reason': f'stalemate: {self.reason}; adjudicated by {method}',
+                'turn': state.turntotal, 'odds': odds}
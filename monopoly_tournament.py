@@ -0,0 +1,283 @@
+""" Plays computer strategies against each other and rates them.
+
+Every game seats each entrant once. A match is a set of games on one seed,
+one for each rotation of the seats, so every entrant plays every seat under
+the same dice and cards. Each game's finishing order is split into pairwise
+results, and ratings are fitted to all of them on the Elo scale (a
+Bradley-Terry model). The pairwise results of one game, and the games of one
+match, which share their dice and cards, aren't independent, so each
+rating's standard error comes from a bootstrap over whole matches.
+
+Matches run in parallel processes, a wave at a time. After each wave, once
+the minimum number of matches is in, the tournament stops if every entrant's
+rating is separated from the next one's by more than --z standard errors, so
+a clear ranking isn't played out to the full --matches.
+
+Usage:
+
+    python monopoly_tournament.py heuristic tuned=heuristic:policy.json [rollout] [--matches 200] [--min-matches 10]
+
+Each entrant is NAME=STRATEGY[:POLICY], or just STRATEGY. STRATEGY is
+'heuristic' or 'rollout', and POLICY is a weights file from monopoly_tuner.py.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from math import exp, log, sqrt
+from tempfile import TemporaryDirectory
+from monopoly_tuner import private_workdir
+import json
+import os
+import random
+import sys
+
+# the Elo scale: a 400 point gap means 10 to 1 odds
+scale = 400 / log(10)
+
+def parse_entrant(spec):
+    """ Read an entrant from the command line.
+
+    Arguments:
+        spec (str): NAME=STRATEGY[:POLICY], or STRATEGY[:POLICY]
+
+    Returns:
+        dict: the entrant's name, strategy, and policy weights, or None for
+            the defaults
+    """
+    name, _, rest = spec.rpartition('=')
+    strategy, _, path = rest.partition(':')
+    weights = None
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            weights = json.load(f)
+    return {'name': name or rest, 'strategy': strategy, 'policy': weights}
+
+def finishing_order(state):
+    """ Rank the players of a finished game.
+
+    Arguments:
+        state (BoardState): the game
+
+    Returns:
+        list: the players, winner first. players still in are ranked by net
+            worth, ahead of those who lost, who are ranked by how long they lasted
+    """
+    standing = sorted((p for p in state.players if p not in state.plost), key=lambda p: -p.net_worth())
+    return standing + list(dict.fromkeys(state.plost))[::-1]
+
+def play_game(entrants, seed, shift, max_turns=1000, budget=0.1):
+    """ Play one game, run in a worker.
+
+    Arguments:
+        entrants (list): the entrants, from parse_entrant()
+        seed (int): the game's seed
+        shift (int): how far to rotate the entrants around the seats
+        max_turns (int): how many turns to play before ranking the game on
+            net worth. games that stall are ranked the same way, as soon as
+            they do. defaults to 1000
+        budget (float): seconds a rollout player may spend on each decision.
+            defaults to 0.1
+
+    Side effects:
+        writes the game's config files in the working directory. a rollout
+            entrant's playouts run in a process that's stopped after the game
+
+    Returns:
+        list: the entrants' indices, in finishing order
+    """
+    from monopoly_basic_exp import set_quiet
+    from monopoly_bench import new_state
+    from monopoly_stalemate import StalemateDetector
+    from monopoly_player import strategy_class
+    from monopoly_policy import Policy
+    set_quiet()
+    state = new_state(len(entrants), seed)
+    seats = {}
+    for seat, player in enumerate(state.players):
+        i = (seat + shift) % len(entrants)
+        entrant = entrants[i]
+        player.__class__ = strategy_class(entrant['strategy'])
+        if entrant['policy'] is not None:
+            player.policy = Policy(**entrant['policy'])
+        if entrant['strategy'] == 'rollout':
+            from monopoly_rollout import engine
+            # the games are already spread over the processes, so each
+            # game's playouts get one process of their own
+            engine.workers = 1
+            player.budget = budget
+        seats[player] = i
+    detector = StalemateDetector()
+    try:
+        while state.turntotal < max_turns and len(state.players) - len(set(state.plost)) > 1:
+            state.step()
+            if detector.observe(state):
+                break
+    finally:
+        from monopoly_rollout import engine
+        # a worker can't exit while its playout process is still waiting
+        engine.shutdown()
+    return [seats[p] for p in finishing_order(state)]
+
+def pairwise(order, wins):
+    """ Count every pair of entrants in a finishing order as a win for the
+        one who placed higher.
+
+    Arguments:
+        order (list): entrant indices, winner first
+        wins (list): wins[i][j] is how many times i has beaten j
+
+    Side effects:
+        adds to wins
+    """
+    for a, i in enumerate(order):
+        for j in order[a + 1:]:
+            wins[i][j] += 1
+
+def fit(wins, iterations=500):
+    """ Fit Elo-scale ratings to pairwise results.
+
+    Arguments:
+        wins (list): wins[i][j] is how many times i has beaten j
+        iterations (int): how many rounds of the fitting algorithm to run.
+            defaults to 500
+
+    Returns:
+        list: each entrant's rating. ratings average 0
+    """
+    n = len(wins)
+    games = [[wins[i][j] + wins[j][i] for j in range(n)] for i in range(n)]
+    # half a win each way keeps unbeaten entrants from running off to infinity
+    won = [sum(wins[i]) + 0.5 * (n - 1) for i in range(n)]
+    strength = [1.0] * n
+    for _ in range(iterations):
+        new = []
+        for i in range(n):
+            denom = sum((games[i][j] + 1) / (strength[i] + strength[j]) for j in range(n) if j != i)
+            new.append(won[i] / denom)
+        mean = exp(sum(log(s) for s in new) / n)
+        strength = [s / mean for s in new]
+    return [scale * log(s) for s in strength]
+
+def combine(results):
+    """ Returns:
+        list: the pairwise wins of every match in results, added up
+    """
+    n = len(results[0])
+    return [[sum(r[i][j] for r in results) for j in range(n)] for i in range(n)]
+
+def ratings(results, rounds=100, seed=0):
+    """ Fit Elo-scale ratings to every match, with standard errors from
+        refitting to matches drawn at random, with replacement.
+
+    Arguments:
+        results (list): each match's pairwise wins, as for fit()
+        rounds (int): how many resamples to fit. defaults to 100
+        seed (int): the seed for drawing the resamples
+
+    Returns:
+        list: (rating, standard error) for each entrant. ratings average 0
+    """
+    rates = fit(combine(results))
+    rng = random.Random(seed)
+    samples = [fit(combine(rng.choices(results, k=len(results)))) for _ in range(rounds)]
+    errors = []
+    for i in range(len(rates)):
+        mean = sum(s[i] for s in samples) / rounds
+        errors.append(sqrt(sum((s[i] - mean) ** 2 for s in samples) / (rounds - 1)))
+    return list(zip(rates, errors))
+
+def settled(rates, z):
+    """ Check whether every entrant is clearly apart from the next one down.
+
+    Arguments:
+        rates (list): (rating, standard error) for each entrant
+        z (float): how many standard errors apart they must be
+
+    Returns:
+        bool: whether the ranking is settled
+    """
+    ranked = sorted(rates, reverse=True)
+    return all(a[0] - b[0] > z * sqrt(a[1] ** 2 + b[1] ** 2) for a, b in zip(ranked, ranked[1:]))
+
+def tournament(entrants, matches=200, min_matches=10, z=2.0, seed=0, workers=None, max_turns=1000, budget=0.1):
+    """ Run a tournament.
+
+    Arguments:
+        entrants (list): the entrants, from parse_entrant()
+        matches (int): the most matches to play. defaults to 200
+        min_matches (int): the fewest matches to play before stopping early.
+            defaults to 10
+        z (float): how many standard errors must separate neighbouring
+            ratings to stop early. defaults to 2
+        seed (int): the first match's seed. match m uses seed + m
+        workers (int, None): how many processes to play games in. if None,
+            one per CPU
+        max_turns (int): the turn limit for each game
+        budget (float): seconds a rollout player may spend on each decision
+
+    Side effects:
+        plays games in a directory of each worker's own, inside the working
+            directory, writing their config files
+
+    Returns:
+        dict: each entrant's rating, standard error, and average place, plus
+            how many matches and games were played and whether the
+            ranking settled
+    """
+    n = len(entrants)
+    results = []
+    places = [0] * n
+    played = 0
+    workers = workers or os.cpu_count() or 1
+    # enough matches per wave to keep every worker busy
+    wave = max(1, -(-workers // n))
+    with ProcessPoolExecutor(max_workers=workers, initializer=private_workdir) as pool:
+        while played < matches:
+            size = min(wave, matches - played)
+            futures = [[pool.submit(play_game, entrants, seed + played + m, shift, max_turns, budget)
+                        for shift in range(n)] for m in range(size)]
+            for match in futures:
+                wins = [[0] * n for _ in range(n)]
+                for f in match:
+                    order = f.result()
+                    pairwise(order, wins)
+                    for place, i in enumerate(order):
+                        places[i] += place + 1
+                results.append(wins)
+            played += size
+            if played >= min_matches and settled(ratings(results, seed=seed), z):
+                break
+    rates = ratings(results, seed=seed)
+    table = [{'name': e['name'], 'rating': round(r, 1), 'error': round(se, 1),
+              'average place': round(places[i] / (played * n), 2)}
+             for i, (e, (r, se)) in enumerate(zip(entrants, rates))]
+    table.sort(key=lambda row: -row['rating'])
+    return {'entrants': table, 'matches': played, 'games': played * n, 'settled': settled(rates, z)}
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("entrants", nargs='+', help="NAME=STRATEGY[:POLICY] or STRATEGY, at least two")
+    parser.add_argument("--matches", type=int, help="the most matches to play. each is one game per seat rotation", default=200)
+    parser.add_argument("--min-matches", type=int, help="the fewest matches before stopping early", default=10)
+    parser.add_argument("--z", type=float, help="standard errors between neighbouring ratings to stop early", default=2.0)
+    parser.add_argument("--max-turns", type=int, help="turns before a game is ranked on net worth", default=1000)
+    parser.add_argument("--rollout-budget", type=float, help="seconds a rollout player may spend on each decision", default=0.1)
+    parser.add_argument("--workers", type=int, help="processes to play games in", default=None)
+    parser.add_argument("--seed", type=int, help="the first match's seed", default=0)
+    parser.add_argument("-o", "--output", help="a file to write the results to as JSON", default=None)
+    args = parser.parse_args()
+    if len(args.entrants) < 2:
+        parser.error("a tournament needs at least two entrants")
+    entrants = [parse_entrant(spec) for spec in args.entrants]
+    output = args.output and os.path.abspath(args.output)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        result = tournament(entrants, args.matches, args.min_matches, args.z, args.seed, args.workers,
+                            args.max_turns, args.rollout_budget)
+    for row in result['entrants']:
+        print(f"{row['name']:<20} {row['rating']:>8.1f} ± {row['error']:<6.1f} average place {row['average place']}")
+    print(f"{result['games']} games in {result['matches']} matches; "
+          f"{'ranking settled' if result['settled'] else 'ranking not settled'}")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,353 @@
+""" Finds trades worth proposing between two players.
+
+A trade is a bundle from each side: some properties, some money, and some Get
+Out of Jail Free cards. Both sides are scored the same way ComputerPlayer
+judges an offer (see terms() and margin()): what the properties would do to
+their rent over the policy's horizon, plus what they'd fetch mortgaged, plus
+money and cards at face value, less each side's share of what the trade does
+for the other (see monopoly_profiles). The search looks for the bundle the
+proposer gains most from that the other side would still accept.
+
+Only properties that matter to someone are put on the table: ones in a set
+the receiver already has part of. Anything else would just change hands at
+its mortgage value, which money does as well. Swapping properties of the same
+set, or cards for cards, is never considered. For each pair of property
+bundles, the money that makes the other side just accept is worked out
+directly, so money isn't searched at all. Any offer another beats on both
+sides' margins without asking more money of either is dropped.
+
+Offers depend on the two players' holdings and cards, and on their wallets
+only through how many houses they could build on a set a trade completes, so
+they're kept in the shared decision cache keyed by those, and looking again
+in an unchanged position costs only a cache lookup. Whether each player can
+pay is checked afterwards, when an offer is picked.
+"""
+from itertools import combinations
+from monopoly_budget import Deadline, current
+from monopoly_decisions import decisions, holdings, rent_change
+from monopoly_policy import default_policy
+from monopoly_profiles import profile, rival_cost
+
+def policy_of(player):
+    """ Returns:
+        Policy: the weights a player judges trades by. players without their
+            own, like human players, are assumed to use the defaults
+    """
+    return getattr(player, 'policy', default_policy)
+
+def cards(player):
+    """ Returns:
+        int: how many Get Out of Jail Free cards a player has
+    """
+    return player.chance + player.cc
+
+def weights(policy):
+    """ Returns:
+        tuple: the policy weights a trade's value depends on
+    """
+    return (policy.horizon, policy.trade_min_props, policy.trade_card_value,
+            policy.trade_few_props_factor, policy.trade_offer_factor, policy.trade_rival_weight)
+
+def worth(player, gained, given, other=None, reach=None):
+    """ What the properties in a trade are worth to one side of it, without
+        checking whether they'd consider it. for properties in different sets,
+        the worths of separate trades add up to the worth of them together.
+
+    Arguments:
+        player (Player): the player
+        gained (list): the properties they'd get
+        given (list): the properties they'd give up
+        other (Player, None): the other side. what the trade does for them
+            counts against it (see monopoly_profiles.rival_cost). if None,
+            only the player's own side counts
+        reach (tuple, None): the other side's profile's reach, if already known
+
+    Returns:
+        tuple: what the properties they'd get are worth, and what the
+            properties they'd give up are worth
+    """
+    policy = policy_of(player)
+    value_in = rent_change(player, policy.horizon, gained=gained) if gained else 0
+    value_in += sum(prop.mprice for prop in gained if not prop.mstatus)
+    value_out = -rent_change(player, policy.horizon, given=given) if given else 0
+    value_out += sum(prop.mprice for prop in given if not prop.mstatus)
+    if other is not None:
+        value_out += rival_cost(player, other, given, gained, policy, reach)
+    return value_in, value_out
+
+def few(policy, count):
+    """ Returns:
+        float: how much more money is worth to a player with count properties
+    """
+    return policy.trade_few_props_factor if count < policy.trade_min_props else 1
+
+def terms(player, gained, given, other=None, reach=None):
+    """ What the properties in a trade are worth to one side of it.
+
+    Arguments:
+        player, gained, given, other, reach: as in worth()
+
+    Returns:
+        tuple: how much more money is worth to them, what the properties they'd
+            get are worth, and what the properties they'd give up are worth.
+            None if they won't make the trade at all: it leaves them too few
+            properties, or breaks up one of their full sets
+    """
+    policy = policy_of(player)
+    count = player.count_props()
+    if count - len(given) + len(gained) < policy.trade_min_props:
+        return None
+    for prop in given:
+        if prop.pcount == prop.stot:
+            return None
+    return (few(policy, count),) + worth(player, gained, given, other, reach)
+
+def margin(policy, few, value_in, value_out, offer_raw, request_raw):
+    """ How much better off a trade leaves one side of it.
+
+    Arguments:
+        policy (Policy): their weights
+        few, value_in, value_out: their terms(), for the trade's properties
+        offer_raw (int): the money and card value they'd get
+        request_raw (int): the money and card value they'd give up
+
+    Returns:
+        float: what they'd get less what they'd give up. None if what they'd
+            get isn't worth trade_offer_factor times its cash value
+    """
+    offer_value = offer_raw * few + value_in
+    if offer_value < policy.trade_offer_factor * offer_raw:
+        return None
+    return offer_value - request_raw * few - value_out
+
+def appraise(player, other, offer, request):
+    """ Score a trade for one side of it.
+
+    Arguments:
+        player (Player): the player being offered the trade
+        other (Player, None): the player offering it
+        offer (dict): the properties, money, and cards they'd get
+        request (dict): the properties, money, and cards they'd give up
+
+    Returns:
+        float: how much better off it leaves them, as in margin(). None if
+            they won't consider it at all
+    """
+    t = terms(player, offer['properties'], request['properties'], other)
+    if t is None:
+        return None
+    policy = policy_of(player)
+    value = policy.trade_card_value
+    return margin(policy, *t, offer['money'] + offer['cards'] * value, request['money'] + request['cards'] * value)
+
+def accepts(player, offer, request, other=None):
+    """ Whether a computer player would take a trade.
+
+    Arguments:
+        player (Player): the player being offered the trade
+        offer (dict): the properties, money, and cards they'd get
+        request (dict): the properties, money, and cards they'd give up
+        other (Player, None): the player offering it
+
+    Returns:
+        bool: whether they'd be better off
+    """
+    m = appraise(player, other, offer, request)
+    return m is not None and m > 0
+
+def tradeable(player, other):
+    """ The properties a player could put on the table for another.
+
+    Arguments:
+        player (Player): the player giving the properties
+        other (Player): the player getting them
+
+    Returns:
+        list: the player's properties in sets the other has part of, leaving
+            out any in a set with buildings, since those have to be sold first
+    """
+    props = []
+    for s, owned in player.deeds.items():
+        if owned and other.deeds[s] and not any(p.bnum for p in owned):
+            props.extend(owned)
+    return props
+
+def bound(receiver, giver):
+    """ A cheap guess at how much a bundle can add to a trade: what it's
+        worth to the side that gets it, less what it costs the side that
+        gives it up.
+
+    Arguments:
+        receiver (tuple): the receiving side's worth() of the bundle
+        giver (tuple): the giving side's worth() of it
+
+    Returns:
+        float: the guess. higher is more promising
+    """
+    return (receiver[0] - receiver[1]) - (giver[1] - giver[0])
+
+def bundles(props, size):
+    """ Returns:
+        list: every group of up to size properties, including none
+    """
+    return [list(c) for n in range(size + 1) for c in combinations(props, n)]
+
+def frontier(offers):
+    """ Drop the offers another beats on both margins, without needing more
+        money from either side.
+
+    Arguments:
+        offers (list): offers, as made in search()
+
+    Returns:
+        list: the offers left, best for the proposer first
+    """
+    offers = sorted(offers, key=lambda o: (-o['gain'], -o['surplus'], abs(o['money'])))
+    kept = []
+    for o in offers:
+        need = (max(o['money'], 0), max(-o['money'], 0))
+        for k in kept:
+            if k['surplus'] >= o['surplus'] and max(k['money'], 0) <= need[0] and max(-k['money'], 0) <= need[1]:
+                break
+        else:
+            kept.append(o)
+    return kept
+
+def search(player, other, size=2, deadline=None, step=10):
+    """ Find the offers a player could make another, whether or not either
+        can afford them.
+
+    Arguments:
+        player (Player): the player proposing
+        other (Player): the player they'd propose to
+        size (int): the most properties either side may give. defaults to 2
+        deadline (Deadline, None): when to stop, from monopoly_budget. each
+            pair of bundles is one operation, and the most promising bundles
+            (see bound()) are paired first, so a search cut short has looked
+            at the likeliest trades. if None, the running decision's
+        step (int): money is offered in multiples of this. defaults to 10
+
+    Returns:
+        tuple: the offers, best for the proposer first, and whether the search
+            finished in time. each offer is a dict of the board indices the
+            proposer would get and give up, the money they'd pay (negative if
+            they'd be paid), the cards each side would give up, and both
+            sides' margins
+    """
+    deadline = deadline or current()
+    mine, theirs = policy_of(player), policy_of(other)
+    my_reach, their_reach = profile(player, theirs.horizon).reach, profile(other, mine.horizon).reach
+    wanted = bundles(tradeable(other, player), size)
+    spare = bundles(tradeable(player, other), size)
+    # tradeable() leaves out full sets, so only the property counts can rule a trade out
+    my_count, their_count = player.count_props(), other.count_props()
+    my_few, their_few = few(mine, my_count), few(theirs, their_count)
+    # each bundle is worked out once, since bundles from different sets add up
+    wanted_worth = [(worth(player, b, (), other, their_reach), worth(other, (), b, player, my_reach)) for b in wanted]
+    spare_worth = [(worth(player, (), b, other, their_reach), worth(other, b, (), player, my_reach)) for b in spare]
+    wanted = sorted(zip(wanted, wanted_worth), key=lambda w: -bound(w[1][0], w[1][1]))
+    spare = sorted(zip(spare, spare_worth), key=lambda s: -bound(s[1][1], s[1][0]))
+    swaps = [(a, b) for a in range(cards(player) + 1) for b in range(cards(other) + 1) if not (a and b)]
+    offers = []
+    for gained, (my_gain, their_loss) in wanted:
+        gained_sets = {p.set for p in gained}
+        for given, (my_loss, their_gain) in spare:
+            deadline.tick()
+            if deadline.expired():
+                return frontier(offers), False
+            if gained_sets.intersection([p.set for p in given]):
+                continue
+            if (my_count - len(given) + len(gained) < mine.trade_min_props
+                    or their_count - len(gained) + len(given) < theirs.trade_min_props):
+                continue
+            ours_in, ours_out = my_gain[0] + my_loss[0], my_gain[1] + my_loss[1]
+            value_in, value_out = their_loss[0] + their_gain[0], their_loss[1] + their_gain[1]
+            for cards_out, cards_in in swaps:
+                if not (gained or given or cards_out or cards_in):
+                    continue
+                # the least money, in steps, that leaves the other side better off
+                cards_net = (cards_out - cards_in) * theirs.trade_card_value
+                money = ((value_out - value_in) / their_few - cards_net) // step * step + step
+                surplus = margin(theirs, their_few, value_in, value_out, max(money, 0) + cards_out * theirs.trade_card_value,
+                                 max(-money, 0) + cards_in * theirs.trade_card_value)
+                if surplus is None or surplus <= 0:
+                    continue
+                gain = margin(mine, my_few, ours_in, ours_out, max(-money, 0) + cards_in * mine.trade_card_value,
+                              max(money, 0) + cards_out * mine.trade_card_value)
+                if gain is None or gain <= 0:
+                    continue
+                offers.append({'gained': [p.loc for p in gained], 'given': [p.loc for p in given],
+                               'money': int(money), 'cards_out': cards_out, 'cards_in': cards_in,
+                               'gain': gain, 'surplus': surplus})
+    return frontier(offers), True
+
+def position(player, other):
+    """ The features of two players' holdings a trade between them depends on.
+
+    Returns:
+        tuple: each player's running hash of every set, their cards, and
+            their profiles' reach
+    """
+    sets = list(player.deeds)
+    return (holdings(player, sets), holdings(other, sets), cards(player), cards(other),
+            profile(player).reach, profile(other).reach)
+
+def signature(request, offer):
+    """ Returns:
+        tuple: the board indices and cards in a trade, for telling offers apart
+            whatever money they come with
+    """
+    return (tuple([p.loc for p in request['properties']]), tuple([p.loc for p in offer['properties']]),
+            request['cards'], offer['cards'])
+
+def best_offer(player, other, size=2, deadline=None, reserve=None, exclude=()):
+    """ Find the best trade a player can afford to propose to another.
+
+    Arguments:
+        player (Player): the player proposing
+        other (Player): the player they'd propose to
+        size (int): the most properties either side may give. defaults to 2
+        deadline (Deadline, None): the decision's limits. a search that
+            isn't cached gets the time it has left, and all of its operation
+            limit, whatever other searches in the decision have used. if
+            None, the running decision's
+        reserve (int, None): the least money the proposer keeps. if None,
+            their policy's buy_margin
+        exclude (set): signature()s of offers not to make, like ones already
+            turned down
+
+    Side effects:
+        caches the search, unless a time limit cut it short. one cut short by
+            its operation limit is cached with the limit in its key, since it
+            would stop in the same place under the same limit, but not under
+            another
+
+    Returns:
+        tuple: the request and the offer, as dicts of properties, money, and
+            cards, from the proposer's side. None if there's no trade both
+            would take
+    """
+    deadline = deadline or current()
+    key = ('trade', weights(policy_of(player)), weights(policy_of(other)), size, player.opponents()) + position(player, other)
+    capped = key + (deadline.operations,)
+    offers = decisions.lookup('trade', key)
+    if offers is None:
+        offers = decisions.lookup('trade', capped)
+    if offers is None:
+        allowance = Deadline(deadline.kind, deadline.remaining(), deadline.operations, deadline.owner)
+        offers, finished = search(player, other, size, allowance)
+        # a search cut short by the clock might get further next time, so
+        # only finished ones, and ones that ran out of operations, are kept
+        if finished:
+            decisions.store('trade', key, offers)
+        elif not allowance.ops_left(1):
+            decisions.store('trade', capped, offers)
+    reserve = policy_of(player).buy_margin if reserve is None else reserve
+    board = player.game.board
+    for o in offers:
+        if o['money'] <= player.wallet - reserve and -o['money'] <= other.wallet:
+            request = {'properties': [board[i] for i in o['gained']], 'money': max(-o['money'], 0), 'cards': o['cards_in']}
+            offer = {'properties': [board[i] for i in o['given']], 'money': max(o['money'], 0), 'cards': o['cards_out']}
+            if signature(request, offer) not in exclude:
+                return request, offer
+    return None
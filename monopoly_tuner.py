@@ -0,0 +1,233 @@
+""" Tunes ComputerPlayer's policy weights by self-play.
+
+Each candidate policy plays games against computer players using the default
+policy, rotating through the seats. Every candidate in a generation plays the
+same seeds, so they're compared under the same luck. The search is either a
+simple evolutionary loop, mutating the best policy so far, or plain random
+search. At the end, the best policy plays a fresh set of games, and its win
+rate is reported with a Wilson confidence interval, next to the 1 in N a
+policy no better than the default would expect.
+
+Usage:
+
+    python monopoly_tuner.py [--generations 10] [--population 8] [--games 64] [--computers 4] [-o policy.json]
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from math import sqrt
+from tempfile import TemporaryDirectory, mkdtemp
+from monopoly_policy import Policy
+import json
+import os
+import random
+import sys
+
+# the weights the tuner searches over, and their lowest and highest values
+space = {
+    'bid_wallet_share': (0, 0.3),
+    'bid_low_wallet': (0, 500),
+    'bid_low_factor': (0.3, 1),
+    'bid_margin': (0, 200),
+    'buy_margin': (0, 300),
+    'jail_pay_turns': (0, 20),
+    'jail_pay_props': (0, 12),
+    'jail_roll_turns': (0, 40),
+    'unmortgage_factor': (1.1, 5),
+    'receive_full_factor': (1, 4),
+    'receive_factor': (1, 5),
+    'build_reserve': (0, 500),
+    'horizon': (10, 150),
+    'trade_offer_factor': (1, 2.5),
+    'trade_rival_weight': (0, 2),
+}
+
+def private_workdir():
+    """ Move a worker process into a directory of its own, inside the
+        working directory, so the config files its games write don't clash
+        with other workers'. run as a pool's initializer.
+
+    Side effects:
+        makes the directory and changes into it. it's left for whoever cleans
+            up the working directory
+    """
+    os.chdir(mkdtemp(dir=os.getcwd()))
+
+def play_game(weights, computers, seed, seat, max_turns=1000):
+    """ Play one game with a candidate policy in one seat.
+
+    Arguments:
+        weights (dict): the candidate's policy weights
+        computers (int): how many computer players there are
+        seed (int): the game's seed
+        seat (int): where in the turn order the candidate sits
+        max_turns (int): how many turns to play before judging the game on
+            net worth. games that stall are judged the same way, as soon as
+            they do. defaults to 1000
+
+    Side effects:
+        writes the game's config files in the working directory
+
+    Returns:
+        int: 1 if the candidate won, otherwise 0
+    """
+    from monopoly_basic_exp import set_quiet
+    from monopoly_bench import new_state
+    from monopoly_stalemate import StalemateDetector
+    set_quiet()
+    state = new_state(computers, seed)
+    candidate = state.players[seat]
+    candidate.policy = Policy(**weights)
+    detector = StalemateDetector()
+    while state.turntotal < max_turns and len(state.players) - len(set(state.plost)) > 1:
+        state.step()
+        if detector.observe(state):
+            break
+    standing = [p for p in state.players if p not in state.plost]
+    winner = max(standing, key=lambda p: p.net_worth())
+    return int(winner is candidate)
+
+def wilson(wins, games, z=1.96):
+    """ A confidence interval for a win rate.
+
+    Arguments:
+        wins (int): how many games were won
+        games (int): how many games were played
+        z (float): the normal quantile for the confidence level. defaults to
+            1.96, for 95%
+
+    Returns:
+        tuple: the lowest and highest plausible win rates
+    """
+    if not games:
+        return 0, 1
+    p = wins / games
+    centre = p + z * z / (2 * games)
+    margin = z * sqrt(p * (1 - p) / games + z * z / (4 * games * games))
+    scale = 1 + z * z / games
+    return max(0, (centre - margin) / scale), min(1, (centre + margin) / scale)
+
+def clip(name, value):
+    """ Keep a weight inside its range, rounding it if its default is an int.
+    """
+    low, high = space[name]
+    value = min(max(value, low), high)
+    if isinstance(Policy.defaults[name], int):
+        return int(round(value))
+    return round(value, 3)
+
+def mutate(weights, rng, scale=0.15):
+    """ Make a new candidate near an old one.
+
+    Arguments:
+        weights (dict): the old candidate's weights
+        rng (Random): the random number generator to use
+        scale (float): the size of each change, as a share of the weight's
+            range. defaults to 0.15
+
+    Returns:
+        dict: the new candidate's weights. about half of them are changed
+    """
+    new = dict(weights)
+    for name, (low, high) in space.items():
+        if rng.random() < 0.5:
+            new[name] = clip(name, new[name] + rng.gauss(0, scale * (high - low)))
+    return new
+
+def sample(rng):
+    """ Make a random candidate, with every weight drawn from its range.
+    """
+    weights = Policy().as_dict()
+    for name, (low, high) in space.items():
+        weights[name] = clip(name, rng.uniform(low, high))
+    return weights
+
+def evaluate(pool, candidates, games, computers, seed):
+    """ Play every candidate through the same set of games.
+
+    Arguments:
+        pool (Executor): the pool to play games in
+        candidates (list): each candidate's weights
+        games (int): how many games each candidate plays
+        computers (int): how many computer players per game
+        seed (int): the first game's seed. game g uses seed + g, with the
+            candidate in seat g % computers
+
+    Returns:
+        list: how many games each candidate won
+    """
+    futures = [[pool.submit(play_game, weights, computers, seed + g, g % computers) for g in range(games)]
+               for weights in candidates]
+    return [sum(f.result() for f in fs) for fs in futures]
+
+def tune(generations=10, population=8, games=64, computers=4, seed=0, workers=None, method='evolve'):
+    """ Search for a better policy.
+
+    Arguments:
+        generations (int): how many rounds of candidates to try. defaults to 10
+        population (int): how many candidates per round. defaults to 8
+        games (int): how many games each candidate plays. defaults to 64
+        computers (int): how many computer players per game. defaults to 4
+        seed (int): the seed for the search and the games
+        workers (int, None): how many processes to play games in. if None,
+            one per CPU
+        method (str): 'evolve', to mutate the best policy so far, or
+            'random', for random search. defaults to 'evolve'
+
+    Side effects:
+        plays games in a directory of each worker's own, inside the working
+            directory, writing their config files
+
+    Returns:
+        dict: the best policy's weights, its win rate and confidence interval
+            on fresh games, the default policy's results on the same games,
+            and the win rate to expect by chance
+    """
+    rng = random.Random(seed)
+    with ProcessPoolExecutor(max_workers=workers, initializer=private_workdir) as pool:
+        best = Policy().as_dict()
+        best_wins = evaluate(pool, [best], games, computers, seed)[0]
+        history = [{'generation': 0, 'win rate': best_wins / games}]
+        for gen in range(1, generations + 1):
+            if method == 'random':
+                candidates = [sample(rng) for _ in range(population)]
+            else:
+                candidates = [mutate(best, rng) for _ in range(population)]
+            # every generation gets new games, so the incumbent is rescored too
+            gseed = seed + gen * games
+            wins = evaluate(pool, candidates + [best], games, computers, gseed)
+            best_wins = wins[-1]
+            top = max(range(population), key=lambda i: wins[i])
+            if wins[top] > best_wins:
+                best, best_wins = candidates[top], wins[top]
+            history.append({'generation': gen, 'win rate': best_wins / games})
+        # judge the winner on games it wasn't picked on
+        final_seed = seed + (generations + 1) * games
+        final = evaluate(pool, [best, Policy().as_dict()], games, computers, final_seed)
+    return {'policy': best, 'games': games, 'computers': computers,
+            'wins': final[0], 'win rate': final[0] / games, 'interval': wilson(final[0], games),
+            'default wins': final[1], 'default win rate': final[1] / games,
+            'chance': 1 / computers, 'history': history}
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--generations", type=int, help="how many rounds of candidates to try", default=10)
+    parser.add_argument("--population", type=int, help="candidates per round", default=8)
+    parser.add_argument("--games", type=int, help="games per candidate", default=64)
+    parser.add_argument("--computers", type=int, help="computer players per game", default=4)
+    parser.add_argument("--method", choices=('evolve', 'random'), help="how to make candidates", default='evolve')
+    parser.add_argument("--workers", type=int, help="processes to play games in", default=None)
+    parser.add_argument("--seed", type=int, help="the random seed", default=0)
+    parser.add_argument("-o", "--output", help="a file to write the best policy to", default=None)
+    args = parser.parse_args()
+    output = args.output and os.path.abspath(args.output)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        result = tune(args.generations, args.population, args.games, args.computers, args.seed,
+                      args.workers, args.method)
+    low, high = result['interval']
+    print(json.dumps(result['policy'], indent=2))
+    print(f"win rate {result['win rate']:.1%} (95% CI {low:.1%}-{high:.1%}) over {result['games']} games; "
+          f"default policy {result['default win rate']:.1%}; chance {result['chance']:.1%}")
+    if output:
+        Policy(**result['policy']).save(output)
@@ -0,0 +1,159 @@
+""" Expected rent and return-on-investment tables for every property.
+
+Expected rent is per opponent turn: the chance an opponent lands on the
+property in a turn (from monopoly_markov), times the rent they'd pay at a
+given level. Every table is built once, so looking one up during a game is
+just list indexing.
+
+Street levels: 0 is part of a set, 1 is a full set with no houses, and 2-6
+are 1-4 houses and a hotel. Railroad and utility levels are how many of them
+the owner has, minus 1.
+"""
+from monopoly_markov import landing_table
+from monopoly_property import board_spaces, Property, Railroad, Utility
+
+# the average total of two dice, for utility rent
+average_roll = 7
+
+class Valuation:
+    """ Expected rent and ROI tables for the board.
+
+    Attributes:
+        landings (list): the expected landings on each space per opponent turn
+        rents (dict): board index and a list of the expected rent per opponent
+            turn at each level
+        roi (dict): board index and a list of the expected rent per opponent
+            turn, per dollar spent on the property and its buildings, at each level
+        where (dict): property names and their board index
+        horizon (int): how many turns of each opponent to value income over
+    """
+    def __init__(self, jail='pay', horizon=60):
+        """ Build the tables.
+
+        Arguments:
+            jail (str): the Jail strategy to take landing probabilities from.
+                defaults to 'pay'
+            horizon (int): how many turns of each opponent to value income
+                over. defaults to 60
+
+        Side effects:
+            sets attributes, solving the landing probabilities if they aren't
+                cached yet
+        """
+        self.landings = landing_table(jail)['landings']
+        self.horizon = horizon
+        self.rents = {}
+        self.roi = {}
+        self.where = {}
+        for i, space in board_spaces.items():
+            if not isinstance(space, Property):
+                continue
+            self.where[space.name] = i
+            if isinstance(space, Utility):
+                rents = [r * average_roll for r in space.rent]
+                costs = [space.price] * len(rents)
+            elif isinstance(space, Railroad):
+                rents = list(space.rent)
+                costs = [space.price] * len(rents)
+            else:
+                rents = [space.rent[0], 2 * space.rent[0]] + space.rent[1:]
+                costs = [space.price, space.price] + [space.price + b * space.bprice for b in range(1, 6)]
+            self.rents[i] = [self.landings[i] * r for r in rents]
+            self.roi[i] = [r / c for r, c in zip(self.rents[i], costs)]
+
+    def level(self, prop, count=None, bnum=None):
+        """ Find a property's level.
+
+        Arguments:
+            prop (Property): the property
+            count (int, None): how many of its set the owner has. if None,
+                uses prop.pcount
+            bnum (int, None): how many buildings it has. if None, uses prop.bnum
+
+        Returns:
+            int: the level, as an index into the property's tables
+        """
+        count = prop.pcount if count is None else count
+        bnum = prop.bnum if bnum is None else bnum
+        if isinstance(prop, (Railroad, Utility)):
+            return max(count, 1) - 1
+        if bnum:
+            return bnum + 1
+        return 1 if count == prop.stot else 0
+
+    def expected_rent(self, prop, count=None, bnum=None):
+        """ Look up a property's expected rent per opponent turn.
+
+        Arguments:
+            prop (Property): the property
+            count (int, None): how many of its set the owner has. if None,
+                uses prop.pcount
+            bnum (int, None): how many buildings it has. if None, uses prop.bnum
+
+        Returns:
+            float: the expected rent. 0 if the property is mortgaged
+        """
+        if prop.mstatus:
+            return 0
+        return self.rents[self.where[prop.name]][self.level(prop, count, bnum)]
+
+    def set_income(self, props, count):
+        """ The expected rent per opponent turn from some properties in a set.
+
+        Arguments:
+            props (list): the properties
+            count (int): how many of the set their owner has
+
+        Returns:
+            float: the expected rent from all of them together
+        """
+        return sum(self.expected_rent(p, count) for p in props)
+
+    def change(self, player, opponents, gained=(), given=()):
+        """ How much a trade or purchase would change what a player's
+            properties earn, in dollars over the horizon.
+
+        Arguments:
+            player (Player): the player
+            opponents (int): how many opponents might land on their properties
+            gained (list): the properties the player would get
+            given (list): the properties the player would give up
+
+        Returns:
+            float: the change in expected rent over the horizon. negative if
+                the player would earn less
+        """
+        total = 0
+        for s in {p.set for p in gained} | {p.set for p in given}:
+            owned = player.deeds[s]
+            after = [p for p in owned if p not in given] + [p for p in gained if p.set == s]
+            total += self.set_income(after, len(after)) - self.set_income(owned, len(owned))
+        return total * opponents * self.horizon
+
+    def worth(self, player, prop, opponents):
+        """ What getting a property is worth to a player, in dollars: the rent
+            it would earn them over the horizon.
+
+        Arguments:
+            player (Player): the player
+            prop (Property): the property
+            opponents (int): how many opponents might land on it
+
+        Returns:
+            float: the property's worth
+        """
+        return self.change(player, opponents, gained=[prop])
+
+tables = {}
+
+def get_valuation(jail='pay', horizon=60):
+    """ Get the shared Valuation for a set of rules, building it the first
+        time it's asked for.
+
+    Returns:
+        Valuation: the tables
+    """
+    key = (jail, horizon)
+    if key not in tables:
+        tables[key] = Valuation(jail, horizon)
+    return tables[key]
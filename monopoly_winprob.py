@@ -0,0 +1,151 @@
+""" Estimates each player's chance of winning from where a game stands.
+
+Each estimate plays a burst of short playouts from the current position, with
+every player using the ComputerPlayer heuristics, and counts who is ahead at
+the end of each: the last player standing, or the highest net worth. The
+playouts run in a worker pool of their own, which stays up between calls, so
+only the first estimate pays to start it.
+
+The time budget is strict. Only one playout per worker is in flight at a
+time, and new ones are handed out only while there's time left, so when the
+budget runs out, nothing more than the playouts already running is left over.
+A running playout can't be stopped, so those finish in the background and
+their results are dropped. Since the pool isn't RolloutPlayer's, they can
+only hold up the next estimate, never a decision. Each chance comes with a
+95% Wilson interval, which is wide when few playouts finished in time.
+"""
+from concurrent.futures import FIRST_COMPLETED, wait
+from time import perf_counter
+from monopoly_basic_exp import seeded
+from monopoly_rollout import Rollouts, heuristic
+from monopoly_stalemate import standing
+from monopoly_tuner import wilson
+import json
+import pickle
+
+def playout(blob, seed, depth):
+    """ Play one game forward, run in a worker.
+
+    Arguments:
+        blob (bytes): the pickled game
+        seed (int): the seed for the playout's random number generator
+        depth (int): how many turns to play
+
+    Returns:
+        int: the index in the game's player list of the player ahead at the end
+    """
+    state = pickle.loads(blob)
+    with seeded(seed):
+        heuristic(state)
+        for _ in range(depth):
+            if len(standing(state)) <= 1:
+                break
+            state.step()
+    return state.players.index(max(standing(state), key=lambda p: p.net_worth()))
+
+class WinEstimator:
+    """ Live win probabilities for a game.
+
+    Attributes:
+        budget (float): how many seconds an estimate may take
+        depth (int): how many turns each playout lasts
+        path (str, None): a file to append every estimate to, one JSON object
+            per line. if None, estimates aren't logged
+        every (int): turns between logged estimates while a game is played.
+            0 logs only the estimates asked for with the info command
+        engine (Rollouts): the pool the playouts run in
+    """
+    def __init__(self, budget=0.2, depth=100, path=None, every=50):
+        self.budget = budget
+        self.depth = depth
+        self.path = path
+        self.every = every
+        self.engine = Rollouts()
+
+    def estimate(self, state, budget=None):
+        """ Estimate every standing player's chance of winning.
+
+        Arguments:
+            state (BoardState): the game, which isn't changed
+            budget (float, None): how many seconds to take. if None, self.budget
+
+        Side effects:
+            starts the worker pool, if it isn't running, and logs the estimate
+                if self.path is set. each playout has its own random number
+                generator, so the game plays out the same whether or not
+                it's estimated
+
+        Returns:
+            dict: the turn, the state hash, how many playouts finished, and for
+                each standing player by name, their chance of winning and the
+                low and high ends of its interval
+        """
+        budget = self.budget if budget is None else budget
+        deadline = perf_counter() + budget
+        engine = self.engine
+        pool = engine.start()
+        blob = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        # seeded from the position, so the same position gets the same playouts
+        base = state.state_hash()
+        wins = [0] * len(state.players)
+        running = set()
+        started = 0
+        while True:
+            while len(running) < engine.workers and perf_counter() < deadline:
+                running.add(pool.submit(playout, blob, base + started, self.depth))
+                started += 1
+            remaining = deadline - perf_counter()
+            if not running or remaining <= 0:
+                break
+            done, running = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    wins[f.result()] += 1
+        for f in running:
+            f.cancel()
+        finished = sum(wins)
+        odds = {}
+        for i, p in enumerate(state.players):
+            if p in standing(state):
+                low, high = wilson(wins[i], finished)
+                odds[p.name] = {'chance': wins[i] / finished if finished else None, 'low': low, 'high': high}
+        result = {'turn': state.turntotal, 'hash': f'{state.state_hash():016x}', 'playouts': finished, 'players': odds}
+        if self.path:
+            self.log(result)
+        return result
+
+    def log(self, result):
+        """ Append an estimate to the log file.
+
+        Side effects:
+            writes to self.path, creating it if necessary
+        """
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+
+    def on_turn(self, state):
+        """ Log an estimate, if it's time for one.
+
+        Arguments:
+            state (BoardState): the game, after a turn
+        """
+        if self.path and self.every and state.turntotal % self.every == 0:
+            self.estimate(state)
+
+def describe(result):
+    """ Put an estimate into words.
+
+    Arguments:
+        result (dict): an estimate, from WinEstimator.estimate
+
+    Returns:
+        str: one line per player, with their chance and its interval
+    """
+    if not result['playouts']:
+        return "No playouts finished in time"
+    lines = [f"Chances of winning, from {result['playouts']} simulated games:"]
+    for name, odds in sorted(result['players'].items(), key=lambda kv: -kv[1]['chance']):
+        lines.append(f"{name}: {odds['chance']:.0%} ({odds['low']:.0%}-{odds['high']:.0%})")
+    return '\n'.join(lines)
+
+estimator = WinEstimator()
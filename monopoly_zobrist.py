@@ -0,0 +1,148 @@
+""" A 64-bit hash of the whole game state, kept up to date as the game changes.
+
+Every piece of state (a player's location, wallet, Jail status and cards, a
+property's owner, buildings and mortgage, whose turn it is) has a random-looking
+64-bit key for each value it can take, and the game's hash is the XOR of the
+keys for the values it has now. When one value changes, XORing out its old key
+and XORing in the new one updates the hash in constant time, whatever else is
+going on in the game.
+
+Whose turn it is and the players' Jail status and cards are Hashed
+descriptors, so the update happens inside the same assignments that change
+them. Properties are read far more often than they change, so they aren't
+descriptors: a set's keys are worked out again whenever its rents are, which
+every change to an owned property already triggers. Locations and wallets
+change nearly every turn, and are mixed in when the hash is asked for. Keys
+are mixed from the values themselves, not drawn from a table, so wallets can
+hold any amount, and every process gets the same hash for the same game.
+"""
+from functools import lru_cache
+from zlib import crc32
+
+mask = (1 << 64) - 1
+unset = object()
+
+def splitmix(x):
+    """ Scramble a number into 64 well mixed bits.
+    """
+    x = (x + 0x9E3779B97F4A7C15) & mask
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & mask
+    return x ^ (x >> 31)
+
+@lru_cache(maxsize=65536)
+def key(*parts):
+    """ The key for one piece of state having one value.
+
+    Arguments:
+        parts: strings, numbers, bools, or None, naming the piece of state and
+            its value
+
+    Returns:
+        int: a 64-bit key
+    """
+    h = 0
+    for part in parts:
+        if isinstance(part, str):
+            part = crc32(part.encode('utf-8')) | 1 << 32
+        elif part is None:
+            part = 1 << 33
+        h = splitmix(h ^ int(part))
+    return h
+
+def toggle(game, old, new):
+    """ Swap one key for another in a game's hash.
+
+    Arguments:
+        game (BoardState, None): the game. nothing happens if it's None, or
+            hasn't started hashing yet
+        old (int): the key to take out
+        new (int): the key to put in
+    """
+    try:
+        game.zobrist ^= old ^ new
+    except AttributeError:
+        pass
+
+class Hashed:
+    """ An attribute that tells its object when it changes, so the object can
+        update its game's hash. the value is kept in the instance's __dict__
+        under the same name, so pickling and copying work as usual. there's
+        no __get__, so reading the attribute is an ordinary lookup at full speed.
+
+    Attributes:
+        name (str): the attribute's name
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __set__(self, obj, value):
+        d = obj.__dict__
+        old = d.get(self.name, unset)
+        d[self.name] = value
+        if old is not unset and old != value:
+            obj.hashed_change(self.name, old, value)
+
+def name_of(owner):
+    """ What to hash a property's owner as.
+    """
+    return getattr(owner, 'name', owner)
+
+def player_keys(player):
+    """ The XOR of the keys for a player's Jail status and cards.
+    """
+    h = 0
+    for field in ('inJail', 'jailTurn', 'chance', 'cc'):
+        h ^= key('player', player.name, field, getattr(player, field))
+    return h
+
+def position_keys(player):
+    """ The XOR of the keys for a player's location and wallet. wallets take
+        far too many values to cache, so the last step of key() is done here,
+        on the cached key for the field, which gives the same key.
+    """
+    return location_key(player) ^ splitmix(key('player', player.name, 'wallet') ^ player.wallet)
+
+def location_key(player):
+    """ The key for a player's location, worked out the same way.
+    """
+    return splitmix(key('player', player.name, 'loc') ^ player.loc)
+
+def property_keys(prop):
+    """ The XOR of the keys for a property's owner, buildings, and mortgage.
+    """
+    return (key('property', prop.loc, 'owner', name_of(prop.owner)) ^ key('property', prop.loc, 'bnum', prop.bnum)
+            ^ key('property', prop.loc, 'mstatus', prop.mstatus))
+
+def card_key(deck, place, card):
+    """ The key for a card being in a deck, with a number of cards under it.
+        cards are drawn off the top, so a card's place doesn't change until
+        it's drawn.
+    """
+    return key('deck', deck.type, place, card)
+
+def deck_key(deck):
+    """ The key for a deck's remaining cards, in order.
+    """
+    h = 0
+    for place, card in enumerate(reversed(deck.order)):
+        h ^= card_key(deck, place, card)
+    return h
+
+def full_hash(state):
+    """ Work out a game's hash from scratch, without the decks, locations,
+        or wallets.
+
+    Arguments:
+        state (BoardState): the game
+
+    Returns:
+        int: the hash, as BoardState.zobrist should hold it
+    """
+    h = key('turn', state.turn)
+    for p in state.players:
+        h ^= player_keys(p)
+    for space in state.board.values():
+        if not isinstance(space, str):
+            h ^= property_keys(space)
+    return h